@@ -1,14 +1,16 @@
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_active_user, get_db
+from app.api.deps import get_current_active_user, get_current_admin_user, get_db
+from app.config import GUTENBERG_CATALOG_PATH, GUTENBERG_IMPORT_MAX_BATCH, GUTENBERG_SEARCH_SOURCE
 from app.models import User, Book
-from app.schemas import BookCreate, Book as BookSchema, UserBookCreate, UserBook
+from app.schemas import BookCreate, Book as BookSchema, UserBookCreate, UserBook, GutenbergBatchImport
 from app.services.book import book_service
 from app.services.gutendex import gutendex_service as gutenberg_service
+from app.services.gutenberg_mirror import gutenberg_mirror_service
 
 router = APIRouter(prefix="/books", tags=["books"])
 
@@ -21,8 +23,12 @@ def get_books_catalog_with_user_status(
     search: Optional[str] = Query(None, description="Search by title or author"),
     language: Optional[str] = Query(None, description="Filter by language"),
     author: Optional[str] = Query(None, description="Filter by author"),
-    sort_by: Optional[str] = Query("title", description="Sorting: title, author, created_at"),
+    sort_by: Optional[str] = Query("title", description="Sorting: title, author, created_at, relevance"),
     sort_order: Optional[str] = Query("asc", description="Sort order: asc, desc"),
+    search_mode: Optional[str] = Query("natural", description="Full-text search mode: natural, boolean"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor of the previous page (replaces skip)"),
+    include_total: bool = Query(True, description="Count the total number of matching books"),
+    count_mode: str = Query("cached", description="Total count: exact, cached, estimate (unfiltered listings only)"),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
@@ -37,7 +43,11 @@ def get_books_catalog_with_user_status(
         language=language,
         author=author,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        search_mode=search_mode,
+        cursor=cursor,
+        include_total=include_total,
+        count_mode=count_mode
     )
 def read_books(
     db: Session = Depends(get_db),
@@ -107,11 +117,22 @@ async def search_books(
     languages: Optional[List[str]] = Query(None, description="Filter by language"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(32, ge=1, le=100, description="Number of elements on the page"),
+    source: str = Query(GUTENBERG_SEARCH_SOURCE, description="Where to search: remote (Gutenberg API) or local (catalog mirror)"),
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
-    Search for books via the Gutenberg API.
+    Search for books via the Gutenberg API or the local mirror of its catalog.
     """
+    if source == "local":
+        return gutenberg_mirror_service.search_local(
+            db=db,
+            search_query=query,
+            languages=languages,
+            page=page,
+            limit=limit
+        )
+    
     return await gutenberg_service.search_books(
         search_query=query,
         languages=languages,
@@ -120,6 +141,76 @@ async def search_books(
     )
 
 
+@router.get("/search/cache-stats", response_model=dict)
+def get_search_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get hit/miss counters of the Gutenberg response cache.
+    """
+    return gutenberg_service.cache_stats()
+
+
+@router.post("/mirror/sync", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def sync_gutenberg_mirror(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Start a background re-sync of the local Gutenberg catalog mirror
+    from the dump configured in GUTENBERG_CATALOG_PATH.
+    Only available to the users listed in ADMIN_USERNAMES.
+    """
+    if not GUTENBERG_CATALOG_PATH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The Gutenberg catalog dump is not configured"
+        )
+    
+    if gutenberg_mirror_service.status["running"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A catalog sync is already running"
+        )
+    
+    background_tasks.add_task(
+        gutenberg_mirror_service.run_sync_job, session_factory=request.app.state.session_factory
+    )
+    return {"message": "Catalog sync started"}
+
+
+@router.get("/mirror/status", response_model=dict)
+def get_gutenberg_mirror_status(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get the state of the last Gutenberg catalog mirror sync.
+    """
+    return gutenberg_mirror_service.status
+
+
+@router.post("/gutenberg/batch", response_model=dict)
+async def import_gutenberg_books(
+    batch_in: GutenbergBatchImport,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Import several books from Project Gutenberg by their IDs.
+    Books already in the catalog are reported as existing, ids that could
+    not be fetched are reported as failed.
+    """
+    if len(batch_in.gutenberg_ids) > GUTENBERG_IMPORT_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {GUTENBERG_IMPORT_MAX_BATCH} books can be imported at once"
+        )
+    return await book_service.import_books_from_gutenberg(
+        db=db, gutenberg_ids=batch_in.gutenberg_ids, user_id=current_user.id
+    )
+
+
 @router.get("/gutenberg/{gutenberg_id}", response_model=BookSchema)
 async def import_gutenberg_book(
     gutenberg_id: int,
@@ -6,7 +6,7 @@ from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 
-from app.config import SECRET_KEY, ALGORITHM
+from app.config import SECRET_KEY, ALGORITHM, ADMIN_USERNAMES
 from app.database import get_db
 from app.models import User
 from app.schemas import TokenPayload
@@ -62,4 +62,16 @@ def get_current_active_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive user"
         )
+    return current_user
+
+
+def get_current_admin_user(
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    """Check if the current user is listed in ADMIN_USERNAMES"""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator access required"
+        )
     return current_user
\ No newline at end of file
@@ -1,11 +1,15 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, Header, HTTPException, Query, Request, Response, UploadFile, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_active_user, get_db
+from app.api.deps import get_current_active_user, get_current_admin_user, get_db
 from app.models import User
+from app.services.book_pages import book_page_service
 from app.services.file import file_service
+from app.services.metadata import metadata_service
+from app.services.resumable_upload import TUS_VERSION, parse_upload_metadata, resumable_upload_service
+from app.utils.responses import RangeFileResponse
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -38,6 +42,106 @@ async def upload_book_file(
     )
 
 
+def set_upload_headers(response: Response, upload: dict) -> None:
+    response.headers["Tus-Resumable"] = TUS_VERSION
+    response.headers["Upload-Offset"] = str(upload["offset"])
+    response.headers["Upload-Length"] = str(upload["length"])
+    response.headers["Cache-Control"] = "no-store"
+
+
+@router.post("/uploads", response_model=dict, status_code=status.HTTP_201_CREATED)
+def create_resumable_upload(
+    response: Response,
+    upload_length: int = Header(...),
+    upload_metadata: str = Header(None),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Start a resumable upload.
+    
+    Headers:
+    - Upload-Length: total file size in bytes
+    - Upload-Metadata: tus metadata with base64 values for filename, title, language and optionally author
+    
+    Send the file with PATCH requests to the returned Location, then finalize it.
+    """
+    upload = resumable_upload_service.create_upload(
+        user=current_user,
+        length=upload_length,
+        metadata=parse_upload_metadata(upload_metadata)
+    )
+    set_upload_headers(response, upload)
+    response.headers["Location"] = f"/api/files/uploads/{upload['upload_id']}"
+    return upload
+
+
+@router.api_route("/uploads/{upload_id}", methods=["GET", "HEAD"], response_model=dict)
+def get_resumable_upload(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get the current offset of a resumable upload, to resume after a dropped connection.
+    """
+    upload = resumable_upload_service.get_upload(upload_id, current_user)
+    set_upload_headers(response, upload)
+    return upload
+
+
+@router.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    content_type: str = Header(None),
+    current_user: User = Depends(get_current_active_user)
+) -> Response:
+    """
+    Append a chunk to a resumable upload.
+    The body (application/offset+octet-stream) is written at Upload-Offset,
+    which must equal the current offset of the upload.
+    """
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Chunks must be sent as application/offset+octet-stream"
+        )
+    
+    upload = await resumable_upload_service.append_chunk(
+        upload_id=upload_id,
+        user=current_user,
+        offset=upload_offset,
+        chunks=request.stream()
+    )
+    response = Response(status_code=status.HTTP_204_NO_CONTENT)
+    set_upload_headers(response, upload)
+    return response
+
+
+@router.post("/uploads/{upload_id}/finalize", status_code=status.HTTP_201_CREATED)
+async def finalize_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Turn a completely received upload into a book, like /upload-book does.
+    """
+    return await resumable_upload_service.finalize_upload(db, upload_id, current_user)
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user)
+) -> None:
+    """
+    Cancel a resumable upload and delete the received data.
+    """
+    resumable_upload_service.cancel_upload(upload_id, current_user)
+
+
 @router.delete("/books/{user_book_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_book_file(
     user_book_id: int,
@@ -109,6 +213,92 @@ def get_user_book_file_details(
     return details
 
 
+@router.api_route("/user-books/{user_book_id}/content", methods=["GET", "HEAD"])
+def get_user_book_content(
+    user_book_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Download the file of a local book.
+    Supports Range requests (206), ETag / If-None-Match and Last-Modified / If-Modified-Since.
+    """
+    book_file = file_service.get_user_book_file(
+        db=db,
+        user_book_id=user_book_id,
+        user_id=current_user.id
+    )
+    
+    if not book_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The book file was not found in your collection"
+        )
+    
+    return RangeFileResponse(
+        book_file["path"],
+        request.headers,
+        etag=book_file["etag"],
+        filename=book_file["filename"],
+        method=request.method
+    )
+
+
+@router.get("/user-books/{user_book_id}/pages/{page}", response_model=dict)
+def get_user_book_page(
+    user_book_id: int,
+    page: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get one page of an uploaded TXT, HTML or EPUB book.
+    Pages are numbered from 1; total_pages is the real length used for reading progress.
+    """
+    book_page = book_page_service.get_page(
+        db=db,
+        user_book_id=user_book_id,
+        user_id=current_user.id,
+        page=page
+    )
+    
+    if not book_page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The book file was not found in your collection"
+        )
+    
+    return book_page
+
+
+@router.get("/user-books/{user_book_id}/metadata", response_model=dict)
+async def get_user_book_metadata(
+    user_book_id: int,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for pending metadata"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get the metadata extraction status of an uploaded book.
+    Poll it, or pass wait to hold the request until the metadata is ready.
+    """
+    metadata = await file_service.get_metadata_status(
+        db=db,
+        user_book_id=user_book_id,
+        user_id=current_user.id,
+        wait=wait
+    )
+    
+    if not metadata:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The book was not found in your collection"
+        )
+    
+    return metadata
+
+
 @router.post("/cleanup", response_model=dict)
 def cleanup_files(
     db: Session = Depends(get_db),
@@ -123,11 +313,14 @@ def cleanup_files(
         
         orphaned_books = file_service.cleanup_orphaned_books(db)
         
+        expired_uploads = resumable_upload_service.purge_expired()
+        
         return {
             "message": "Cleaning completed successfully",
             "user_id": current_user.id,
             "orphaned_files_removed": orphaned_files,
-            "orphaned_books_removed": orphaned_books
+            "orphaned_books_removed": orphaned_books,
+            "expired_uploads_removed": expired_uploads
         }
     except Exception as e:
         raise HTTPException(
@@ -136,6 +329,40 @@ def cleanup_files(
         )
 
 
+@router.post("/backfill-page-counts", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def backfill_page_counts(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    batch_size: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Start a background backfill of the page count and size of local book files
+    uploaded before they were recorded.
+    Only available to the users listed in ADMIN_USERNAMES.
+    """
+    if metadata_service.backfill_status["running"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A page count backfill is already running"
+        )
+
+    background_tasks.add_task(
+        metadata_service.run_backfill_job, batch_size, request.app.state.session_factory
+    )
+    return {"message": "Backfill started"}
+
+
+@router.get("/backfill-page-counts/status", response_model=dict)
+def get_backfill_status(
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Get the progress and counts of the last page count backfill.
+    """
+    return metadata_service.backfill_status
+
+
 @router.get("/stats", response_model=dict)
 def get_file_stats(
     db: Session = Depends(get_db),
@@ -1,12 +1,13 @@
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_active_user, get_db
+from app.api.deps import get_current_active_user, get_current_admin_user, get_db
 from app.models import User
 from app.services.stats import stats_service
 from app.services.activity import activity_service
+from app.services.retention import retention_service
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
@@ -107,6 +108,12 @@ def log_activity(
     """
     Logging user activity manually (for export/import).
     """
+    activity_service.validate_activity(
+        db,
+        current_user.id,
+        activity_data.get("activity_type", "unknown"),
+        activity_data.get("book_id")
+    )
     activity_service.log_activity(
         db=db,
         user_id=current_user.id,
@@ -115,4 +122,46 @@ def log_activity(
         details=activity_data.get("details", {})
     )
     
-    return {"status": "success"}
\ No newline at end of file
+    return {"status": "success"}
+
+
+@router.post("/activities/rebuild-rollups")
+def rebuild_activity_rollups(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Recompute the user's activity statistics from the stored activities.
+    """
+    rollups = activity_service.rebuild_rollups(db, user_id=current_user.id)
+    return {"status": "success", "rollups": rollups}
+
+
+@router.post("/retention/run", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def run_retention(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Start a background run of the retention policies for activities and reading sessions.
+    Only available to the users listed in ADMIN_USERNAMES.
+    """
+    if retention_service.status["running"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A retention run is already in progress"
+        )
+
+    background_tasks.add_task(retention_service.run_retention_job, request.app.state.session_factory)
+    return {"message": "Retention run started"}
+
+
+@router.get("/retention/status", response_model=dict)
+def get_retention_status(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get the progress and metrics of the last retention run.
+    """
+    return retention_service.status
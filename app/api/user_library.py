@@ -9,6 +9,7 @@ from app.models import User
 from app.schemas import UserBookUpdate
 from app.services.user_library import user_library_service
 from app.services.file import file_service
+from app.services.content_index import content_index_service
 
 router = APIRouter(prefix="/library", tags=["user-library"])
 
@@ -21,8 +22,11 @@ def get_user_library(
     limit: int = Query(20, ge=1, le=100, description="Number of entries on the page"),
     status: Optional[str] = Query(None, description="Filter by status: 'Want to read', 'reading', 'read', 'dropped'"),
     search: Optional[str] = Query(None, description="Search by book title or author"),
-    sort_by: Optional[str] = Query("added_at", description="Sorting: title, author, added_at, status"),
+    sort_by: Optional[str] = Query("added_at", description="Sorting: title, author, added_at, status, relevance"),
     sort_order: Optional[str] = Query("desc", description="Sort order: asc, desc"),
+    search_mode: Optional[str] = Query("natural", description="Full-text search mode: natural, boolean"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor of the previous page (replaces skip)"),
+    include_total: bool = Query(True, description="Count the total number of matching books"),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
@@ -43,7 +47,10 @@ def get_user_library(
         status_filter=status,
         search=search,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        search_mode=search_mode,
+        cursor=cursor,
+        include_total=include_total
     )
 
 
@@ -219,6 +226,32 @@ def get_reading_progress(
     )
 
 
+@router.get("/{username}/search-content", response_model=dict)
+def search_book_contents(
+    username: str,
+    q: str = Query(..., min_length=1, max_length=200, description="Words or phrase to find in the text of uploaded books"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of books"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Search the text of the user's uploaded books.
+    Returns books ranked by relevance with the matching pages and snippets.
+    """
+    if current_user.username != username:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only search your own library"
+        )
+    
+    return content_index_service.search(
+        db=db,
+        user_id=current_user.id,
+        query=q,
+        limit=limit
+    )
+
+
 @router.post("/{username}/cleanup", response_model=dict)
 def cleanup_user_library(
     username: str,
@@ -26,8 +26,27 @@ if not SECRET_KEY:
 
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+ADMIN_USERNAMES = [name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()]
 
 GUTENBERG_API_URL = os.getenv("GUTENBERG_API_URL", "https://gutendex.com/books/")
+GUTENBERG_HTTP2 = os.getenv("GUTENBERG_HTTP2", "True").lower() == "true"
+GUTENBERG_TIMEOUT = float(os.getenv("GUTENBERG_TIMEOUT", "30"))
+GUTENBERG_CONNECT_TIMEOUT = float(os.getenv("GUTENBERG_CONNECT_TIMEOUT", "10"))
+GUTENBERG_MAX_CONNECTIONS = int(os.getenv("GUTENBERG_MAX_CONNECTIONS", "20"))
+GUTENBERG_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GUTENBERG_MAX_KEEPALIVE_CONNECTIONS", "10"))
+GUTENBERG_KEEPALIVE_EXPIRY = float(os.getenv("GUTENBERG_KEEPALIVE_EXPIRY", "30"))
+GUTENBERG_CACHE_SIZE = int(os.getenv("GUTENBERG_CACHE_SIZE", "512"))
+GUTENBERG_SEARCH_CACHE_TTL = float(os.getenv("GUTENBERG_SEARCH_CACHE_TTL", "600"))
+GUTENBERG_BOOK_CACHE_TTL = float(os.getenv("GUTENBERG_BOOK_CACHE_TTL", "86400"))
+GUTENBERG_CACHE_DIR = os.getenv("GUTENBERG_CACHE_DIR", "")
+
+GUTENBERG_CATALOG_PATH = os.getenv("GUTENBERG_CATALOG_PATH", "")
+GUTENBERG_MIRROR_BASE_URL = os.getenv("GUTENBERG_MIRROR_BASE_URL", "https://www.gutenberg.org")
+GUTENBERG_MIRROR_BATCH_SIZE = int(os.getenv("GUTENBERG_MIRROR_BATCH_SIZE", "1000"))
+GUTENBERG_MIRROR_SYNC_HOURS = float(os.getenv("GUTENBERG_MIRROR_SYNC_HOURS", "0"))
+GUTENBERG_SEARCH_SOURCE = os.getenv("GUTENBERG_SEARCH_SOURCE", "remote")
+GUTENBERG_IMPORT_CONCURRENCY = int(os.getenv("GUTENBERG_IMPORT_CONCURRENCY", "8"))
+GUTENBERG_IMPORT_MAX_BATCH = int(os.getenv("GUTENBERG_IMPORT_MAX_BATCH", "100"))
 
 UPLOAD_DIRECTORY = Path(os.getenv("UPLOAD_DIRECTORY", "uploads"))
 UPLOAD_DIR_PATH = BASE_DIR / UPLOAD_DIRECTORY
@@ -40,8 +59,28 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "52428800"))
+METADATA_WORKERS = int(os.getenv("METADATA_WORKERS", "2"))
+CONTENT_INDEX_WORKERS = int(os.getenv("CONTENT_INDEX_WORKERS", "1"))
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "1"))
+ACTIVITY_WRITE_BEHIND = os.getenv("ACTIVITY_WRITE_BEHIND", "True").lower() == "true"
+ACTIVITY_FLUSH_SIZE = int(os.getenv("ACTIVITY_FLUSH_SIZE", "100"))
+ACTIVITY_FLUSH_INTERVAL_MS = int(os.getenv("ACTIVITY_FLUSH_INTERVAL_MS", "500"))
+
+RETENTION_ACTIVITY_DAYS = int(os.getenv("RETENTION_ACTIVITY_DAYS", "365"))
+RETENTION_SESSION_DAYS = int(os.getenv("RETENTION_SESSION_DAYS", "0"))
+RETENTION_ARCHIVE_ACTIVITIES = os.getenv("RETENTION_ARCHIVE_ACTIVITIES", "False").lower() == "true"
+RETENTION_ARCHIVE_SESSIONS = os.getenv("RETENTION_ARCHIVE_SESSIONS", "True").lower() == "true"
+RETENTION_ARCHIVE_DIR_PATH = BASE_DIR / os.getenv("RETENTION_ARCHIVE_DIRECTORY", "archive")
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_SLEEP_MS = int(os.getenv("RETENTION_SLEEP_MS", "100"))
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "0"))
+RESUMABLE_UPLOAD_TTL_HOURS = float(os.getenv("RESUMABLE_UPLOAD_TTL_HOURS", "24"))
+READER_PAGE_CHARS = int(os.getenv("READER_PAGE_CHARS", "2000"))
 ALLOWED_EXTENSIONS = os.getenv("ALLOWED_EXTENSIONS", "pdf,epub,html,txt").split(",")
 
 DB_ECHO = os.getenv("DB_ECHO", "False").lower() == "true"
 DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
-DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
\ No newline at end of file
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+CATALOG_COUNT_CACHE_TTL = int(os.getenv("CATALOG_COUNT_CACHE_TTL", "60"))
+CATALOG_COUNT_CACHE_SIZE = int(os.getenv("CATALOG_COUNT_CACHE_SIZE", "1024"))
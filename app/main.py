@@ -12,6 +12,14 @@ from app.api.stats import router as stats_router
 from app.api.user_library import router as library_router
 from app.api.import_export import router as import_export_router 
 from app.config import DEBUG, UPLOAD_DIR_PATH, ALLOWED_ORIGINS
+from app.database import SessionLocal
+from app.services.gutendex import gutendex_service
+from app.services.gutenberg_mirror import gutenberg_mirror_service
+from app.services.metadata import COVER_DIRECTORY, metadata_service
+from app.services.content_index import content_index_service
+from app.services.import_jobs import import_job_service
+from app.services.activity import activity_service
+from app.services.retention import retention_service
 
 app = FastAPI(
     title="OwnLib API",
@@ -20,6 +28,9 @@ app = FastAPI(
     debug=DEBUG
 )
 
+# Background work opens its own sessions from this factory; tests point it at their database
+app.state.session_factory = SessionLocal
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -29,7 +40,13 @@ app.add_middleware(
 )
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR_PATH)), name="uploads")
+# Only extracted covers are public; book files are served by /api/files/user-books/{id}/content
+(UPLOAD_DIR_PATH / COVER_DIRECTORY).mkdir(parents=True, exist_ok=True)
+app.mount(
+    f"/uploads/{COVER_DIRECTORY}",
+    StaticFiles(directory=str(UPLOAD_DIR_PATH / COVER_DIRECTORY)),
+    name="covers"
+)
 
 app.include_router(auth_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
@@ -41,6 +58,29 @@ app.include_router(library_router, prefix="/api")
 app.include_router(import_export_router, prefix="/api")
 
 
+@app.on_event("startup")
+async def startup_background_services():
+    session_factory = app.state.session_factory
+    await gutendex_service.startup()
+    gutenberg_mirror_service.start_scheduler(session_factory)
+    retention_service.start_scheduler(session_factory)
+    metadata_service.resume_pending(session_factory)
+    content_index_service.resume_unindexed(session_factory)
+    import_job_service.recover_interrupted(session_factory)
+    activity_service.ensure_rollups(session_factory)
+
+
+@app.on_event("shutdown")
+async def shutdown_background_services():
+    await gutenberg_mirror_service.stop_scheduler()
+    await retention_service.stop_scheduler()
+    await gutendex_service.shutdown()
+    metadata_service.shutdown()
+    content_index_service.shutdown()
+    import_job_service.shutdown()
+    activity_service.shutdown()
+
+
 from fastapi.responses import FileResponse
 
 @app.get("/")
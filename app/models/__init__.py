@@ -1,7 +1,10 @@
 from app.models.user import User
 from app.models.book import Book, BookFormat, UserBook
 from app.models.reading import ReadingSession
-from app.models.activity import UserActivity
+from app.models.activity import UserActivity, ActivityRollup
+from app.models.file import FileBlob
+from app.models.content import ContentDocument, ContentPosting
+from app.models.import_job import ImportJob
 
 __all__ = [
     "User", 
@@ -9,5 +12,10 @@ __all__ = [
     "BookFormat", 
     "UserBook", 
     "ReadingSession",
-    "UserActivity"
+    "UserActivity",
+    "ActivityRollup",
+    "FileBlob",
+    "ContentDocument",
+    "ContentPosting",
+    "ImportJob"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, ForeignKey, JSON, Enum, Index
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -7,6 +7,9 @@ from app.database import Base
 
 class UserActivity(Base):
     __tablename__ = "user_activities"
+    __table_args__ = (
+        Index("ix_user_activities_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -31,4 +34,14 @@ class UserActivity(Base):
     created_at = Column(DateTime, nullable=False, default=datetime.now)
 
     user = relationship("User", back_populates="activities")
-    book = relationship("Book", back_populates="activities")
\ No newline at end of file
+    book = relationship("Book", back_populates="activities")
+
+class ActivityRollup(Base):
+    """Number of activities of one type per user and hour; kept when raw activities are purged"""
+    __tablename__ = "activity_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    hour = Column(SmallInteger, primary_key=True)
+    activity_type = Column(UserActivity.__table__.c.activity_type.type, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
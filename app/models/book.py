@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, DateTime, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, Text, ForeignKey, Enum, DateTime, Boolean, Index, DDL, event
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -6,19 +6,55 @@ from app.database import Base
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        Index(
+            "ix_books_fulltext", "title", "author", "description", mysql_prefix="FULLTEXT"
+        ).ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String(256), nullable=False)
     author = Column(String(256), nullable=True)
     description = Column(Text, nullable=True)
     language = Column(String(32), nullable=True)
-    gutenberg_id = Column(Integer, nullable=True)
+    gutenberg_id = Column(Integer, nullable=True, index=True)
     cover_url = Column(Text, nullable=True)
+    metadata_status = Column(Enum("pending", "ready", "failed", name="metadata_status_enum"), nullable=True)
 
     formats = relationship("BookFormat", back_populates="book", cascade="all, delete")
     user_books = relationship("UserBook", back_populates="book", cascade="all, delete")
     activities = relationship("UserActivity", back_populates="book")
 
+
+# SQLite has no FULLTEXT indexes, so the catalog is mirrored into an FTS5
+# table that triggers keep in sync with every write to "books".
+BOOKS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    "title, author, description, content='books', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, author, description) "
+    "VALUES (new.id, new.title, new.author, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author, description) "
+    "VALUES ('delete', old.id, old.title, old.author, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author, description) "
+    "VALUES ('delete', old.id, old.title, old.author, old.description); "
+    "INSERT INTO books_fts(rowid, title, author, description) "
+    "VALUES (new.id, new.title, new.author, new.description); END",
+]
+
+for statement in BOOKS_FTS_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(
+    Book.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite")
+)
+
+
 class BookFormat(Base):
     __tablename__ = "book_formats"
 
@@ -26,12 +62,19 @@ class BookFormat(Base):
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
     format_type = Column(Enum("pdf", "epub", "html", "text", name="format_type_enum"), nullable=False)
     url = Column(Text, nullable=False)
+    page_count = Column(Integer, nullable=True)
+    file_size = Column(BigInteger, nullable=True)
 
     book = relationship("Book", back_populates="formats")
 
 
 class UserBook(Base):
     __tablename__ = "user_books"
+    __table_args__ = (
+        Index("ux_user_books_user_book", "user_id", "book_id", unique=True),
+        Index("ix_user_books_user_status", "user_id", "status"),
+        Index("ix_user_books_user_added", "user_id", "added_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -44,4 +87,4 @@ class UserBook(Base):
 
     user = relationship("User", back_populates="books")
     book = relationship("Book", back_populates="user_books")
-    reading_sessions = relationship("ReadingSession", back_populates="user_book", cascade="all, delete")
\ No newline at end of file
+    reading_sessions = relationship("ReadingSession", back_populates="user_book", cascade="all, delete")
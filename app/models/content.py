@@ -0,0 +1,41 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, LargeBinary, Index
+from sqlalchemy.dialects import mysql
+
+from app.database import Base
+
+
+# Terms are compared byte for byte, so "resume" and "résumé" stay separate keys on MySQL
+TERM_TYPE = String(64).with_variant(mysql.VARCHAR(64, charset="utf8mb4", collation="utf8mb4_bin"), "mysql")
+
+# A MySQL BLOB stops at 64 KB, less than the positions of a common term in a long book
+POSITIONS_TYPE = LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql")
+
+
+class ContentDocument(Base):
+    """
+    A UserBook whose file text is in the content index, with the token position where each page starts.
+    Books that could not be indexed keep a row with the error, so they are not queued again.
+    """
+    __tablename__ = "content_documents"
+
+    user_book_id = Column(Integer, ForeignKey("user_books.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_count = Column(Integer, nullable=False)
+    page_starts = Column(POSITIONS_TYPE, nullable=False)
+    indexed_at = Column(DateTime, nullable=False, default=datetime.now)
+    error = Column(Text, nullable=True)
+
+
+class ContentPosting(Base):
+    """Positions of one term in one UserBook, stored as varint-encoded gaps"""
+    __tablename__ = "content_postings"
+    __table_args__ = (
+        Index("ix_content_postings_user_term", "user_id", "term"),
+    )
+
+    user_book_id = Column(Integer, ForeignKey("user_books.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(TERM_TYPE, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    frequency = Column(Integer, nullable=False)
+    positions = Column(POSITIONS_TYPE, nullable=False)
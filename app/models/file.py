@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime
+
+from app.database import Base
+
+
+class FileBlob(Base):
+    """Uploaded file content stored once per SHA-256 and shared by every UserBook pointing at path"""
+    __tablename__ = "file_blobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    path = Column(String(255), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Enum
+
+from app.database import Base
+
+
+class ImportJob(Base):
+    """A library import running in the background; counts are final once it has finished"""
+    __tablename__ = "import_jobs"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(
+        Enum("queued", "running", "completed", "failed", name="import_job_status_enum"),
+        nullable=False,
+        default="queued"
+    )
+    mode = Column(String(16), nullable=False, default="replace")
+    filename = Column(String(255), nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -8,7 +8,7 @@ class ReadingSession(Base):
     __tablename__ = "reading_sessions"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_book_id = Column(Integer, ForeignKey("user_books.id", ondelete="CASCADE"), nullable=False)
+    user_book_id = Column(Integer, ForeignKey("user_books.id", ondelete="CASCADE"), nullable=False, index=True)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=True)
     pages_read = Column(Integer, nullable=True)
@@ -2,7 +2,8 @@ from app.schemas.user import User, UserCreate, UserUpdate, UserInDB, Token, Toke
 from app.schemas.book import (
     Book, BookCreate, BookUpdate, BookInDB,
     BookFormatInDB as BookFormat, BookFormatCreate, BookFormatUpdate,
-    UserBook, UserBookCreate, UserBookUpdate, UserBookInDB
+    UserBook, UserBookCreate, UserBookUpdate, UserBookInDB,
+    GutenbergBatchImport
 )
 from app.schemas.reading import (
     ReadingSession, ReadingSessionCreate, ReadingSessionUpdate, ReadingSessionInDB,
@@ -14,6 +15,7 @@ __all__ = [
     "Book", "BookCreate", "BookUpdate", "BookInDB",
     "BookFormat", "BookFormatCreate", "BookFormatUpdate", "BookFormatInDB",
     "UserBook", "UserBookCreate", "UserBookUpdate", "UserBookInDB",
+    "GutenbergBatchImport",
     "ReadingSession", "ReadingSessionCreate", "ReadingSessionUpdate", "ReadingSessionInDB",
     "ReadingStat", "ReadingProgress"
 ]
\ No newline at end of file
@@ -21,6 +21,8 @@ class BookFormatUpdate(BaseModel):
 class BookFormatInDB(BookFormatBase):
     id: int
     book_id: int
+    page_count: Optional[int] = None
+    file_size: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -50,6 +52,7 @@ class BookUpdate(BaseModel):
 
 class BookInDB(BookBase):
     id: int
+    metadata_status: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -94,4 +97,8 @@ class UserBookInDB(BaseModel):
 
 
 class UserBook(UserBookInDB):
-    book: Book
\ No newline at end of file
+    book: Book
+
+
+class GutenbergBatchImport(BaseModel):
+    gutenberg_ids: List[int] = Field(..., min_length=1)
@@ -1,40 +1,212 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Any, Tuple
 
-from sqlalchemy import func, desc
+from fastapi import HTTPException, status
+from sqlalchemy import and_, bindparam, delete, event, func, desc, insert, or_, update
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
-from app.models import UserActivity, User, Book
+from app.config import ACTIVITY_FLUSH_INTERVAL_MS, ACTIVITY_FLUSH_SIZE, ACTIVITY_WRITE_BEHIND
+from app.database import SessionLocal
+from app.models import ActivityRollup, UserActivity, UserBook, User, Book
+from app.services.retention import RetentionPolicy, retention_service
+from app.utils.sql import hour_of, increment_counts
+
+ROLLUP_KEY = ("user_id", "day", "hour", "activity_type")
+ROLLUP_BATCH_SIZE = 1000
+ACTIVITY_TYPES = set(UserActivity.__table__.c.activity_type.type.enums)
 
 
 class ActivityService:
-    """Service for working with user activity"""
-    
-    @staticmethod
+    """
+    Service for working with user activity. Events are buffered in memory and
+    written behind the request by a flusher thread in multi-row inserts, every
+    flush_size events or flush_interval_ms milliseconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        write_behind: bool = ACTIVITY_WRITE_BEHIND,
+        flush_size: int = ACTIVITY_FLUSH_SIZE,
+        flush_interval_ms: int = ACTIVITY_FLUSH_INTERVAL_MS
+    ):
+        self.write_behind = write_behind
+        self.flush_size = max(flush_size, 1)
+        self.flush_interval = flush_interval_ms / 1000
+        self._pending: Dict[Engine, List[Dict[str, Any]]] = {}
+        self._pending_count = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopping = False
+
     def log_activity(
+        self,
         db: Session,
         user_id: int,
         activity_type: str,
         book_id: Optional[int] = None,
-        details: Optional[Dict[str, Any]] = None
-    ) -> UserActivity:
-        """Logging of user activity"""
-        activity = UserActivity(
-            user_id=user_id,
-            activity_type=activity_type,
-            book_id=book_id,
-            details=details,
-            created_at=datetime.now()
-        )
-        
-        db.add(activity)
-        db.commit()
-        db.refresh(activity)
-        
-        return activity
-    
+        details: Optional[Dict[str, Any]] = None,
+        sync: bool = False
+    ) -> Optional[UserActivity]:
+        """
+        Logging of user activity. The event is queued and None is returned;
+        with sync=True it is committed at once and the stored row is returned.
+        """
+        if activity_type not in ACTIVITY_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown activity type: {activity_type}"
+            )
+
+        if sync or not self.write_behind:
+            activity = UserActivity(
+                user_id=user_id,
+                activity_type=activity_type,
+                book_id=book_id,
+                details=details,
+                created_at=datetime.now()
+            )
+
+            db.add(activity)
+            db.commit()
+            db.refresh(activity)
+
+            return activity
+
+        row = {
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "book_id": book_id,
+            "details": details,
+            "created_at": datetime.now()
+        }
+        with self._condition:
+            self._pending.setdefault(db.get_bind(), []).append(row)
+            self._pending_count += 1
+            self._start_flusher()
+            if self._pending_count >= self.flush_size:
+                self._condition.notify()
+        return None
+
+    @staticmethod
+    def validate_activity(db: Session, user_id: int, activity_type: Any, book_id: Any = None) -> None:
+        """
+        Checks an activity sent by a client before it is queued, since queued
+        events can no longer be rejected: a known type and a book in the user's collection.
+        """
+        if activity_type not in ACTIVITY_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown activity type: {activity_type}"
+            )
+        if book_id is None:
+            return
+        if not isinstance(book_id, int) or isinstance(book_id, bool):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="book_id must be an integer"
+            )
+        if db.query(UserBook.id).filter(UserBook.user_id == user_id, UserBook.book_id == book_id).first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="The book was not found in your collection"
+            )
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stopping = False
+            self._flusher = threading.Thread(target=self._run_flusher, name="activity-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            with self._condition:
+                if self._pending_count < self.flush_size and not self._stopping:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self, bind: Optional[Engine] = None) -> int:
+        """Writes the queued events, or only those of one database; returns how many were stored"""
+        with self._flush_lock:
+            with self._condition:
+                if bind is None:
+                    pending, self._pending = self._pending, {}
+                else:
+                    pending = {bind: self._pending.pop(bind)} if bind in self._pending else {}
+                self._pending_count -= sum(len(rows) for rows in pending.values())
+
+            stored = 0
+            for engine, rows in pending.items():
+                stored += self._write_rows(engine, rows)
+            return stored
+
+    @staticmethod
+    def _write_rows(bind: Engine, rows: List[Dict[str, Any]]) -> int:
+        try:
+            ActivityService._insert_rows(bind, rows)
+            return len(rows)
+        except Exception as e:
+            print(f"⚠️ Error writing {len(rows)} activities, retrying without the invalid ones: {e}")
+
+        valid = ActivityService._valid_rows(bind, rows)
+        if len(valid) < len(rows):
+            print(f"❌ Dropped {len(rows) - len(valid)} activities of deleted users")
+        try:
+            ActivityService._insert_rows(bind, valid)
+            return len(valid)
+        except Exception as e:
+            print(f"❌ Dropped {len(valid)} activities: {e}")
+            return 0
+
     @staticmethod
+    def _insert_rows(bind: Engine, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        with Session(bind=bind) as db:
+            db.execute(insert(UserActivity), rows)
+            ActivityService.add_to_rollups(db, rows)
+            db.commit()
+
+    @staticmethod
+    def _valid_rows(bind: Engine, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        The rows that can still be stored: events of deleted users are dropped
+        and books deleted since the event was queued are cleared.
+        """
+        with Session(bind=bind) as db:
+            user_ids = {
+                user_id for user_id, in db.query(User.id).filter(User.id.in_({row["user_id"] for row in rows}))
+            }
+            book_ids = {row["book_id"] for row in rows if row["book_id"] is not None}
+            book_ids = {
+                book_id for book_id, in db.query(Book.id).filter(Book.id.in_(book_ids))
+            } if book_ids else set()
+
+        return [
+            {**row, "book_id": row["book_id"] if row["book_id"] in book_ids else None}
+            for row in rows
+            if row["user_id"] in user_ids
+        ]
+
+    def shutdown(self) -> None:
+        """Stops the flusher after writing every queued event"""
+        with self._condition:
+            flusher = self._flusher
+            self._stopping = True
+            self._condition.notify()
+        if flusher is not None:
+            flusher.join()
+        self._flusher = None
+        self.flush()
+
     def get_user_activities(
+        self,
         db: Session,
         user_id: int,
         days: int = 30,
@@ -42,6 +214,7 @@ class ActivityService:
         limit: int = 50
     ) -> List[UserActivity]:
         """Get user activity for the last N days"""
+        self.flush(db.get_bind())
         start_date = datetime.now() - timedelta(days=days)
         
         query = db.query(UserActivity).filter(
@@ -54,71 +227,149 @@ class ActivityService:
         
         return query.order_by(desc(UserActivity.created_at)).limit(limit).all()
     
-    @staticmethod
     def get_activity_statistics(
+        self,
         db: Session,
         user_id: int,
         days: int = 30
     ) -> Dict[str, Any]:
-        """Get user activity statistics"""
+        """Get user activity statistics, read from the hourly rollups in one scan"""
+        self.flush(db.get_bind())
         start_date = datetime.now() - timedelta(days=days)
-        
-        total_activities = db.query(func.count(UserActivity.id)).filter(
-            UserActivity.user_id == user_id,
-            UserActivity.created_at >= start_date
-        ).scalar() or 0
-        
-        activities_by_type = db.query(
-            UserActivity.activity_type,
-            func.count(UserActivity.id).label('count')
-        ).filter(
-            UserActivity.user_id == user_id,
-            UserActivity.created_at >= start_date
-        ).group_by(UserActivity.activity_type).all()
-        
-        daily_activities = db.query(
-            func.date(UserActivity.created_at).label('date'),
-            func.count(UserActivity.id).label('count')
-        ).filter(
-            UserActivity.user_id == user_id,
-            UserActivity.created_at >= start_date
-        ).group_by(func.date(UserActivity.created_at)).all()
-        
-        hourly_activities = db.query(
-            func.hour(UserActivity.created_at).label('hour'),
-            func.count(UserActivity.id).label('count')
+        start_day = start_date.date()
+
+        by_type: Counter = Counter()
+        by_day: Counter = Counter()
+        by_hour: Counter = Counter()
+        for day, hour, activity_type, count in db.query(
+            ActivityRollup.day, ActivityRollup.hour, ActivityRollup.activity_type, ActivityRollup.count
         ).filter(
-            UserActivity.user_id == user_id,
-            UserActivity.created_at >= start_date
-        ).group_by(func.hour(UserActivity.created_at)).all()
-        
+            ActivityRollup.user_id == user_id,
+            or_(
+                ActivityRollup.day > start_day,
+                and_(ActivityRollup.day == start_day, ActivityRollup.hour >= start_date.hour)
+            )
+        ):
+            by_type[activity_type] += count
+            by_day[day] += count
+            by_hour[hour] += count
+
         return {
-            "total_activities": total_activities,
-            "activities_by_type": {
-                activity_type: count 
-                for activity_type, count in activities_by_type
-            },
+            "total_activities": sum(by_type.values()),
+            "activities_by_type": dict(by_type),
             "daily_activities": [
                 {
-                    "date": date.isoformat() if date else None,
-                    "count": count
+                    "date": day.isoformat(),
+                    "count": by_day[day]
                 }
-                for date, count in daily_activities
+                for day in sorted(by_day)
             ],
             "hourly_activities": {
-                hour: count
-                for hour, count in hourly_activities
+                hour: by_hour[hour]
+                for hour in sorted(by_hour)
             },
             "period_days": days
         }
-    
+
+    @staticmethod
+    def add_to_rollups(db: Session, rows: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        """Adds activities, given as row dicts, to the hourly rollups; the caller commits"""
+        counts: Counter = Counter()
+        for row in rows:
+            created_at = row.get("created_at") or datetime.now()
+            counts[(row["user_id"], created_at.date(), created_at.hour, row["activity_type"])] += sign
+        ActivityService._apply_rollup_counts(db, counts)
+
+    @staticmethod
+    def _apply_rollup_counts(db: Session, counts: Dict[Tuple, int]) -> None:
+        added = [
+            dict(zip(ROLLUP_KEY, key), count=count)
+            for key, count in counts.items() if count > 0 and key[0] is not None
+        ]
+        for start in range(0, len(added), ROLLUP_BATCH_SIZE):
+            increment_counts(db, ActivityRollup.__table__, added[start:start + ROLLUP_BATCH_SIZE], ROLLUP_KEY)
+
+        # Removals only touch existing rows, so rollups of a user deleted in the same flush are not recreated
+        removed = [
+            {**{f"key_{column}": value for column, value in zip(ROLLUP_KEY, key)}, "amount": -count}
+            for key, count in counts.items() if count < 0
+        ]
+        if removed:
+            table = ActivityRollup.__table__
+            db.execute(
+                update(table).where(
+                    *(table.c[column] == bindparam(f"key_{column}") for column in ROLLUP_KEY)
+                ).values(count=table.c.count - bindparam("amount")),
+                removed
+            )
+            db.execute(delete(table).where(
+                table.c.user_id.in_({row["key_user_id"] for row in removed}),
+                table.c.count <= 0
+            ))
+
+    @staticmethod
+    def _grouped_counts(db: Session, *criteria) -> Dict[Tuple, int]:
+        """Raw activities matching the criteria counted per rollup key"""
+        day = func.date(UserActivity.created_at)
+        hour = hour_of(db, UserActivity.created_at)
+        counts = {}
+        for user_id, activity_day, activity_hour, activity_type, count in db.query(
+            UserActivity.user_id, day, hour, UserActivity.activity_type, func.count(UserActivity.id)
+        ).filter(*criteria).group_by(UserActivity.user_id, day, hour, UserActivity.activity_type):
+            if isinstance(activity_day, str):
+                activity_day = date.fromisoformat(activity_day)
+            counts[(user_id, activity_day, int(activity_hour), activity_type)] = count
+        return counts
+
     @staticmethod
+    def remove_from_rollups(db: Session, *criteria) -> None:
+        """
+        Subtracts the raw activities matching the criteria from the rollups, before
+        they are deleted as part of the user's data; the caller commits.
+        """
+        counts = ActivityService._grouped_counts(db, *criteria)
+        ActivityService._apply_rollup_counts(db, {key: -count for key, count in counts.items()})
+
+    def ensure_rollups(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Builds the rollups at startup when they are empty but activities exist, e.g. after an upgrade"""
+        db = session_factory()
+        try:
+            if db.query(ActivityRollup.user_id).first() is not None or db.query(UserActivity.id).first() is None:
+                return 0
+            return self.rebuild_rollups(db)
+        except Exception as e:
+            print(f"Error building activity rollups: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def rebuild_rollups(self, db: Session, user_id: Optional[int] = None) -> int:
+        """
+        Recomputes the rollups from the raw activities, for one user or everyone.
+        Hours whose raw activities were purged by retention are lost.
+        """
+        self.flush(db.get_bind())
+        criteria = [UserActivity.user_id == user_id] if user_id is not None else []
+        try:
+            rollup_filter = [ActivityRollup.user_id == user_id] if user_id is not None else []
+            db.execute(delete(ActivityRollup).where(*rollup_filter))
+            counts = self._grouped_counts(db, *criteria)
+            self._apply_rollup_counts(db, counts)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"📊 Rebuilt {len(counts)} activity rollups")
+        return len(counts)
+    
     def get_recent_book_activities(
+        self,
         db: Session,
         user_id: int,
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """Get recent activity with books"""
+        self.flush(db.get_bind())
         activities = db.query(UserActivity).join(
             Book, UserActivity.book_id == Book.id, isouter=True
         ).filter(
@@ -145,15 +396,25 @@ class ActivityService:
         db: Session,
         days_to_keep: int = 365
     ) -> int:
-        """Delete old activity records"""
-        cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-        
-        deleted = db.query(UserActivity).filter(
-            UserActivity.created_at < cutoff_date
-        ).delete()
-        
-        db.commit()
-        return deleted
+        """
+        Delete old activity records in batches; their hourly rollups are kept.
+        Runs without the pause between batches, since the caller waits for it.
+        """
+        policy = RetentionPolicy("user_activities", UserActivity, "created_at", days_to_keep, False)
+        return retention_service.purge_table(db, policy, sleep_ms=0)["deleted"]
+
+
+@event.listens_for(Session, "after_flush")
+def _update_activity_rollups(session: Session, flush_context) -> None:
+    """Keeps the rollups in step with activities added or deleted through the ORM"""
+    counts: Counter = Counter()
+    for sign, objects in ((1, session.new), (-1, session.deleted)):
+        for activity in objects:
+            if isinstance(activity, UserActivity) and activity.user_id is not None:
+                created_at = activity.created_at or datetime.now()
+                counts[(activity.user_id, created_at.date(), created_at.hour, activity.activity_type)] += sign
+    if counts:
+        ActivityService._apply_rollup_counts(session, counts)
 
 
 activity_service = ActivityService()
\ No newline at end of file
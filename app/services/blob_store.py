@@ -0,0 +1,197 @@
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import FileBlob, UserBook
+from app.services.metadata import metadata_service
+from app.utils.book_pages import PAGES_DIRECTORY, page_index_key, remove_page_index
+from app.utils.files import (
+    BLOB_DIRECTORY,
+    STAGING_DIRECTORY,
+    blob_relative_path,
+    get_file_path,
+    place_blob,
+    remove_file
+)
+
+STALE_STAGING_SECONDS = 24 * 60 * 60
+ADJUST_BATCH_SIZE = 500
+
+
+class BlobStoreService:
+    """
+    Content-addressed storage for uploaded book files.
+    Identical uploads share one blob; the blob file is deleted once
+    the last UserBook referencing it is gone.
+    """
+
+    @staticmethod
+    def add_reference(
+        db: Session,
+        staged_path: Path,
+        sha256: str,
+        size: int,
+        extension: str = ""
+    ) -> FileBlob:
+        """
+        Stores a staged upload (or discards it if the content is already stored)
+        and takes a reference on the blob. The caller commits.
+        """
+        blob = db.query(FileBlob).filter(FileBlob.sha256 == sha256).first()
+        if blob is None:
+            try:
+                with db.begin_nested():
+                    blob = FileBlob(
+                        sha256=sha256,
+                        path=blob_relative_path(sha256, extension),
+                        size=size,
+                        ref_count=0
+                    )
+                    db.add(blob)
+            except IntegrityError:
+                blob = db.query(FileBlob).filter(FileBlob.sha256 == sha256).one()
+
+        place_blob(staged_path, blob.path)
+
+        db.query(FileBlob).filter(FileBlob.id == blob.id).update(
+            {FileBlob.ref_count: FileBlob.ref_count + 1}, synchronize_session=False
+        )
+        db.refresh(blob)
+        return blob
+
+    @staticmethod
+    def release(db: Session, relative_path: str) -> bool:
+        """
+        Drops one reference to the file at relative_path.
+        The blob row is deleted when its count reaches zero and the file itself
+        once that is committed. Files uploaded before the blob store are removed directly.
+        Returns True if the blob or file was reclaimed.
+        """
+        blob = db.query(FileBlob.id).filter(FileBlob.path == relative_path).first()
+        if blob is None:
+            remove_page_index(get_file_path(PAGES_DIRECTORY), page_index_key(relative_path))
+            metadata_service.remove_cover(relative_path)
+            return remove_file(relative_path)
+
+        db.query(FileBlob).filter(FileBlob.id == blob.id).update(
+            {FileBlob.ref_count: FileBlob.ref_count - 1}, synchronize_session=False
+        )
+        reclaimed = db.query(FileBlob).filter(
+            FileBlob.id == blob.id,
+            FileBlob.ref_count <= 0
+        ).delete(synchronize_session=False)
+
+        if reclaimed:
+            db.info.setdefault("reclaimed_blobs", set()).add(relative_path)
+        return bool(reclaimed)
+
+    @staticmethod
+    def adjust_references(db: Session, changes: Dict[str, int]) -> int:
+        """
+        Applies reference count changes by blob path, for bulk writes to user_books
+        that bypass release. Paths that are not blobs are ignored; blobs left without
+        references are reclaimed as in release. Returns the number of reclaimed blobs.
+        """
+        by_change: Dict[int, List[str]] = {}
+        for relative_path, change in changes.items():
+            if change:
+                by_change.setdefault(change, []).append(relative_path)
+
+        paths = []
+        for change, change_paths in by_change.items():
+            for start in range(0, len(change_paths), ADJUST_BATCH_SIZE):
+                chunk = change_paths[start:start + ADJUST_BATCH_SIZE]
+                db.query(FileBlob).filter(FileBlob.path.in_(chunk)).update(
+                    {FileBlob.ref_count: FileBlob.ref_count + change}, synchronize_session=False
+                )
+                paths.extend(chunk)
+
+        reclaimed = []
+        for start in range(0, len(paths), ADJUST_BATCH_SIZE):
+            reclaimed.extend(
+                relative_path for relative_path, in db.query(FileBlob.path).filter(
+                    FileBlob.path.in_(paths[start:start + ADJUST_BATCH_SIZE]),
+                    FileBlob.ref_count <= 0
+                )
+            )
+        for start in range(0, len(reclaimed), ADJUST_BATCH_SIZE):
+            db.query(FileBlob).filter(
+                FileBlob.path.in_(reclaimed[start:start + ADJUST_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+
+        if reclaimed:
+            db.info.setdefault("reclaimed_blobs", set()).update(reclaimed)
+        return len(reclaimed)
+
+    @staticmethod
+    def reconcile(db: Session) -> Dict[str, int]:
+        """
+        Recounts references from user_books, reclaims unreferenced blobs and deletes
+        blob files without a row and stale staged uploads.
+        """
+        references = dict(
+            db.query(UserBook.file_path, func.count(UserBook.id)).filter(
+                UserBook.file_path.like(f"{BLOB_DIRECTORY}/%")
+            ).group_by(UserBook.file_path).all()
+        )
+
+        recounted = 0
+        reclaimed = 0
+        known_paths = set()
+        for blob in db.query(FileBlob).yield_per(1000):
+            ref_count = references.get(blob.path, 0)
+            if ref_count == 0:
+                db.delete(blob)
+                db.info.setdefault("reclaimed_blobs", set()).add(blob.path)
+                reclaimed += 1
+                continue
+            known_paths.add(blob.path)
+            if blob.ref_count != ref_count:
+                blob.ref_count = ref_count
+                recounted += 1
+        db.commit()
+
+        blob_root = get_file_path(BLOB_DIRECTORY)
+        stale_before = time.time() - STALE_STAGING_SECONDS
+        if blob_root.exists():
+            for file_path in blob_root.rglob("*"):
+                if not file_path.is_file():
+                    continue
+                relative_path = file_path.relative_to(blob_root.parent).as_posix()
+                if file_path.parent.name == STAGING_DIRECTORY:
+                    if file_path.stat().st_mtime >= stale_before:
+                        continue
+                elif relative_path in known_paths:
+                    continue
+                try:
+                    file_path.unlink()
+                    reclaimed += 1
+                    print(f"Deleted an orphan blob: {relative_path}")
+                except Exception as e:
+                    print(f"Blob deletion error {relative_path}: {e}")
+
+        return {"recounted": recounted, "reclaimed": reclaimed}
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_reclaimed_blobs(session: Session) -> None:
+    for relative_path in session.info.pop("reclaimed_blobs", ()):
+        try:
+            remove_page_index(get_file_path(PAGES_DIRECTORY), page_index_key(relative_path))
+            metadata_service.remove_cover(relative_path)
+            if remove_file(relative_path):
+                print(f"Deleted an unreferenced blob: {relative_path}")
+        except Exception as e:
+            print(f"Blob deletion error {relative_path}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_reclaimed_blobs(session: Session) -> None:
+    session.info.pop("reclaimed_blobs", None)
+
+
+blob_store_service = BlobStoreService()
@@ -1,13 +1,21 @@
+import asyncio
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
-from sqlalchemy import and_, or_, func, desc, asc
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, func, desc, asc, insert
 from sqlalchemy.orm import Session, joinedload
 
-from app.models import Book, BookFormat, UserBook, User
+from app.config import GUTENBERG_IMPORT_CONCURRENCY
+from app.models import Book, BookFormat, UserBook, User, UserActivity
 from app.schemas import BookCreate, BookFormatCreate, UserBookCreate
 from app.services.gutendex import gutendex_service as gutenberg_service
 from app.services.activity import activity_service
+from app.services.blob_store import blob_store_service
+from app.services.search import apply_search
+from app.services.catalog_count import catalog_count_service
+from app.services.gutenberg_mirror import gutenberg_mirror_service
+from app.utils.pagination import encode_cursor, decode_cursor, fetch_page
 
 class BookService:
     """Service for working with books"""
@@ -44,22 +52,28 @@ class BookService:
         language: Optional[str] = None,
         author: Optional[str] = None,
         sort_by: str = "title",
-        sort_order: str = "asc"
+        sort_order: str = "asc",
+        search_mode: str = "natural",
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        count_mode: str = "cached"
     ) -> Dict[str, Any]:
-        """Get a catalog of books with search, filtering, and sorting"""
+        """
+        Get a catalog of books with search, filtering, and sorting.
+        Pages either by offset (skip) or by an opaque keyset cursor
+        returned as next_cursor, which costs the same for every page.
+        The total is counted exactly, served from the count cache or,
+        for unfiltered listings, estimated from table statistics (count_mode).
+        """
         
         from sqlalchemy.orm import joinedload
         query = db.query(Book).options(joinedload(Book.formats))
         
         filters = []
+        relevance = None
         
         if search:
-            search_filter = or_(
-                Book.title.ilike(f"%{search}%"),
-                Book.author.ilike(f"%{search}%"),
-                Book.description.ilike(f"%{search}%")
-            )
-            filters.append(search_filter)
+            query, relevance = apply_search(db, query, search, search_mode)
         
         if language:
             filters.append(Book.language == language)
@@ -70,15 +84,48 @@ class BookService:
         if filters:
             query = query.filter(and_(*filters))
         
-        total_count = query.count()
+        total_count = None
+        total_is_estimate = False
+        if include_total:
+            count_key = catalog_count_service.cache_key(db, search, search_mode, language, author)
+            total_count, total_is_estimate = catalog_count_service.get_total(
+                db, query, count_key, count_mode
+            )
         
-        sort_column = getattr(Book, sort_by, Book.title)
-        if sort_order.lower() == "desc":
-            query = query.order_by(desc(sort_column))
+        descending = sort_order.lower() == "desc"
+        if sort_by == "relevance" and relevance is not None:
+            if cursor:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cursor pagination is not available when sorting by relevance"
+                )
+            sort_column = None
+            query = query.order_by(desc(relevance), desc(Book.id))
         else:
-            query = query.order_by(asc(sort_column))
+            if sort_by not in Book.__table__.columns:
+                sort_by = "title"
+            sort_column = getattr(Book, sort_by)
+            if descending:
+                query = query.order_by(desc(sort_column), desc(Book.id))
+            else:
+                query = query.order_by(asc(sort_column), asc(Book.id))
+        
+        cursor_key = f"{sort_by}:{sort_order.lower()}"
+        cursor_position = decode_cursor(cursor, cursor_key) if cursor else None
+        books, has_next = fetch_page(
+            query,
+            limit,
+            skip=skip,
+            cursor_position=cursor_position,
+            sort_column=sort_column,
+            id_column=Book.id,
+            descending=descending
+        )
         
-        books = query.offset(skip).limit(limit).all()
+        next_cursor = None
+        if has_next and sort_column is not None:
+            last_book = books[-1]
+            next_cursor = encode_cursor(cursor_key, getattr(last_book, sort_by), last_book.id)
         
         books_data = []
         for book in books:
@@ -103,11 +150,13 @@ class BookService:
         return {
             "books": books_data,
             "total": total_count,
-            "page": (skip // limit) + 1,
-            "pages": (total_count + limit - 1) // limit,
+            "total_is_estimate": total_is_estimate,
+            "page": None if cursor else (skip // limit) + 1,
+            "pages": (total_count + limit - 1) // limit if total_count is not None else None,
             "per_page": limit,
-            "has_next": skip + limit < total_count,
-            "has_prev": skip > 0
+            "has_next": has_next,
+            "has_prev": bool(cursor) or skip > 0,
+            "next_cursor": next_cursor
         }
     
     @staticmethod
@@ -243,6 +292,9 @@ class BookService:
             }
         )
         
+        if user_book.is_local and user_book.file_path:
+            blob_store_service.release(db, user_book.file_path)
+        
         db.delete(user_book)
         db.commit()
         return True
@@ -265,12 +317,17 @@ class BookService:
         language: Optional[str] = None,
         author: Optional[str] = None,
         sort_by: str = "title",
-        sort_order: str = "asc"
+        sort_order: str = "asc",
+        search_mode: str = "natural",
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        count_mode: str = "cached"
     ) -> Dict[str, Any]:
         """Get a catalog of books with information about the status in the user's collection"""
         
         catalog = BookService.get_books_catalog(
-            db, skip, limit, search, language, author, sort_by, sort_order
+            db, skip, limit, search, language, author, sort_by, sort_order, search_mode,
+            cursor, include_total, count_mode
         )
         
         book_ids = [book["id"] for book in catalog["books"]]
@@ -333,6 +390,101 @@ class BookService:
             print(f"Error importing a book from Gutenberg: {e}")
             return None
     
+    @staticmethod
+    async def import_books_from_gutenberg(
+        db: Session,
+        gutenberg_ids: List[int],
+        user_id: int
+    ) -> Dict[str, Any]:
+        """
+        Import several books from Gutenberg at once.
+        Ids already in the catalog are found with one IN query, the rest are
+        fetched concurrently (at most GUTENBERG_IMPORT_CONCURRENCY at a time)
+        and written with multi-row inserts in a single transaction.
+        """
+        gutenberg_ids = list(dict.fromkeys(gutenberg_ids))
+        
+        existing = {
+            gutenberg_id: book_id
+            for book_id, gutenberg_id in db.query(Book.id, Book.gutenberg_id).filter(
+                Book.gutenberg_id.in_(gutenberg_ids)
+            )
+        }
+        missing_ids = [gutenberg_id for gutenberg_id in gutenberg_ids if gutenberg_id not in existing]
+        
+        semaphore = asyncio.Semaphore(GUTENBERG_IMPORT_CONCURRENCY)
+        
+        async def fetch(gutenberg_id: int):
+            async with semaphore:
+                try:
+                    return gutenberg_id, await gutenberg_service.get_book_by_id(gutenberg_id), None
+                except Exception as e:
+                    return gutenberg_id, None, str(e) or e.__class__.__name__
+        
+        results = await asyncio.gather(*[fetch(gutenberg_id) for gutenberg_id in missing_ids])
+        
+        mapped_by_id = {}
+        failed = []
+        for gutenberg_id, gutenberg_book, error in results:
+            if error is None:
+                mapped = gutenberg_mirror_service.map_record(gutenberg_book)
+                mapped["book"]["gutenberg_id"] = gutenberg_id
+                mapped_by_id[gutenberg_id] = mapped
+            else:
+                print(f"Error importing a book from Gutenberg: {gutenberg_id}: {error}")
+                failed.append({"gutenberg_id": gutenberg_id, "error": error})
+        
+        imported = []
+        if mapped_by_id:
+            try:
+                db.execute(insert(Book), [mapped["book"] for mapped in mapped_by_id.values()])
+                new_books = db.query(Book.id, Book.gutenberg_id, Book.title, Book.author).filter(
+                    Book.gutenberg_id.in_(list(mapped_by_id))
+                ).all()
+                
+                format_rows = [
+                    {"book_id": book.id, **fmt}
+                    for book in new_books
+                    for fmt in mapped_by_id[book.gutenberg_id]["formats"]
+                ]
+                if format_rows:
+                    db.execute(insert(BookFormat), format_rows)
+                
+                activity_rows = [
+                    {
+                        "user_id": user_id,
+                        "activity_type": "gutenberg_imported",
+                        "book_id": book.id,
+                        "details": {
+                            "gutenberg_id": book.gutenberg_id,
+                            "book_title": book.title,
+                            "book_author": book.author
+                        },
+                        "created_at": datetime.now()
+                    } for book in new_books
+                ]
+                db.execute(insert(UserActivity), activity_rows)
+                activity_service.add_to_rollups(db, activity_rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            
+            catalog_count_service.invalidate()
+            imported = [
+                {"id": book.id, "gutenberg_id": book.gutenberg_id, "title": book.title, "author": book.author}
+                for book in new_books
+            ]
+        
+        return {
+            "imported": imported,
+            "existing": [
+                {"id": existing[gutenberg_id], "gutenberg_id": gutenberg_id}
+                for gutenberg_id in gutenberg_ids if gutenberg_id in existing
+            ],
+            "failed": failed
+        }
+    
     @staticmethod
     def get_book_detail_with_user_status(
         db: Session, 
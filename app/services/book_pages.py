@@ -0,0 +1,96 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.config import READER_PAGE_CHARS
+from app.models import BookFormat, UserBook
+from app.utils.book_pages import (
+    PAGES_DIRECTORY,
+    PAGINATED_EXTENSIONS,
+    build_page_index,
+    page_index_key,
+    page_index_paths,
+    read_index_header,
+    read_page
+)
+from app.utils.files import get_file_path, resolve_upload_path
+
+
+class BookPageService:
+    """Serves uploaded TXT, HTML and EPUB books page by page from a stored page index"""
+
+    @staticmethod
+    def ensure_page_index(db: Session, user_book: UserBook) -> int:
+        """
+        Returns the page count of the book file, paginating it first if it has no
+        index yet or was paginated with a different page size.
+        """
+        pages_dir = get_file_path(PAGES_DIRECTORY)
+        key = page_index_key(user_book.file_path)
+        header = read_index_header(page_index_paths(pages_dir, key)[1])
+        if header is not None and header[1] == READER_PAGE_CHARS:
+            return header[2]
+
+        total_pages = build_page_index(
+            get_file_path(user_book.file_path), pages_dir, key, READER_PAGE_CHARS
+        )
+        db.query(BookFormat).filter(
+            BookFormat.book_id == user_book.book_id,
+            BookFormat.url == user_book.file_path
+        ).update({BookFormat.page_count: total_pages}, synchronize_session=False)
+        db.commit()
+        print(f"📄 Paginated {user_book.file_path} into {total_pages} pages")
+        return total_pages
+
+    @staticmethod
+    def get_page(db: Session, user_book_id: int, user_id: int, page: int) -> Optional[Dict[str, Any]]:
+        """Get one page of a local book; None if the book is not in the user's collection"""
+        user_book = db.query(UserBook).filter(
+            UserBook.id == user_book_id,
+            UserBook.user_id == user_id,
+            UserBook.is_local == True
+        ).first()
+
+        if not user_book or not user_book.file_path:
+            return None
+        file_path = resolve_upload_path(user_book.file_path)
+        if file_path is None or not file_path.is_file():
+            return None
+
+        if Path(user_book.file_path).suffix.lower() not in PAGINATED_EXTENSIONS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Pages are available for TXT, HTML and EPUB books; download PDFs with /content"
+            )
+
+        try:
+            total_pages = BookPageService.ensure_page_index(db, user_book)
+        except Exception as e:
+            print(f"Error paginating {user_book.file_path}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="The book file could not be read"
+            )
+
+        content = read_page(get_file_path(PAGES_DIRECTORY), page_index_key(user_book.file_path), page)
+        if content is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Page {page} does not exist, the book has {total_pages} pages"
+            )
+
+        return {
+            "user_book_id": user_book.id,
+            "book_id": user_book.book_id,
+            "page": page,
+            "total_pages": total_pages,
+            "content": content,
+            "has_next": page < total_pages,
+            "has_prev": page > 1,
+            "bookmark_position": user_book.bookmark_position
+        }
+
+
+book_page_service = BookPageService()
@@ -0,0 +1,123 @@
+from typing import Hashable, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Query, Session, object_session
+
+from app.config import CATALOG_COUNT_CACHE_TTL, CATALOG_COUNT_CACHE_SIZE
+from app.models import Book
+from app.utils.cache import TTLCache
+
+COUNT_MODES = ("exact", "cached", "estimate")
+
+
+class CatalogCountService:
+    """Service for cached and estimated catalog totals"""
+
+    def __init__(self):
+        self.cache = TTLCache(maxsize=CATALOG_COUNT_CACHE_SIZE, ttl=CATALOG_COUNT_CACHE_TTL)
+
+    @staticmethod
+    def cache_key(
+        db: Session,
+        search: Optional[str] = None,
+        search_mode: str = "natural",
+        language: Optional[str] = None,
+        author: Optional[str] = None
+    ) -> Tuple[Hashable, ...]:
+        """Normalized filter tuple identifying a catalog listing"""
+        search = " ".join(search.lower().split()) if search else None
+        author = author.strip().lower() if author else None
+        return (
+            str(db.get_bind().url),
+            search,
+            search_mode if search else None,
+            language or None,
+            author or None
+        )
+
+    @staticmethod
+    def estimate_table_rows(db: Session, table_name: str) -> Optional[int]:
+        """
+        Read the row count from the table statistics instead of scanning the table.
+        Returns None when the database does not keep such statistics.
+        """
+        dialect = db.get_bind().dialect.name
+
+        if dialect == "mysql":
+            rows = db.execute(
+                text(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+                ),
+                {"table_name": table_name}
+            ).scalar()
+            return int(rows) if rows is not None else None
+
+        if dialect == "sqlite":
+            try:
+                stat = db.execute(
+                    text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table_name LIMIT 1"),
+                    {"table_name": table_name}
+                ).scalar()
+            except Exception:
+                return None
+            return int(stat.split()[0]) if stat else None
+
+        return None
+
+    def get_total(
+        self,
+        db: Session,
+        query: Query,
+        key: Tuple[Hashable, ...],
+        count_mode: str = "cached"
+    ) -> Tuple[int, bool]:
+        """
+        Count the rows of a catalog query according to count_mode.
+        Returns the total and whether it is an estimate.
+        """
+        unfiltered = all(part is None for part in key[1:])
+
+        if count_mode == "estimate" and unfiltered:
+            estimate = self.estimate_table_rows(db, Book.__tablename__)
+            if estimate is not None:
+                return estimate, True
+
+        if count_mode == "exact":
+            total = query.count()
+            self.cache.set(key, total)
+            return total, False
+
+        total = self.cache.get(key)
+        if total is None:
+            total = query.count()
+            self.cache.set(key, total)
+        return total, False
+
+    def invalidate(self) -> None:
+        """Forget all cached totals after books were created or deleted"""
+        self.cache.clear()
+
+
+catalog_count_service = CatalogCountService()
+
+
+@event.listens_for(Book, "after_insert")
+@event.listens_for(Book, "after_delete")
+def _mark_catalog_changed(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_catalog_bulk_change(orm_execute_state) -> None:
+    # Bulk INSERT and DELETE statements do not run the mapper events above
+    if (orm_execute_state.is_insert or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is Book.__mapper__:
+        orm_execute_state.session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalog_counts(session: Session) -> None:
+    if session.info.pop("catalog_changed", False):
+        catalog_count_service.invalidate()
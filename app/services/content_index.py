@@ -0,0 +1,309 @@
+import asyncio
+import math
+import multiprocessing
+import threading
+from collections import Counter
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, event, func, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import CONTENT_INDEX_WORKERS, READER_PAGE_CHARS
+from app.database import SessionLocal
+from app.models import Book, ContentDocument, ContentPosting, UserBook
+from app.utils.book_pages import PAGES_DIRECTORY, page_index_key, read_page
+from app.utils.content_index import (
+    decode_varints,
+    index_book_file,
+    make_snippet,
+    page_of,
+    phrase_positions,
+    tokenize
+)
+from app.utils.files import get_file_path
+
+POSTING_BATCH_SIZE = 1000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class ContentIndexService:
+    """
+    Per-user inverted index over the text of uploaded books. Files are tokenized
+    in worker processes; each term of a book becomes one posting row holding
+    its token positions, which answers phrase queries and locates their pages.
+    """
+
+    def __init__(self, workers: int = CONTENT_INDEX_WORKERS):
+        self.workers = workers
+        self._pool: Optional[Executor] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[int, Future] = {}
+        self._jobs_lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.workers > 0:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="content-index")
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="content-index-writer")
+        return self._pool
+
+    def submit(self, db: Session, user_book_id: int, user_id: int, relative_path: str) -> Future:
+        """
+        Queues indexing of a stored UserBook file. Returns a future resolved
+        with True once the postings are written.
+        """
+        with self._jobs_lock:
+            job = self._jobs.get(user_book_id)
+            if job is not None:
+                return job
+            job = Future()
+            self._jobs[user_book_id] = job
+        bind = db.get_bind()
+
+        extraction = self._get_pool().submit(
+            index_book_file,
+            str(get_file_path(relative_path)),
+            str(get_file_path(PAGES_DIRECTORY)),
+            page_index_key(relative_path),
+            READER_PAGE_CHARS
+        )
+        extraction.add_done_callback(
+            lambda done: self._writer.submit(self._write_back, bind, user_book_id, user_id, done, job)
+        )
+        return job
+
+    def _write_back(
+        self,
+        bind: Engine,
+        user_book_id: int,
+        user_id: int,
+        extraction: Future,
+        job: Future
+    ) -> None:
+        indexed = False
+        try:
+            if extraction.cancelled():
+                return
+            index = extraction.result()
+            with Session(bind=bind) as db:
+                if db.get(UserBook, user_book_id) is None:
+                    return
+                self.remove_books(db, [user_book_id])
+                db.add(ContentDocument(
+                    user_book_id=user_book_id,
+                    user_id=user_id,
+                    token_count=index["token_count"],
+                    page_starts=index["page_starts"]
+                ))
+                postings = [
+                    {
+                        "user_book_id": user_book_id,
+                        "user_id": user_id,
+                        "term": term,
+                        "frequency": frequency,
+                        "positions": positions
+                    }
+                    for term, (frequency, positions) in index["postings"].items()
+                ]
+                for start in range(0, len(postings), POSTING_BATCH_SIZE):
+                    db.execute(insert(ContentPosting), postings[start:start + POSTING_BATCH_SIZE])
+                db.commit()
+            indexed = True
+            print(f"🔎 Indexed {len(postings)} terms of user book {user_book_id}")
+        except Exception as e:
+            print(f"Error indexing the content of user book {user_book_id}: {e}")
+            self._mark_failed(bind, user_book_id, user_id, str(e))
+        finally:
+            with self._jobs_lock:
+                self._jobs.pop(user_book_id, None)
+            job.set_result(indexed)
+
+    @staticmethod
+    def _mark_failed(bind: Engine, user_book_id: int, user_id: int, error: str) -> None:
+        """Records that a book could not be indexed; uploading it again retries"""
+        try:
+            with Session(bind=bind) as db:
+                if db.get(UserBook, user_book_id) is None:
+                    return
+                ContentIndexService.remove_books(db, [user_book_id])
+                db.add(ContentDocument(
+                    user_book_id=user_book_id,
+                    user_id=user_id,
+                    token_count=0,
+                    page_starts=b"",
+                    error=error[:1000]
+                ))
+                db.commit()
+        except Exception as e:
+            print(f"Error recording the failed indexing of user book {user_book_id}: {e}")
+
+    @staticmethod
+    def remove_books(db: Session, user_book_ids: List[int]) -> None:
+        """Deletes the postings of the given user books; the caller commits"""
+        if not user_book_ids:
+            return
+        connection = db.connection()
+        connection.execute(delete(ContentPosting).where(ContentPosting.user_book_id.in_(user_book_ids)))
+        connection.execute(delete(ContentDocument).where(ContentDocument.user_book_id.in_(user_book_ids)))
+
+    @staticmethod
+    def search(
+        db: Session,
+        user_id: int,
+        query: str,
+        limit: int = 20,
+        pages_per_book: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Finds the user's books containing the query words as a phrase, ranked with BM25
+        on the number of phrase occurrences, with the first matching pages and snippets.
+        """
+        terms = tokenize(query)
+        if not terms:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The search query contains no words"
+            )
+
+        postings: Dict[int, Dict[str, bytes]] = {}
+        for user_book_id, term, positions in db.query(
+            ContentPosting.user_book_id, ContentPosting.term, ContentPosting.positions
+        ).filter(
+            ContentPosting.user_id == user_id,
+            ContentPosting.term.in_(set(terms))
+        ):
+            postings.setdefault(user_book_id, {})[term] = positions
+
+        matches: Dict[int, List[int]] = {}
+        for user_book_id, book_postings in postings.items():
+            if len(book_postings) < len(set(terms)):
+                continue
+            decoded = {term: decode_varints(positions) for term, positions in book_postings.items()}
+            positions = phrase_positions([decoded[term] for term in terms])
+            if positions:
+                matches[user_book_id] = positions
+
+        if not matches:
+            return {"query": query, "total": 0, "results": []}
+
+        document_count, average_length = db.query(
+            func.count(ContentDocument.user_book_id), func.avg(ContentDocument.token_count)
+        ).filter(ContentDocument.user_id == user_id, ContentDocument.error.is_(None)).one()
+        average_length = float(average_length or 1) or 1.0
+        idf = math.log(1 + (document_count - len(matches) + 0.5) / (len(matches) + 0.5))
+
+        documents = {
+            document.user_book_id: document
+            for document in db.query(ContentDocument).filter(ContentDocument.user_book_id.in_(list(matches)))
+        }
+        scores = {}
+        for user_book_id, positions in matches.items():
+            length_ratio = documents[user_book_id].token_count / average_length
+            frequency = len(positions)
+            scores[user_book_id] = idf * frequency * (BM25_K1 + 1) / (
+                frequency + BM25_K1 * (1 - BM25_B + BM25_B * length_ratio)
+            )
+        ranked = sorted(scores, key=lambda user_book_id: (-scores[user_book_id], user_book_id))[:limit]
+
+        books = {
+            user_book.id: (user_book, book)
+            for user_book, book in db.query(UserBook, Book).join(Book, Book.id == UserBook.book_id).filter(
+                UserBook.id.in_(ranked)
+            )
+        }
+        pages_dir = get_file_path(PAGES_DIRECTORY)
+
+        results = []
+        for user_book_id in ranked:
+            if user_book_id not in books:
+                continue
+            user_book, book = books[user_book_id]
+            page_starts = decode_varints(documents[user_book_id].page_starts)
+            page_counts = Counter(page_of(page_starts, position) for position in matches[user_book_id])
+            key = page_index_key(user_book.file_path or "")
+
+            pages = []
+            for page in sorted(page_counts)[:pages_per_book]:
+                text = read_page(pages_dir, key, page) or ""
+                pages.append({
+                    "page": page,
+                    "matches": page_counts[page],
+                    "snippet": make_snippet(text, terms) or " ".join(text[:160].split())
+                })
+
+            results.append({
+                "user_book_id": user_book.id,
+                "book_id": book.id,
+                "title": book.title,
+                "author": book.author,
+                "score": round(scores[user_book_id], 4),
+                "match_count": len(matches[user_book_id]),
+                "page_count": len(page_counts),
+                "pages": pages
+            })
+
+        return {"query": query, "total": len(matches), "results": results}
+
+    async def wait_for(self, user_book_id: int, timeout: float) -> Optional[bool]:
+        """Waits up to timeout seconds for a queued job; returns whether it indexed the book"""
+        with self._jobs_lock:
+            job = self._jobs.get(user_book_id)
+        if job is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def resume_unindexed(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """
+        Queues local books that have no content index yet, e.g. uploaded before it existed.
+        Books whose indexing failed are not queued again.
+        """
+        db = session_factory()
+        try:
+            unindexed = db.query(UserBook.id, UserBook.user_id, UserBook.file_path).outerjoin(
+                ContentDocument, ContentDocument.user_book_id == UserBook.id
+            ).filter(
+                UserBook.is_local == True,
+                UserBook.file_path.isnot(None),
+                ContentDocument.user_book_id.is_(None)
+            ).all()
+            for user_book_id, user_id, relative_path in unindexed:
+                self.submit(db, user_book_id, user_id, relative_path)
+            if unindexed:
+                print(f"🔎 Queued content indexing for {len(unindexed)} books")
+            return len(unindexed)
+        except Exception as e:
+            print(f"Error queuing content indexing: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        """Stops the workers; unfinished books are queued again on the next start"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+
+@event.listens_for(Session, "before_flush")
+def _remove_deleted_book_content(session: Session, flush_context, instances) -> None:
+    user_book_ids = [obj.id for obj in session.deleted if isinstance(obj, UserBook) and obj.id is not None]
+    ContentIndexService.remove_books(session, user_book_ids)
+
+
+content_index_service = ContentIndexService()
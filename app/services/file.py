@@ -5,10 +5,13 @@ from datetime import datetime
 from fastapi import UploadFile, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.models import Book, BookFormat, User, UserBook, ReadingSession
+from app.models import Book, BookFormat, User, UserBook, ReadingSession, FileBlob
 from app.schemas import BookCreate, BookFormatCreate, UserBookCreate
-from app.utils.files import save_upload_file, get_file_info, remove_file
+from app.utils.files import BLOB_DIRECTORY, resolve_upload_path, save_upload_file
 from app.services.activity import activity_service
+from app.services.blob_store import blob_store_service
+from app.services.content_index import content_index_service
+from app.services.metadata import metadata_service
 
 
 class FileService:
@@ -45,6 +48,7 @@ class FileService:
         """
         Uploads a book file with the required title and language.
         Creates a book record in the database and saves the file.
+        Metadata is extracted in the background; the book stays "pending" until then.
         """
         if not book_title or not book_title.strip():
             raise HTTPException(
@@ -68,18 +72,16 @@ class FileService:
         
         validated_language = FileService.validate_language_code(book_language.strip())
         
-        relative_path, file_path = save_upload_file(file, user.id)
-        
+        staged_path, file_size, file_hash = await save_upload_file(file)
         try:
-            file_info = get_file_info(file_path)
-        except Exception as e:
-            file_info = {
-                "file_extension": f".{file_extension}",
-                "pages": None,
-                "title": None,
-                "author": None
-            }
-            print(f"Error reading a file: {e}")
+            blob = blob_store_service.add_reference(
+                db, staged_path, file_hash, file_size, f".{file_extension}"
+            )
+        except Exception:
+            staged_path.unlink(missing_ok=True)
+            db.rollback()
+            raise
+        relative_path = blob.path
         
         format_mapping = {
             ".pdf": "pdf",
@@ -87,7 +89,7 @@ class FileService:
             ".html": "html",
             ".txt": "text"
         }
-        format_type = format_mapping.get(file_info["file_extension"], "pdf")
+        format_type = format_mapping.get(f".{file_extension}", "pdf")
         
         book_data = {
             "title": book_title.strip(),
@@ -99,7 +101,7 @@ class FileService:
         }
         
         book_in = BookCreate(**book_data)
-        db_book = Book(**book_in.dict())
+        db_book = Book(**book_in.dict(), metadata_status="pending")
         db.add(db_book)
         db.commit()
         db.refresh(db_book)
@@ -115,8 +117,7 @@ class FileService:
                     "book_author": db_book.author,
                     "book_language": db_book.language,
                     "format": format_type,
-                    "file_size": file_info.get("file_size", 0),
-                    "pages": file_info.get("pages")
+                    "file_size": file_size
                 }
             )
         except Exception as e:
@@ -125,7 +126,8 @@ class FileService:
         db_format = BookFormat(
             book_id=db_book.id,
             format_type=format_type,
-            url=relative_path
+            url=relative_path,
+            file_size=file_size
         )
         db.add(db_format)
         
@@ -142,6 +144,9 @@ class FileService:
         db.commit()
         db.refresh(db_user_book)
         
+        metadata_service.submit(db, db_book.id, relative_path)
+        content_index_service.submit(db, db_user_book.id, user.id, relative_path)
+        
         return {
             "book_id": db_book.id,
             "title": db_book.title,
@@ -149,7 +154,10 @@ class FileService:
             "language": db_book.language,
             "format": format_type,
             "file_path": relative_path,
-            "pages": file_info.get("pages"),
+            "pages": None,
+            "metadata_status": db_book.metadata_status,
+            "file_size": file_size,
+            "sha256": file_hash,
             "user_book_id": db_user_book.id
         }
     
@@ -170,13 +178,6 @@ class FileService:
         
         book_id = user_book.book_id
         
-        try:
-            file_removed = remove_file(user_book.file_path)
-            if not file_removed:
-                print(f"Warning: file {user_book.file_path} could not be found to delete")
-        except Exception as e:
-            print(f"Error when deleting a file {user_book.file_path}: {e}")
-        
         reading_sessions = db.query(ReadingSession).filter(
             ReadingSession.user_book_id == user_book_id
         ).all()
@@ -200,6 +201,11 @@ class FileService:
         except Exception as e:
             print(f"Error logging book deletion activity: {e}")
         
+        try:
+            blob_store_service.release(db, user_book.file_path)
+        except Exception as e:
+            print(f"Error when deleting a file {user_book.file_path}: {e}")
+        
         db.delete(user_book)
         
         other_users_with_book = db.query(UserBook).filter(
@@ -281,6 +287,75 @@ class FileService:
             } if user_book.book else None
         }
     
+    @staticmethod
+    def get_user_book_file(db: Session, user_book_id: int, user_id: int) -> Optional[Dict]:
+        """
+        Get the stored file of a user's local book for download.
+        Blobs use their SHA-256 as a strong ETag.
+        """
+        user_book = db.query(UserBook).filter(
+            UserBook.id == user_book_id,
+            UserBook.user_id == user_id,
+            UserBook.is_local == True
+        ).first()
+        
+        if not user_book or not user_book.file_path:
+            return None
+        
+        file_path = resolve_upload_path(user_book.file_path)
+        if file_path is None or not file_path.is_file():
+            return None
+        
+        sha256 = db.query(FileBlob.sha256).filter(FileBlob.path == user_book.file_path).scalar()
+        if sha256 is None and user_book.file_path.startswith(f"{BLOB_DIRECTORY}/"):
+            return None
+        
+        return {
+            "path": file_path,
+            "etag": f'"{sha256}"' if sha256 else None,
+            "filename": f"{user_book.book.title}{file_path.suffix}"
+        }
+    
+    @staticmethod
+    async def get_metadata_status(
+        db: Session,
+        user_book_id: int,
+        user_id: int,
+        wait: float = 0
+    ) -> Optional[Dict]:
+        """
+        Get the metadata extraction status of an uploaded book.
+        With wait > 0 a pending request waits up to that many seconds for the result.
+        """
+        user_book = db.query(UserBook).filter(
+            UserBook.id == user_book_id,
+            UserBook.user_id == user_id
+        ).first()
+        
+        if not user_book:
+            return None
+        
+        book = user_book.book
+        if book.metadata_status == "pending" and wait > 0:
+            await metadata_service.wait_for(book.id, wait)
+            db.refresh(book)
+        
+        local_format = db.query(BookFormat).filter(
+            BookFormat.book_id == book.id,
+            BookFormat.url == user_book.file_path
+        ).first()
+        
+        return {
+            "user_book_id": user_book.id,
+            "book_id": book.id,
+            "metadata_status": book.metadata_status,
+            "title": book.title,
+            "author": book.author,
+            "language": book.language,
+            "cover_url": book.cover_url,
+            "pages": local_format.page_count if local_format else None
+        }
+    
     @staticmethod
     def cleanup_orphaned_books(db: Session) -> int:
         """
@@ -310,6 +385,7 @@ class FileService:
     def cleanup_orphaned_files(db: Session) -> int:
         """
         Clearing orphan files (files without records in the database).
+        Shared blobs are recounted and deleted only when no book references them.
         Returns the number of deleted files.
         """
         from pathlib import Path
@@ -318,7 +394,7 @@ class FileService:
         if not UPLOAD_DIR_PATH.exists():
             return 0
         
-        count = 0
+        count = blob_store_service.reconcile(db)["reclaimed"]
         
         db_files = set()
         user_books = db.query(UserBook).filter(
@@ -0,0 +1,435 @@
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import re
+import tarfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import asc, delete, desc, insert, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import (
+    GUTENBERG_CATALOG_PATH,
+    GUTENBERG_MIRROR_BASE_URL,
+    GUTENBERG_MIRROR_BATCH_SIZE,
+    GUTENBERG_MIRROR_SYNC_HOURS
+)
+from app.models import Book, BookFormat
+from app.services.catalog_count import catalog_count_service
+from app.services.gutendex import gutendex_service
+from app.services.search import apply_search
+
+RDF_NS = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "dcterms": "http://purl.org/dc/terms/",
+    "pgterms": "http://www.gutenberg.org/2009/pgterms/"
+}
+
+SYNC_FIELDS = ("title", "author", "language", "cover_url")
+
+FORMAT_MIME_TYPES = {
+    "pdf": "application/pdf",
+    "epub": "application/epub+zip",
+    "html": "text/html",
+    "text": "text/plain"
+}
+
+
+def _clean_author_name(name: str) -> str:
+    """Drops roles and life dates: 'Shelley, Mary, 1797-1851 [Editor]' -> 'Shelley, Mary'"""
+    name = re.sub(r"\s*\[[^\]]*\]", "", name).strip()
+    return re.sub(r",\s*[^,]*\d[^,]*$", "", name).strip()
+
+
+def _open_text(path: Path) -> io.TextIOBase:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def iter_catalog_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Streams pg_catalog.csv (optionally gzipped) as Gutendex-shaped book records.
+    The CSV has no file list, so format URLs follow the gutenberg.org layout.
+    """
+    base_url = GUTENBERG_MIRROR_BASE_URL.rstrip("/")
+
+    with _open_text(path) as catalog_file:
+        for row in csv.DictReader(catalog_file):
+            if row.get("Type", "Text") != "Text":
+                continue
+            try:
+                gutenberg_id = int(row["Text#"])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            authors = [
+                {"name": _clean_author_name(name)}
+                for name in (row.get("Authors") or "").split(";")
+                if name.strip()
+            ]
+            languages = [lang.strip() for lang in (row.get("Language") or "").split(";") if lang.strip()]
+
+            yield {
+                "id": gutenberg_id,
+                "title": (row.get("Title") or "Unknown title").replace("\n", " ").strip(),
+                "authors": authors,
+                "languages": languages,
+                "formats": {
+                    "application/epub+zip": f"{base_url}/ebooks/{gutenberg_id}.epub3.images",
+                    "text/html": f"{base_url}/ebooks/{gutenberg_id}.html.images",
+                    "text/plain": f"{base_url}/ebooks/{gutenberg_id}.txt.utf-8",
+                    "image/jpeg": f"{base_url}/cache/epub/{gutenberg_id}/pg{gutenberg_id}.cover.medium.jpg"
+                }
+            }
+
+
+def parse_rdf(rdf_file) -> Optional[Dict[str, Any]]:
+    """Parses one pgNNN.rdf file of the catalog dump into a Gutendex-shaped book record"""
+    ebook = ET.parse(rdf_file).getroot().find("pgterms:ebook", RDF_NS)
+    if ebook is None:
+        return None
+
+    about = ebook.get(f"{{{RDF_NS['rdf']}}}about", "")
+    try:
+        gutenberg_id = int(about.rsplit("/", 1)[-1])
+    except ValueError:
+        return None
+
+    book_type = ebook.findtext("dcterms:type/rdf:Description/rdf:value", default="Text", namespaces=RDF_NS)
+    if book_type != "Text":
+        return None
+
+    formats: Dict[str, str] = {}
+    for file_node in ebook.findall("dcterms:hasFormat/pgterms:file", RDF_NS):
+        url = file_node.get(f"{{{RDF_NS['rdf']}}}about")
+        for mime in file_node.findall("dcterms:format/rdf:Description/rdf:value", RDF_NS):
+            mime_type = (mime.text or "").split(";")[0].strip()
+            if url and mime_type and mime_type not in formats:
+                formats[mime_type] = url
+
+    return {
+        "id": gutenberg_id,
+        "title": " ".join((ebook.findtext("dcterms:title", default="Unknown title", namespaces=RDF_NS)).split()),
+        "authors": [
+            {"name": name.text.strip()}
+            for name in ebook.findall("dcterms:creator/pgterms:agent/pgterms:name", RDF_NS)
+            if name.text
+        ],
+        "languages": [
+            lang.text.strip()
+            for lang in ebook.findall("dcterms:language/rdf:Description/rdf:value", RDF_NS)
+            if lang.text
+        ],
+        "formats": formats
+    }
+
+
+def iter_catalog_rdf(path: Path) -> Iterator[Dict[str, Any]]:
+    """Streams the RDF tarball (rdf-files.tar.bz2) without unpacking it to disk"""
+    with tarfile.open(path, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.endswith(".rdf"):
+                continue
+            rdf_file = archive.extractfile(member)
+            if rdf_file is None:
+                continue
+            try:
+                record = parse_rdf(rdf_file)
+            except ET.ParseError as e:
+                print(f"⚠️ Skipping unreadable catalog entry {member.name}: {e}")
+                continue
+            if record is not None:
+                yield record
+
+
+def iter_catalog(path: Path, source_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Streams book records from a catalog dump, detecting its format by file name"""
+    if source_format is None:
+        source_format = "rdf" if ".tar" in path.name or path.suffix in (".tgz", ".bz2") else "csv"
+
+    if source_format == "rdf":
+        return iter_catalog_rdf(path)
+    return iter_catalog_csv(path)
+
+
+def _batched(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class GutenbergMirrorService:
+    """Service for the local mirror of the Project Gutenberg catalog"""
+
+    def __init__(self):
+        self.status: Dict[str, Any] = {
+            "running": False,
+            "source": None,
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        self._scheduler: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def map_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Maps a Gutendex-shaped record exactly as GutenbergService does for API responses"""
+        mapped = gutendex_service.map_gutenberg_to_book(record)
+        book = mapped["book"]
+        book["title"] = book["title"][:256]
+        book["author"] = book["author"][:256]
+        return mapped
+
+    @staticmethod
+    def upsert_batch(db: Session, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Inserts new books, updates changed ones and leaves unchanged rows untouched.
+        Uses one lookup query and multi-row statements per batch.
+        """
+        mapped_by_id = {}
+        for record in records:
+            mapped = GutenbergMirrorService.map_record(record)
+            mapped_by_id[mapped["book"]["gutenberg_id"]] = mapped
+
+        existing = {
+            row.gutenberg_id: row
+            for row in db.query(
+                Book.id, Book.gutenberg_id, Book.title, Book.author, Book.language, Book.cover_url
+            ).filter(Book.gutenberg_id.in_(list(mapped_by_id)))
+        }
+
+        existing_formats: Dict[int, set] = {}
+        if existing:
+            for book_id, format_type, url in db.query(
+                BookFormat.book_id, BookFormat.format_type, BookFormat.url
+            ).filter(BookFormat.book_id.in_([row.id for row in existing.values()])):
+                existing_formats.setdefault(book_id, set()).add((format_type, url))
+
+        new_books = []
+        updated_books = []
+        replaced_formats: Dict[int, set] = {}
+
+        for gutenberg_id, mapped in mapped_by_id.items():
+            formats = {(fmt["format_type"], fmt["url"]) for fmt in mapped["formats"]}
+            row = existing.get(gutenberg_id)
+
+            if row is None:
+                new_books.append(mapped["book"])
+                continue
+
+            if any(getattr(row, field) != mapped["book"][field] for field in SYNC_FIELDS):
+                updated_books.append({
+                    "id": row.id,
+                    **{field: mapped["book"][field] for field in SYNC_FIELDS}
+                })
+            if existing_formats.get(row.id, set()) != formats:
+                replaced_formats[row.id] = formats
+
+        format_rows = []
+
+        if new_books:
+            db.execute(insert(Book), new_books)
+            new_ids = db.query(Book.id, Book.gutenberg_id).filter(
+                Book.gutenberg_id.in_([book["gutenberg_id"] for book in new_books])
+            ).all()
+            for book_id, gutenberg_id in new_ids:
+                for fmt in mapped_by_id[gutenberg_id]["formats"]:
+                    format_rows.append({"book_id": book_id, **fmt})
+
+        if updated_books:
+            db.execute(update(Book), updated_books)
+
+        if replaced_formats:
+            db.execute(
+                delete(BookFormat).where(BookFormat.book_id.in_(list(replaced_formats)))
+            )
+            for book_id, formats in replaced_formats.items():
+                for format_type, url in formats:
+                    format_rows.append({"book_id": book_id, "format_type": format_type, "url": url})
+
+        if format_rows:
+            db.execute(insert(BookFormat), format_rows)
+
+        db.commit()
+
+        changed_ids = {book["id"] for book in updated_books} | set(replaced_formats)
+        return {
+            "created": len(new_books),
+            "updated": len(changed_ids),
+            "unchanged": len(existing) - len(changed_ids)
+        }
+
+    def sync_catalog(
+        self,
+        db: Session,
+        path: Path,
+        source_format: Optional[str] = None,
+        batch_size: int = GUTENBERG_MIRROR_BATCH_SIZE
+    ) -> Dict[str, int]:
+        """Streams a catalog dump into the books tables in batches"""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Catalog dump not found: {path}")
+
+        result = {"processed": 0, "created": 0, "updated": 0, "unchanged": 0}
+
+        try:
+            for batch in _batched(iter_catalog(path, source_format), batch_size):
+                batch_result = self.upsert_batch(db, batch)
+                result["processed"] += len(batch)
+                for key, value in batch_result.items():
+                    result[key] += value
+                print(f"📚 Gutenberg mirror: {result['processed']} records processed")
+        finally:
+            if result["created"]:
+                catalog_count_service.invalidate()
+
+        return result
+
+    def run_sync_job(
+        self,
+        path: Optional[str] = None,
+        source_format: Optional[str] = None,
+        session_factory: Optional[Callable[[], Session]] = None
+    ) -> None:
+        """Runs a sync with its own database session and records the outcome in status"""
+        from app.database import SessionLocal
+
+        session_factory = session_factory or SessionLocal
+
+        path = path or GUTENBERG_CATALOG_PATH
+        if self.status["running"]:
+            print("⚠️ Gutenberg mirror sync is already running")
+            return
+
+        self.status.update({
+            "running": True,
+            "source": path,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "result": None,
+            "error": None
+        })
+
+        db = session_factory()
+        try:
+            self.status["result"] = self.sync_catalog(db, Path(path), source_format)
+        except Exception as e:
+            db.rollback()
+            self.status["error"] = str(e)
+            print(f"❌ Gutenberg mirror sync failed: {e}")
+        finally:
+            db.close()
+            self.status["running"] = False
+            self.status["finished_at"] = datetime.now().isoformat()
+
+    async def _periodic_sync(self, interval_hours: float, session_factory: Optional[Callable[[], Session]]) -> None:
+        while True:
+            await asyncio.to_thread(self.run_sync_job, None, None, session_factory)
+            await asyncio.sleep(interval_hours * 3600)
+
+    def start_scheduler(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        """Starts periodic re-syncs when a catalog path and interval are configured"""
+        if GUTENBERG_CATALOG_PATH and GUTENBERG_MIRROR_SYNC_HOURS > 0 and self._scheduler is None:
+            self._scheduler = asyncio.create_task(
+                self._periodic_sync(GUTENBERG_MIRROR_SYNC_HOURS, session_factory)
+            )
+
+    async def stop_scheduler(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            try:
+                await self._scheduler
+            except asyncio.CancelledError:
+                pass
+            self._scheduler = None
+
+    @staticmethod
+    def search_local(
+        db: Session,
+        search_query: Optional[str] = None,
+        languages: Optional[List[str]] = None,
+        page: int = 1,
+        limit: int = 32
+    ) -> Dict[str, Any]:
+        """
+        Search the mirrored Gutenberg books with the local full-text index.
+        Returns the same shape as GutenbergService.search_books.
+        """
+        query = db.query(Book).options(joinedload(Book.formats)).filter(Book.gutenberg_id.isnot(None))
+
+        relevance = None
+        if search_query:
+            query, relevance = apply_search(db, query, search_query)
+        if languages:
+            query = query.filter(Book.language.in_(languages))
+
+        count = query.count()
+
+        if relevance is not None:
+            query = query.order_by(desc(relevance), asc(Book.gutenberg_id))
+        else:
+            query = query.order_by(asc(Book.gutenberg_id))
+
+        books = query.offset((page - 1) * limit).limit(limit).all()
+
+        results = []
+        for book in books:
+            formats = {FORMAT_MIME_TYPES[fmt.format_type]: fmt.url for fmt in book.formats}
+            if book.cover_url:
+                formats["image/jpeg"] = book.cover_url
+            results.append({
+                "id": book.gutenberg_id,
+                "title": book.title,
+                "authors": [{"name": book.author}] if book.author else [],
+                "languages": [book.language] if book.language else [],
+                "formats": formats
+            })
+
+        return {
+            "count": count,
+            "next": page + 1 if page * limit < count else None,
+            "previous": page - 1 if page > 1 else None,
+            "results": results
+        }
+
+
+gutenberg_mirror_service = GutenbergMirrorService()
+
+
+def main() -> None:
+    """Command line entry point: python -m app.services.gutenberg_mirror <dump>"""
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Ingest the Project Gutenberg catalog dump into the local database")
+    parser.add_argument("path", nargs="?", default=GUTENBERG_CATALOG_PATH, help="pg_catalog.csv[.gz] or rdf-files.tar.bz2")
+    parser.add_argument("--format", choices=["csv", "rdf"], default=None, help="Dump format (detected from the file name by default)")
+    parser.add_argument("--batch-size", type=int, default=GUTENBERG_MIRROR_BATCH_SIZE, help="Rows per bulk statement")
+    args = parser.parse_args()
+
+    if not args.path:
+        parser.error("a catalog path is required (argument or GUTENBERG_CATALOG_PATH)")
+
+    db = SessionLocal()
+    try:
+        result = gutenberg_mirror_service.sync_catalog(db, Path(args.path), args.format, args.batch_size)
+    finally:
+        db.close()
+
+    print(f"✅ Gutenberg mirror synced: {result}")
+
+
+if __name__ == "__main__":
+    main()
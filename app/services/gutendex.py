@@ -1,14 +1,122 @@
-from typing import Dict, List, Optional, Any
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
 import httpx
 
+from app.config import (
+    GUTENBERG_API_URL,
+    GUTENBERG_HTTP2,
+    GUTENBERG_TIMEOUT,
+    GUTENBERG_CONNECT_TIMEOUT,
+    GUTENBERG_MAX_CONNECTIONS,
+    GUTENBERG_MAX_KEEPALIVE_CONNECTIONS,
+    GUTENBERG_KEEPALIVE_EXPIRY,
+    GUTENBERG_CACHE_SIZE,
+    GUTENBERG_SEARCH_CACHE_TTL,
+    GUTENBERG_BOOK_CACHE_TTL,
+    GUTENBERG_CACHE_DIR
+)
 from app.schemas import BookCreate, BookFormatCreate
+from app.utils.cache import DiskCache, TTLCache
+from app.utils.singleflight import SingleFlight
 
 
 class GutenbergService:
     """Service for working with Gutenberg API"""
     
-    def __init__(self):
-        self.base_url = "https://gutendex.com/books/"
+    def __init__(
+        self,
+        base_url: str = GUTENBERG_API_URL,
+        cache_dir: Optional[str] = GUTENBERG_CACHE_DIR
+    ):
+        self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = TTLCache(maxsize=GUTENBERG_CACHE_SIZE, ttl=GUTENBERG_SEARCH_CACHE_TTL)
+        self.disk_cache = DiskCache(Path(cache_dir), ttl=GUTENBERG_BOOK_CACHE_TTL) if cache_dir else None
+        self._inflight = SingleFlight()
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled client shared by all requests to the Gutenberg API"""
+        http2 = GUTENBERG_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("The h2 library is not installed. Gutenberg API requests will use HTTP/1.1.")
+                http2 = False
+        
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(GUTENBERG_TIMEOUT, connect=GUTENBERG_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=GUTENBERG_MAX_CONNECTIONS,
+                max_keepalive_connections=GUTENBERG_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GUTENBERG_KEEPALIVE_EXPIRY
+            )
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use if the app did not start it"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+    
+    async def startup(self) -> None:
+        """Open the shared client (called on application startup)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+    
+    async def shutdown(self) -> None:
+        """Close the shared client and its pooled connections (called on application shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _cached(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Return a response from the memory cache, then the disk cache,
+        and only call the Gutenberg API when neither has a fresh copy.
+        Concurrent misses for the same key share a single upstream call.
+        """
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        
+        return await self._inflight.do(key, lambda: self._load(key, ttl, fetch))
+    
+    async def _load(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Load a response missing from the memory cache (one call per key at a time)"""
+        if self.disk_cache is not None:
+            value = await asyncio.to_thread(self.disk_cache.get, key)
+            if value is not None:
+                self.cache.set(key, value, ttl=ttl)
+                return value
+        
+        value = await fetch()
+        self.cache.set(key, value, ttl=ttl)
+        if self.disk_cache is not None:
+            await asyncio.to_thread(self.disk_cache.set, key, value, ttl)
+        return value
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the response caches"""
+        return {
+            "memory": self.cache.stats(),
+            "disk": self.disk_cache.stats() if self.disk_cache is not None else None,
+            "coalesced": self._inflight.coalesced,
+            "in_flight": len(self._inflight)
+        }
     
     async def search_books(
         self, 
@@ -16,6 +124,33 @@ class GutenbergService:
         languages: Optional[List[str]] = None,
         page: int = 1,
         limit: int = 32
+    ) -> Dict[str, Any]:
+        """Search for books in the Gutenberg API (cached)"""
+        key = (
+            "search",
+            (search_query or "").strip().lower(),
+            ",".join(sorted(languages)) if languages else "",
+            page
+        )
+        return await self._cached(
+            key,
+            GUTENBERG_SEARCH_CACHE_TTL,
+            lambda: self._fetch_search(search_query, languages, page)
+        )
+    
+    async def get_book_by_id(self, book_id: int) -> Dict[str, Any]:
+        """Getting a book by its ID in Gutenberg (cached)"""
+        return await self._cached(
+            ("book", book_id),
+            GUTENBERG_BOOK_CACHE_TTL,
+            lambda: self._fetch_book(book_id)
+        )
+    
+    async def _fetch_search(
+        self,
+        search_query: Optional[str],
+        languages: Optional[List[str]],
+        page: int
     ) -> Dict[str, Any]:
         """Search for books in the Gutenberg API"""
         params = {}
@@ -31,33 +166,31 @@ class GutenbergService:
         print(f"🔍 DEBUG: Making a query to {self.base_url} with parameters {params}")
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(self.base_url, params=params)
-                response.raise_for_status()
-                result = response.json()
-                
-                print(f"✅ DEBUG: Received {len(result.get('results', []))} of results")
-                
-                return {
-                    "count": result.get("count", 0),
-                    "next": result.get("next"),
-                    "previous": result.get("previous"),
-                    "results": result.get("results", [])
-                }
+            response = await self.client.get(self.base_url, params=params)
+            response.raise_for_status()
+            result = response.json()
+            
+            print(f"✅ DEBUG: Received {len(result.get('results', []))} of results")
+            
+            return {
+                "count": result.get("count", 0),
+                "next": result.get("next"),
+                "previous": result.get("previous"),
+                "results": result.get("results", [])
+            }
         except Exception as e:
             print(f"❌ DEBUG: API request error: {e}")
             raise
     
-    async def get_book_by_id(self, book_id: int) -> Dict[str, Any]:
+    async def _fetch_book(self, book_id: int) -> Dict[str, Any]:
         """Getting a book by its ID in Gutenberg"""
-        url = f"https://gutendex.com/books/{book_id}/"
+        url = f"{self.base_url}{book_id}/"
         print(f"🔍 DEBUG: Get a book from {url}")
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
+            response = await self.client.get(url)
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             print(f"❌ DEBUG: Error receiving a book {book_id}: {e}")
             raise
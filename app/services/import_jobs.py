@@ -0,0 +1,257 @@
+import asyncio
+import gzip
+import json
+import shutil
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import IMPORT_JOB_WORKERS
+from app.database import SessionLocal
+from app.models import ImportJob, User
+from app.services.library_import import library_import_service
+from app.utils.files import get_file_path
+from app.utils.json_stream import JSONStreamError
+
+IMPORTS_DIRECTORY = "imports"
+EVENT_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 15.0
+FINISHED_STATUSES = ("completed", "failed")
+COUNT_FIELDS = ("processed", "imported", "created", "skipped", "error_count")
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class ImportJobService:
+    """
+    Runs library imports in the background. The uploaded file is stored under
+    uploads/imports until its job finishes. Jobs are persisted when their state
+    changes; the counts of a running job are kept in memory, since the import
+    transaction is not committed until the end.
+    """
+
+    def __init__(self, workers: int = IMPORT_JOB_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Future] = {}
+        self._live: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(self.workers, 1), thread_name_prefix="import-job")
+        return self._executor
+
+    @staticmethod
+    def _job_path(job_id: str, filename: str) -> Path:
+        return get_file_path(IMPORTS_DIRECTORY) / f"{job_id}{Path(filename).suffix.lower()}"
+
+    @staticmethod
+    def _save_upload(source: BinaryIO, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(source, target)
+
+    async def create_job(self, db: Session, user: User, source: BinaryIO, filename: str, mode: str) -> Dict[str, Any]:
+        """Stores the upload and queues its import; returns the queued job"""
+        library_import_service.validate_request(filename, mode)
+
+        job = ImportJob(id=uuid.uuid4().hex, user_id=user.id, status="queued", mode=mode, filename=filename[:255])
+        path = self._job_path(job.id, filename)
+        await asyncio.to_thread(self._save_upload, source, path)
+
+        try:
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+        except Exception:
+            db.rollback()
+            path.unlink(missing_ok=True)
+            raise
+
+        job_id = job.id
+        future = self._get_executor().submit(self._run, db.get_bind(), job_id, user.id, path)
+        self._jobs[job_id] = future
+        future.add_done_callback(lambda done: self._jobs.pop(job_id, None))
+        print(f"📥 Queued import job {job_id} for user {user.id}")
+        return self.serialize(job)
+
+    def _run(self, bind: Engine, job_id: str, user_id: int, path: Path) -> None:
+        self._live[job_id] = (user_id, {"status": "running", **{field: 0 for field in COUNT_FIELDS}})
+
+        def report(import_stats: Dict[str, Any]) -> None:
+            self._live[job_id] = (user_id, {"status": "running", **self._counts(import_stats)})
+
+        try:
+            with Session(bind=bind) as db:
+                job = db.get(ImportJob, job_id)
+                user = db.get(User, user_id)
+                if job is None or user is None:
+                    return
+                job.status = "running"
+                job.started_at = datetime.now()
+                db.commit()
+
+                values: Dict[str, Any]
+                try:
+                    with open(path, "rb") as source:
+                        import_stats = library_import_service.import_library(
+                            db, user, source, job.filename or path.name, job.mode, progress=report
+                        )
+                    values = {"status": "completed", "result": import_stats, **self._counts(import_stats)}
+                    print(f"✅ Import job {job_id} completed")
+                except Exception as e:
+                    db.rollback()
+                    values = {"status": "failed", "error": self._describe_error(e)}
+                    print(f"❌ Import job {job_id} failed: {values['error']}")
+
+                db.execute(
+                    update(ImportJob).where(ImportJob.id == job_id).values(finished_at=datetime.now(), **values)
+                )
+                db.commit()
+        except Exception as e:
+            print(f"Error running import job {job_id}: {e}")
+        finally:
+            self._live.pop(job_id, None)
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _counts(import_stats: Dict[str, Any]) -> Dict[str, int]:
+        return {
+            "processed": import_stats["total_books"],
+            "imported": import_stats["imported_books"],
+            "created": import_stats["created_books"],
+            "skipped": import_stats["skipped_books"],
+            "error_count": len(import_stats["errors"])
+        }
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        if isinstance(error, HTTPException):
+            return str(error.detail)
+        if isinstance(error, JSONStreamError):
+            return f"Incorrect JSON format: {error}"
+        if isinstance(error, (gzip.BadGzipFile, EOFError)):
+            return f"Incorrect gzip file: {error}"
+        return f"Error during import: {error}"
+
+    @staticmethod
+    def serialize(job: ImportJob) -> Dict[str, Any]:
+        return {
+            "id": job.id,
+            "status": job.status,
+            "mode": job.mode,
+            "filename": job.filename,
+            **{field: getattr(job, field) or 0 for field in COUNT_FIELDS},
+            "error": job.error,
+            "result": job.result,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+
+    def get_job(self, db: Session, job_id: str, user_id: int) -> Dict[str, Any]:
+        """The job with the live counts of a running import; 404 for other users' jobs"""
+        job = db.get(ImportJob, job_id)
+        if job is None or job.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Import job not found"
+            )
+        result = self.serialize(job)
+        live = self._live.get(job_id)
+        if live is not None and job.status not in FINISHED_STATUSES:
+            result.update(live[1])
+        return result
+
+    def _read_job(self, bind: Engine, job_id: str, user_id: int) -> Dict[str, Any]:
+        with Session(bind=bind) as db:
+            return self.get_job(db, job_id, user_id)
+
+    async def stream_events(
+        self,
+        bind: Engine,
+        job_id: str,
+        user_id: int,
+        interval: float = EVENT_INTERVAL,
+        heartbeat: float = HEARTBEAT_INTERVAL
+    ) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for a job: a "progress" event whenever the counts change,
+        comments as heartbeats, and a final "completed" or "failed" event.
+        Counts of a running job come from memory, so polling does not touch the database.
+        """
+        last_state = None
+        last_sent = time.monotonic()
+        while True:
+            live = self._live.get(job_id)
+            if live is not None and live[0] == user_id:
+                state = dict(live[1])
+            else:
+                state = await asyncio.to_thread(self._read_job, bind, job_id, user_id)
+
+            if state["status"] in FINISHED_STATUSES:
+                yield format_event(state["status"], state)
+                return
+
+            counts = {field: state[field] for field in ("status",) + COUNT_FIELDS}
+            if counts != last_state:
+                last_state = counts
+                last_sent = time.monotonic()
+                yield format_event("progress", counts)
+            elif time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(interval)
+
+    async def wait_for(self, job_id: str, timeout: float) -> bool:
+        """Waits up to timeout seconds for a queued job; returns whether it has finished"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def recover_interrupted(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Marks jobs left unfinished by a previous run as failed and removes their files"""
+        db = session_factory()
+        try:
+            interrupted = db.query(ImportJob).filter(ImportJob.status.in_(("queued", "running"))).all()
+            for job in interrupted:
+                job.status = "failed"
+                job.error = "The import was interrupted by a server restart"
+                job.finished_at = datetime.now()
+                self._job_path(job.id, job.filename or "").unlink(missing_ok=True)
+            db.commit()
+            if interrupted:
+                print(f"⚠️ Marked {len(interrupted)} interrupted import jobs as failed")
+            return len(interrupted)
+        except Exception as e:
+            db.rollback()
+            print(f"Error recovering import jobs: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        """Lets running imports finish; queued ones are reported as interrupted on the next start"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+import_job_service = ImportJobService()
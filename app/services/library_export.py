@@ -0,0 +1,161 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import Book, BookFormat, ReadingSession, User, UserBook
+
+EXPORT_FORMATS = ("json", "ndjson")
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_VERSION = 1
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+class LibraryExportService:
+    """
+    Streams a user's library in the format read by the library import. Rows are
+    read with a server-side cursor one batch at a time and serialized as they
+    arrive, so memory does not grow with the size of the library.
+    """
+
+    @staticmethod
+    def validate_request(export_format: str) -> None:
+        if export_format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown export format. Supported formats: {', '.join(EXPORT_FORMATS)}"
+            )
+
+    @staticmethod
+    def filename(export_format: str, compress: bool) -> str:
+        extension = "json" if export_format == "json" else "ndjson"
+        return f"ownlib_backup_{datetime.now().date().isoformat()}.{extension}{'.gz' if compress else ''}"
+
+    @staticmethod
+    def iter_entries(bind: Engine, user_id: int, include_sessions: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yields one self-contained import entry per UserBook, in insertion order.
+        Formats and sessions are loaded per batch on a second connection, since
+        a MySQL connection cannot run queries while a streaming cursor is open.
+        """
+        with Session(bind=bind) as db, Session(bind=bind) as lookup:
+            result = db.execute(
+                select(UserBook, Book).join(Book, Book.id == UserBook.book_id).where(
+                    UserBook.user_id == user_id
+                ).order_by(UserBook.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            for partition in result.partitions():
+                book_ids = {book.id for _, book in partition}
+                formats: Dict[int, List[Dict[str, Any]]] = {}
+                for book_id, format_type, url in lookup.execute(
+                    select(BookFormat.book_id, BookFormat.format_type, BookFormat.url).where(
+                        BookFormat.book_id.in_(book_ids)
+                    ).order_by(BookFormat.id)
+                ):
+                    formats.setdefault(book_id, []).append({"format_type": format_type, "url": url})
+
+                sessions: Dict[int, List[Dict[str, Any]]] = {}
+                if include_sessions:
+                    for reading_session in lookup.scalars(
+                        select(ReadingSession).where(
+                            ReadingSession.user_book_id.in_([user_book.id for user_book, _ in partition])
+                        ).order_by(ReadingSession.id)
+                    ):
+                        sessions.setdefault(reading_session.user_book_id, []).append({
+                            "start_time": isoformat(reading_session.start_time),
+                            "end_time": isoformat(reading_session.end_time),
+                            "pages_read": reading_session.pages_read
+                        })
+                lookup.expunge_all()
+
+                for user_book, book in partition:
+                    entry = {
+                        "status": user_book.status,
+                        "bookmark_position": user_book.bookmark_position,
+                        "is_local": user_book.is_local,
+                        "file_path": user_book.file_path,
+                        "added_at": isoformat(user_book.added_at),
+                        "book": {
+                            "title": book.title,
+                            "author": book.author,
+                            "description": book.description,
+                            "language": book.language,
+                            "gutenberg_id": book.gutenberg_id,
+                            "cover_url": book.cover_url,
+                            "formats": formats.get(book.id, [])
+                        }
+                    }
+                    if include_sessions:
+                        entry["reading_sessions"] = sessions.get(user_book.id, [])
+                    yield entry
+                db.expunge_all()
+
+    @staticmethod
+    def iter_export(
+        bind: Engine,
+        user: User,
+        export_format: str = "json",
+        include_sessions: bool = False,
+        compress: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Yields the export as byte chunks: a JSON object with an export_info header and
+        a "books" array, or one entry per line for NDJSON; gzip-compressed on request.
+        """
+        def serialized() -> Iterator[str]:
+            if export_format == "ndjson":
+                for entry in LibraryExportService.iter_entries(bind, user.id, include_sessions):
+                    yield json.dumps(entry, ensure_ascii=False) + "\n"
+                return
+
+            with Session(bind=bind) as db:
+                total_books = db.scalar(select(func.count(UserBook.id)).where(UserBook.user_id == user.id))
+            export_info = {
+                "version": EXPORT_VERSION,
+                "export_date": datetime.now().isoformat(),
+                "username": user.username,
+                "total_books": total_books,
+                "include_sessions": include_sessions
+            }
+            yield '{"export_info": ' + json.dumps(export_info, ensure_ascii=False) + ', "books": ['
+            separator = "\n"
+            for entry in LibraryExportService.iter_entries(bind, user.id, include_sessions):
+                yield separator + json.dumps(entry, ensure_ascii=False)
+                separator = ",\n"
+            yield "\n]}\n"
+
+        compressor = zlib.compressobj(wbits=GZIP_WBITS) if compress else None
+        buffer: List[bytes] = []
+        buffered = 0
+        first = True
+        for text in serialized():
+            data = text.encode("utf-8")
+            if compressor is not None:
+                data = compressor.compress(data)
+            buffer.append(data)
+            buffered += len(data)
+            # The header goes out at once, so the download starts before the first batch is read
+            if first or buffered >= EXPORT_CHUNK_SIZE:
+                if compressor is not None and first:
+                    buffer.append(compressor.flush(zlib.Z_SYNC_FLUSH))
+                yield b"".join(buffer)
+                buffer = []
+                buffered = 0
+                first = False
+        if compressor is not None:
+            buffer.append(compressor.flush())
+        if buffer:
+            yield b"".join(buffer)
+
+
+library_export_service = LibraryExportService()
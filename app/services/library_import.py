@@ -0,0 +1,559 @@
+import gzip
+from datetime import datetime
+from itertools import chain
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, insert, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.models import User, Book, BookFormat, FileBlob, UserBook, ReadingSession, UserActivity
+from app.services.activity import activity_service
+from app.services.blob_store import blob_store_service
+from app.services.content_index import content_index_service
+from app.utils.json_stream import iter_json_array, iter_ndjson
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+GZIP_EXTENSION = ".gz"
+IMPORT_EXTENSIONS = (".json",) + NDJSON_EXTENSIONS
+IMPORT_BATCH_SIZE = 500
+IMPORT_MODES = ("replace", "merge")
+USER_BOOK_FIELDS = ("status", "bookmark_position", "is_local", "file_path", "added_at")
+USER_BOOK_STATUSES = set(UserBook.__table__.c.status.type.enums)
+FORMAT_TYPES = set(BookFormat.__table__.c.format_type.type.enums)
+
+
+class NewBook(NamedTuple):
+    """A book created by the current batch, by its position in the insert"""
+    index: int
+
+
+class LibraryImportService:
+    """Service for importing a user's library from a JSON or NDJSON export"""
+
+    @staticmethod
+    def iter_entries(source: BinaryIO, filename: str) -> Iterator[Any]:
+        """
+        Yields the book entries of an export one at a time: the items of the
+        "books" array of a JSON file, or one entry per line of an NDJSON file.
+        Gzip-compressed exports are decompressed on the fly.
+        """
+        filename = filename.lower()
+        if filename.endswith(GZIP_EXTENSION):
+            source = gzip.GzipFile(fileobj=source, mode="rb")
+            filename = filename[:-len(GZIP_EXTENSION)]
+        if filename.endswith(NDJSON_EXTENSIONS):
+            return iter_ndjson(source)
+        return iter_json_array(source, "books")
+
+    @staticmethod
+    def validate_request(filename: str, mode: str) -> None:
+        """Rejects unsupported file types and import modes before anything is read"""
+        filename = filename.lower()
+        if filename.endswith(GZIP_EXTENSION):
+            filename = filename[:-len(GZIP_EXTENSION)]
+        if not filename.endswith(IMPORT_EXTENSIONS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The file must be in JSON or NDJSON format, optionally gzip-compressed"
+            )
+        if mode not in IMPORT_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown import mode. Supported modes: {', '.join(IMPORT_MODES)}"
+            )
+
+    @staticmethod
+    def import_library(
+        db: Session,
+        user: User,
+        source: BinaryIO,
+        filename: str,
+        mode: str = "replace",
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Imports the books of an export. "replace" deletes the current library first;
+        "merge" only adds, updates and removes the books that differ, so reading
+        sessions and activity of unchanged books are kept.
+        Reading sessions in the file are restored for the user books the import creates.
+        The file is parsed incrementally, so memory does not grow with its size;
+        everything is committed at once, so a malformed file leaves the library unchanged.
+        Entries keep their file only if it is a stored upload the user already has.
+        progress is called with the running statistics after every batch.
+        """
+        LibraryImportService.validate_request(filename, mode)
+
+        entries = LibraryImportService.iter_entries(source, filename)
+        first_entry = next(entries, None)
+        if first_entry is not None:
+            entries = chain([first_entry], entries)
+
+        import_stats = {
+            'total_books': 0,
+            'imported_books': 0,
+            'created_books': 0,
+            'skipped_books': 0,
+            'imported_sessions': 0,
+            'errors': [],
+            'mode': mode
+        }
+
+        # Queued events would otherwise be written after the library is replaced
+        activity_service.flush(db.get_bind())
+
+        merge = None
+        listed: Set[int] = set()
+        files = {'owned': LibraryImportService._owned_files(db, user.id), 'references': {}}
+        try:
+            if mode == "merge":
+                merge = LibraryImportService._load_library(db, user.id)
+                import_stats.update({'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0})
+            else:
+                LibraryImportService._clear_library(db, user.id, files['references'])
+
+            print(f"📚 Starting import for user {user.id}")
+
+            batch = []
+            for i, book_data in enumerate(entries):
+                import_stats['total_books'] += 1
+                batch.append((i, book_data))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    LibraryImportService._import_batch(db, user.id, batch, import_stats, listed, files, merge)
+                    batch = []
+                    print(f"📖 Processed {i + 1} books")
+                    if progress is not None:
+                        progress(import_stats)
+            if batch:
+                LibraryImportService._import_batch(db, user.id, batch, import_stats, listed, files, merge)
+                if progress is not None:
+                    progress(import_stats)
+            if merge is not None:
+                import_stats['removed'] = LibraryImportService._remove_unlisted(db, merge, files['references'])
+            blob_store_service.adjust_references(db, files['references'])
+
+            print("💾 Committing changes to database...")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        try:
+            activity_service.log_activity(
+                db=db,
+                user_id=user.id,
+                activity_type="data_imported",
+                details={
+                    'total_books': import_stats['total_books'],
+                    'imported_books': import_stats['imported_books'],
+                    'created_books': import_stats['created_books'],
+                    'skipped_books': import_stats['skipped_books'],
+                    'mode': mode,
+                    'import_date': datetime.now().isoformat(),
+                    'filename': filename
+                }
+            )
+        except Exception as e:
+            print(f"⚠️ Error logging import activity: {e}")
+
+        print(f"✅ Import completed successfully")
+        return import_stats
+
+    @staticmethod
+    def _clear_library(db: Session, user_id: int, references: Dict[str, int]) -> None:
+        print(f"🗑️ Delete the current user library {user_id}")
+
+        for file_path, in db.query(UserBook.file_path).filter(
+            UserBook.user_id == user_id,
+            UserBook.file_path.isnot(None)
+        ):
+            add_reference(references, file_path, -1)
+
+        user_books_ids = [ub.id for ub in db.query(UserBook.id).filter(UserBook.user_id == user_id).all()]
+
+        if user_books_ids:
+            content_index_service.remove_books(db, user_books_ids)
+            deleted_sessions = db.query(ReadingSession).filter(
+                ReadingSession.user_book_id.in_(user_books_ids)
+            ).delete(synchronize_session=False)
+            print(f"🗑️ Deleted {deleted_sessions} read session")
+
+        deleted_user_books = db.query(UserBook).filter(UserBook.user_id == user_id).delete()
+        print(f"🗑️ Deleted {deleted_user_books} UserBook records")
+
+        activity_service.remove_from_rollups(db, UserActivity.user_id == user_id, UserActivity.book_id.isnot(None))
+        deleted_activities = db.query(UserActivity).filter(
+            and_(
+                UserActivity.user_id == user_id,
+                UserActivity.book_id.isnot(None)
+            )
+        ).delete()
+        print(f"🗑️ Deleted {deleted_activities} activities")
+
+    @staticmethod
+    def _owned_files(db: Session, user_id: int) -> Set[str]:
+        """Paths of the stored uploads the user's books point at, the only files an import may refer to"""
+        return {
+            file_path for file_path, in db.query(UserBook.file_path).join(
+                FileBlob, FileBlob.path == UserBook.file_path
+            ).filter(UserBook.user_id == user_id).distinct()
+        }
+
+    @staticmethod
+    def _load_library(db: Session, user_id: int) -> Dict[str, Any]:
+        """The user's current books by book id, for diffing against the file"""
+        library: Dict[int, List[Dict[str, Any]]] = {}
+        for row in db.query(
+            UserBook.id, UserBook.book_id, *(getattr(UserBook, field) for field in USER_BOOK_FIELDS)
+        ).filter(UserBook.user_id == user_id).order_by(UserBook.id):
+            library.setdefault(row.book_id, []).append(dict(row._mapping))
+        return {'library': library, 'matched': set()}
+
+    @staticmethod
+    def _diff_user_books(
+        db: Session,
+        rows: List[Dict[str, Any]],
+        merge: Dict[str, Any],
+        dated: List[bool]
+    ) -> Dict[str, Any]:
+        """
+        Inserts the user books that are new and updates the ones whose fields changed,
+        with the blob reference changes that follow from their file paths.
+        """
+        matched = set()
+        inserts = []
+        updates = []
+        references: Dict[str, int] = {}
+        for row, has_date in zip(rows, dated):
+            current = next(
+                (
+                    user_book for user_book in merge['library'].get(row['book_id'], [])
+                    if user_book['id'] not in merge['matched'] and user_book['id'] not in matched
+                ),
+                None
+            )
+            if current is None:
+                inserts.append(row)
+                add_reference(references, row['file_path'], 1)
+                continue
+            matched.add(current['id'])
+            fields = USER_BOOK_FIELDS if has_date else USER_BOOK_FIELDS[:-1]
+            if any(current[field] != row[field] for field in fields):
+                updates.append({'id': current['id'], **{field: row[field] for field in fields}})
+                if current['file_path'] != row['file_path']:
+                    add_reference(references, current['file_path'], -1)
+                    add_reference(references, row['file_path'], 1)
+
+        if inserts:
+            db.execute(insert(UserBook), inserts)
+        for fields in {tuple(update_row) for update_row in updates}:
+            db.execute(update(UserBook), [update_row for update_row in updates if tuple(update_row) == fields])
+
+        return {
+            'matched': matched,
+            'inserted': {row['book_id'] for row in inserts},
+            'added': len(inserts),
+            'updated': len(updates),
+            'unchanged': len(matched) - len(updates),
+            'references': references
+        }
+
+    @staticmethod
+    def _remove_unlisted(db: Session, merge: Dict[str, Any], references: Dict[str, int]) -> int:
+        """Deletes the user books that were not in the file with their sessions, and drops their blob references"""
+        unlisted = [
+            user_book for user_books in merge['library'].values()
+            for user_book in user_books if user_book['id'] not in merge['matched']
+        ]
+        if not unlisted:
+            return 0
+
+        user_book_ids = [user_book['id'] for user_book in unlisted]
+        for start in range(0, len(user_book_ids), IMPORT_BATCH_SIZE):
+            chunk = user_book_ids[start:start + IMPORT_BATCH_SIZE]
+            content_index_service.remove_books(db, chunk)
+            db.query(ReadingSession).filter(
+                ReadingSession.user_book_id.in_(chunk)
+            ).delete(synchronize_session=False)
+            db.query(UserBook).filter(UserBook.id.in_(chunk)).delete(synchronize_session=False)
+
+        for user_book in unlisted:
+            add_reference(references, user_book['file_path'], -1)
+        print(f"🗑️ Removed {len(unlisted)} books that are not in the file")
+        return len(unlisted)
+
+    @staticmethod
+    def _import_batch(
+        db: Session,
+        user_id: int,
+        batch: List[Tuple[int, Any]],
+        import_stats: Dict[str, Any],
+        listed: Set[int],
+        files: Dict[str, Any],
+        merge: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Imports a batch of entries in one savepoint. If the batch fails as a whole,
+        its entries are retried one at a time so a single bad entry is skipped alone.
+        """
+        try:
+            with db.begin_nested():
+                errors: List[str] = []
+                counts = LibraryImportService._insert_batch(db, user_id, batch, errors, listed, files, merge)
+        except Exception as e:
+            if len(batch) > 1:
+                for entry in batch:
+                    LibraryImportService._import_batch(db, user_id, [entry], import_stats, listed, files, merge)
+                return
+            i, book_data = batch[0]
+            title = book_data['book'].get('title', 'Unknown')
+            error_msg = f"Error importing a book #{i+1} '{title}': {str(e)}"
+            import_stats['errors'].append(error_msg)
+            import_stats['skipped_books'] += 1
+            print(f"❌ {error_msg}")
+            return
+
+        import_stats['errors'].extend(errors)
+        listed.update(counts['listed'])
+        for file_path, change in counts['references'].items():
+            add_reference(files['references'], file_path, change)
+        import_stats['imported_books'] += counts['imported']
+        import_stats['created_books'] += counts['created']
+        import_stats['skipped_books'] += counts['skipped']
+        import_stats['imported_sessions'] += counts['sessions']
+        if merge is not None:
+            merge['matched'].update(counts['matched'])
+            for key in ('added', 'updated', 'unchanged'):
+                import_stats[key] += counts[key]
+
+    @staticmethod
+    def _insert_batch(
+        db: Session,
+        user_id: int,
+        batch: List[Tuple[int, Any]],
+        errors: List[str],
+        listed: Set[int],
+        files: Dict[str, Any],
+        merge: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Resolves the books of a batch with one IN query on gutenberg_id and one
+        tuple IN query on (title, author), then inserts the missing books, their
+        formats and the user's books with bulk INSERT statements.
+        In merge mode the user's books are diffed against the current library instead.
+        A file path outside files['owned'] is dropped and the book imported as not local.
+        """
+        valid = []
+        skipped = 0
+        for i, book_data in batch:
+            if not isinstance(book_data, dict) or not isinstance(book_data.get('book'), dict):
+                errors.append(f"Incorrect book structure #{i+1}")
+                skipped += 1
+            elif book_data.get('status', 'Want to read') not in USER_BOOK_STATUSES:
+                errors.append(f"Unknown status of book #{i+1}: {book_data.get('status')}")
+                skipped += 1
+            elif not valid_gutenberg_id(book_data['book'].get('gutenberg_id')):
+                errors.append(f"Invalid gutenberg_id of book #{i+1}: {book_data['book'].get('gutenberg_id')}")
+                skipped += 1
+            else:
+                valid.append((i, book_data))
+
+        gutenberg_ids = {
+            book_data['book']['gutenberg_id'] for _, book_data in valid if book_data['book'].get('gutenberg_id')
+        }
+        by_gutenberg_id: Dict[Any, Any] = {}
+        if gutenberg_ids:
+            for book_id, gutenberg_id in db.query(Book.id, Book.gutenberg_id).filter(
+                Book.gutenberg_id.in_(gutenberg_ids)
+            ).order_by(Book.id):
+                by_gutenberg_id.setdefault(gutenberg_id, book_id)
+
+        pairs = {
+            (book_data['book']['title'], book_data['book']['author'])
+            for _, book_data in valid
+            if book_data['book'].get('gutenberg_id') not in by_gutenberg_id
+            and book_data['book'].get('title') and book_data['book'].get('author')
+        }
+        by_title_author: Dict[Tuple[str, str], Any] = {}
+        if pairs:
+            for book_id, title, author in db.query(Book.id, Book.title, Book.author).filter(
+                tuple_(Book.title, Book.author).in_(pairs)
+            ).order_by(Book.id):
+                by_title_author.setdefault((title, author), book_id)
+
+        new_books = []
+        new_formats = []
+        resolved = []
+        for i, book_data in valid:
+            book_info = book_data['book']
+            gutenberg_id = book_info.get('gutenberg_id')
+            pair = (book_info.get('title'), book_info.get('author'))
+
+            book_ref = by_gutenberg_id.get(gutenberg_id) if gutenberg_id else None
+            if book_ref is None and all(pair):
+                book_ref = by_title_author.get(pair)
+
+            if book_ref is None:
+                book_ref = NewBook(len(new_books))
+                new_books.append({
+                    'title': book_info.get('title') or 'Невідома книга',
+                    'author': book_info.get('author'),
+                    'description': book_info.get('description'),
+                    'language': book_info.get('language'),
+                    'gutenberg_id': gutenberg_id,
+                    'cover_url': book_info.get('cover_url')
+                })
+                if isinstance(book_info.get('formats'), list):
+                    new_formats.extend(
+                        (book_ref, format_data) for format_data in book_info['formats']
+                        if isinstance(format_data, dict)
+                        and format_data.get('format_type') in FORMAT_TYPES and format_data.get('url')
+                    )
+                if gutenberg_id:
+                    by_gutenberg_id[gutenberg_id] = book_ref
+                if all(pair):
+                    by_title_author[pair] = book_ref
+
+            resolved.append((i, book_data, book_ref))
+
+        new_book_ids = LibraryImportService._insert_books(db, new_books)
+
+        def book_id_of(book_ref: Any) -> int:
+            return new_book_ids[book_ref.index] if isinstance(book_ref, NewBook) else book_ref
+
+        if new_formats:
+            db.execute(insert(BookFormat), [
+                {
+                    'book_id': book_id_of(book_ref),
+                    'format_type': format_data['format_type'],
+                    'url': format_data['url']
+                }
+                for book_ref, format_data in new_formats
+            ])
+
+        rows = []
+        dated = []
+        sessions = []
+        listed_now = set()
+        for i, book_data, book_ref in resolved:
+            book_id = book_id_of(book_ref)
+            # A user has each book once, so later entries for the same book are skipped
+            if book_id in listed or book_id in listed_now:
+                errors.append(f"Book #{i+1} is already in the library: {book_data['book'].get('title')}")
+                skipped += 1
+                continue
+            listed_now.add(book_id)
+            file_path = book_data.get('file_path')
+            if not isinstance(file_path, str) or file_path not in files['owned']:
+                file_path = None
+            rows.append({
+                'user_id': user_id,
+                'book_id': book_id,
+                'status': book_data.get('status', 'Want to read'),
+                'bookmark_position': book_data.get('bookmark_position') or 0,
+                'is_local': bool(book_data.get('is_local', False)) and file_path is not None,
+                'file_path': file_path,
+                'added_at': parse_added_at(book_data.get('added_at'))
+            })
+            dated.append(parse_datetime(book_data.get('added_at')) is not None)
+            sessions.append(book_data.get('reading_sessions'))
+        counts = {'imported': len(rows), 'created': len(new_books), 'skipped': skipped, 'listed': listed_now}
+
+        if merge is not None:
+            counts.update(LibraryImportService._diff_user_books(db, rows, merge, dated))
+        else:
+            counts['inserted'] = {row['book_id'] for row in rows}
+            counts['references'] = {}
+            for row in rows:
+                add_reference(counts['references'], row['file_path'], 1)
+            if rows:
+                db.execute(insert(UserBook), rows)
+
+        counts['sessions'] = LibraryImportService._insert_sessions(db, user_id, {
+            row['book_id']: reading_sessions
+            for row, reading_sessions in zip(rows, sessions)
+            if row['book_id'] in counts['inserted'] and isinstance(reading_sessions, list)
+        })
+        return counts
+
+    @staticmethod
+    def _insert_sessions(db: Session, user_id: int, sessions: Dict[int, List[Any]]) -> int:
+        """
+        Inserts the exported reading sessions of new user books, keyed by book id,
+        with one query for the user book ids. Sessions without a valid start time are left out.
+        """
+        if not sessions:
+            return 0
+        user_book_ids = dict(db.query(UserBook.book_id, UserBook.id).filter(
+            UserBook.user_id == user_id,
+            UserBook.book_id.in_(list(sessions))
+        ).all())
+
+        rows = []
+        for book_id, reading_sessions in sessions.items():
+            for reading_session in reading_sessions:
+                if not isinstance(reading_session, dict):
+                    continue
+                start_time = parse_datetime(reading_session.get('start_time'))
+                if start_time is None:
+                    continue
+                pages_read = reading_session.get('pages_read')
+                if isinstance(pages_read, bool) or not isinstance(pages_read, int):
+                    pages_read = None
+                rows.append({
+                    'user_book_id': user_book_ids[book_id],
+                    'start_time': start_time,
+                    'end_time': parse_datetime(reading_session.get('end_time')),
+                    'pages_read': pages_read
+                })
+        if rows:
+            db.execute(insert(ReadingSession), rows)
+        return len(rows)
+
+    @staticmethod
+    def _insert_books(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Inserts books with one multi-row statement and returns their ids in order.
+        Ids are assigned in row order, and the transaction's snapshot only shows
+        its own rows above the previous maximum, so one query resolves them.
+        """
+        if not rows:
+            return []
+        last_id = db.query(func.max(Book.id)).scalar() or 0
+        # A multi-row VALUES clause keeps rows with missing fields in the same statement
+        db.execute(insert(Book).values(rows))
+        book_ids = [
+            book_id for book_id, in db.query(Book.id).filter(Book.id > last_id).order_by(Book.id)
+        ]
+        if len(book_ids) != len(rows):
+            raise RuntimeError(f"Expected {len(rows)} new books, found {len(book_ids)}")
+        return book_ids
+
+
+def add_reference(references: Dict[str, int], file_path: Optional[str], change: int) -> None:
+    if file_path:
+        references[file_path] = references.get(file_path, 0) + change
+
+
+def valid_gutenberg_id(value: Any) -> bool:
+    return value is None or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """Parses an ISO 8601 timestamp into a naive local datetime; None if it is missing or invalid"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def parse_added_at(value: Any) -> datetime:
+    return parse_datetime(value) or datetime.now()
+
+
+library_import_service = LibraryImportService()
@@ -0,0 +1,276 @@
+import asyncio
+import glob
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import METADATA_WORKERS, READER_PAGE_CHARS
+from app.database import SessionLocal
+from app.models import Book, BookFormat, UserBook
+from app.utils.book_pages import PAGES_DIRECTORY, page_index_key
+from app.utils.files import extract_metadata, get_file_path, measure_file
+
+COVER_DIRECTORY = "covers"
+BACKFILL_BATCH_SIZE = 100
+
+
+class MetadataService:
+    """
+    Extracts page count, author, language and cover of uploaded files in a pool
+    of worker processes, so uploads return as soon as the file is stored.
+    Books stay in metadata_status "pending" until the results are written back.
+    """
+
+    def __init__(self, workers: int = METADATA_WORKERS):
+        self.workers = workers
+        self._pool: Optional[Executor] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[int, Future] = {}
+        self._jobs_lock = threading.Lock()
+        self.backfill_status: Dict[str, Any] = {
+            "running": False,
+            "started_at": None,
+            "finished_at": None,
+            "updated": 0,
+            "failed": 0,
+            "error": None
+        }
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.workers > 0:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metadata")
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metadata-writer")
+        return self._pool
+
+    def submit(self, db: Session, book_id: int, relative_path: str) -> Future:
+        """
+        Queues extraction for a stored file. The book must already be committed.
+        Returns a future resolved with the final metadata status.
+        """
+        with self._jobs_lock:
+            job = self._jobs.get(book_id)
+            if job is not None:
+                return job
+            job = Future()
+            self._jobs[book_id] = job
+        bind = db.get_bind()
+        cover_dir = str(get_file_path(COVER_DIRECTORY))
+
+        extraction = self._get_pool().submit(
+            extract_metadata,
+            str(get_file_path(relative_path)),
+            cover_dir,
+            str(get_file_path(PAGES_DIRECTORY)),
+            page_index_key(relative_path),
+            READER_PAGE_CHARS
+        )
+        extraction.add_done_callback(
+            lambda done: self._writer.submit(self._write_back, bind, book_id, relative_path, done, job)
+        )
+        return job
+
+    def _write_back(
+        self,
+        bind: Engine,
+        book_id: int,
+        relative_path: str,
+        extraction: Future,
+        job: Future
+    ) -> None:
+        if extraction.cancelled():
+            with self._jobs_lock:
+                self._jobs.pop(book_id, None)
+            job.set_result("pending")
+            return
+
+        metadata_status = "failed"
+        try:
+            info = extraction.result()
+            with Session(bind=bind) as db:
+                book = db.get(Book, book_id)
+                if book is not None:
+                    self.apply_metadata(db, book, relative_path, info)
+                    db.commit()
+            metadata_status = "ready"
+            print(f"📘 Metadata ready for book {book_id}: {info.get('pages')} pages")
+        except Exception as e:
+            print(f"Error extracting metadata for book {book_id}: {e}")
+            try:
+                with Session(bind=bind) as db:
+                    db.query(Book).filter(Book.id == book_id).update({Book.metadata_status: "failed"})
+                    db.commit()
+            except Exception as write_error:
+                print(f"Error saving the metadata status of book {book_id}: {write_error}")
+        finally:
+            with self._jobs_lock:
+                self._jobs.pop(book_id, None)
+            job.set_result(metadata_status)
+
+    @staticmethod
+    def apply_metadata(db: Session, book: Book, relative_path: str, info: Dict[str, Any]) -> None:
+        """Fills in what the uploader did not provide; user-entered fields are never overwritten"""
+        if info.get("author") and book.author in (None, "", "Unknown author"):
+            book.author = str(info["author"])[:256]
+        if info.get("language") and not book.language:
+            book.language = str(info["language"])[:32]
+        if info.get("cover") and not book.cover_url:
+            book.cover_url = f"/uploads/{COVER_DIRECTORY}/{info['cover']}"
+        measured = {BookFormat.file_size: info.get("file_size")}
+        if info.get("pages"):
+            measured[BookFormat.page_count] = info["pages"]
+        db.query(BookFormat).filter(
+            BookFormat.book_id == book.id,
+            BookFormat.url == relative_path
+        ).update(measured, synchronize_session=False)
+        book.metadata_status = "ready"
+
+    @staticmethod
+    def remove_cover(relative_path: str) -> bool:
+        """Deletes the cover extracted from a stored file, which is named after it; returns whether one was found"""
+        removed = False
+        for cover_path in get_file_path(COVER_DIRECTORY).glob(f"{glob.escape(Path(relative_path).stem)}.*"):
+            cover_path.unlink(missing_ok=True)
+            removed = True
+        return removed
+
+    async def wait_for(self, book_id: int, timeout: float) -> Optional[str]:
+        """Waits up to timeout seconds for a queued job; returns its status or None"""
+        with self._jobs_lock:
+            job = self._jobs.get(book_id)
+        if job is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def resume_pending(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Re-queues books left pending by a restart"""
+        db = session_factory()
+        try:
+            pending = db.query(UserBook.book_id, UserBook.file_path).join(Book).filter(
+                Book.metadata_status == "pending",
+                UserBook.is_local == True,
+                UserBook.file_path.isnot(None)
+            ).distinct().all()
+            for book_id, relative_path in pending:
+                self.submit(db, book_id, relative_path)
+            if pending:
+                print(f"📘 Re-queued metadata extraction for {len(pending)} books")
+            return len(pending)
+        except Exception as e:
+            print(f"Error re-queuing metadata extraction: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def backfill_page_counts(self, db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Measures local book files stored without a page count or byte size,
+        batch_size formats at a time on the worker pool, and saves each batch
+        with one bulk UPDATE.
+        """
+        updated = 0
+        failed = 0
+        last_id = 0
+        pages_dir = str(get_file_path(PAGES_DIRECTORY))
+
+        while True:
+            formats = db.query(BookFormat.id, BookFormat.url).join(
+                UserBook,
+                and_(UserBook.book_id == BookFormat.book_id, UserBook.file_path == BookFormat.url)
+            ).filter(
+                UserBook.is_local == True,
+                BookFormat.id > last_id,
+                or_(BookFormat.page_count.is_(None), BookFormat.file_size.is_(None))
+            ).distinct().order_by(BookFormat.id).limit(batch_size).all()
+            if not formats:
+                break
+            last_id = formats[-1].id
+
+            measurements = [
+                (format_id, self._get_pool().submit(
+                    measure_file,
+                    str(get_file_path(relative_path)),
+                    pages_dir,
+                    page_index_key(relative_path),
+                    READER_PAGE_CHARS
+                ))
+                for format_id, relative_path in formats
+            ]
+
+            values = []
+            for format_id, measurement in measurements:
+                try:
+                    info = measurement.result()
+                except Exception as e:
+                    print(f"Error measuring book format {format_id}: {e}")
+                    failed += 1
+                    continue
+                values.append({"id": format_id, "page_count": info["pages"], "file_size": info["file_size"]})
+
+            if values:
+                db.execute(update(BookFormat), values)
+                db.commit()
+                updated += len(values)
+
+        if updated or failed:
+            print(f"📘 Backfilled page counts of {updated} book files, {failed} failed")
+        return {"updated": updated, "failed": failed}
+
+    def run_backfill_job(
+        self,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        session_factory: Callable[[], Session] = SessionLocal
+    ) -> None:
+        """Runs the page count backfill with its own database session and records the outcome in backfill_status"""
+        if self.backfill_status["running"]:
+            print("⚠️ Page count backfill is already running")
+            return
+
+        self.backfill_status.update({
+            "running": True,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "updated": 0,
+            "failed": 0,
+            "error": None
+        })
+
+        db = session_factory()
+        try:
+            self.backfill_status.update(self.backfill_page_counts(db, batch_size=batch_size))
+        except Exception as e:
+            db.rollback()
+            self.backfill_status["error"] = str(e)
+            print(f"❌ Page count backfill failed: {e}")
+        finally:
+            db.close()
+            self.backfill_status["running"] = False
+            self.backfill_status["finished_at"] = datetime.now().isoformat()
+
+    def shutdown(self) -> None:
+        """Stops the workers; unfinished books stay pending and are re-queued on the next start"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+
+metadata_service = MetadataService()
@@ -0,0 +1,261 @@
+import asyncio
+import base64
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app.config import ALLOWED_EXTENSIONS, MAX_FILE_SIZE, RESUMABLE_UPLOAD_TTL_HOURS
+from app.models import User
+from app.services.file import file_service
+from app.utils.files import get_file_path
+
+RESUMABLE_DIRECTORY = "partial"
+TUS_VERSION = "1.0.0"
+WRITE_BUFFER_SIZE = 1024 * 1024
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def parse_upload_metadata(header: Optional[str]) -> Dict[str, str]:
+    """Parses a tus Upload-Metadata header: 'key base64value,key2 base64value2'"""
+    metadata = {}
+    for pair in (header or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value).decode("utf-8") if value else ""
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid Upload-Metadata value for {key}"
+            )
+    return metadata
+
+
+class ResumableUploadService:
+    """
+    tus-style resumable uploads: create, append chunks at the current offset,
+    query the offset and finalize into a regular book upload.
+    Partial data lives in uploads/partial/<id>.part with a JSON sidecar;
+    the offset is the size of the .part file, so it survives restarts.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def _directory() -> Path:
+        directory = get_file_path(RESUMABLE_DIRECTORY)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def _paths(upload_id: str) -> tuple:
+        directory = ResumableUploadService._directory()
+        return directory / f"{upload_id}.part", directory / f"{upload_id}.json"
+
+    @staticmethod
+    def _save_info(info_path: Path, info: Dict) -> None:
+        temp_path = info_path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(info), encoding="utf-8")
+        os.replace(temp_path, info_path)
+
+    @staticmethod
+    def _describe(upload_id: str, info: Dict, offset: int) -> Dict:
+        return {
+            "upload_id": upload_id,
+            "offset": offset,
+            "length": info["length"],
+            "expires_at": info["expires_at"],
+            "filename": info["filename"]
+        }
+
+    def create_upload(self, user: User, length: int, metadata: Dict[str, str]) -> Dict:
+        """Registers a new upload of length bytes; metadata carries filename, title, language, author"""
+        filename = (metadata.get("filename") or "").strip()
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        if extension not in ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported file format. Supported formats: {', '.join(ALLOWED_EXTENSIONS)}"
+            )
+        if not (metadata.get("title") or "").strip() or not (metadata.get("language") or "").strip():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The title and language of the book are required"
+            )
+        file_service.validate_language_code(metadata["language"])
+        if length < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload-Length must not be negative"
+            )
+        if length > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"The file is too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)} MB"
+            )
+
+        self.purge_expired()
+
+        upload_id = uuid4().hex
+        part_path, info_path = self._paths(upload_id)
+        part_path.touch()
+        info = {
+            "user_id": user.id,
+            "length": length,
+            "filename": Path(filename).name,
+            "title": metadata["title"].strip(),
+            "author": (metadata.get("author") or "").strip() or None,
+            "language": metadata["language"].strip(),
+            "expires_at": time.time() + RESUMABLE_UPLOAD_TTL_HOURS * 3600
+        }
+        self._save_info(info_path, info)
+        print(f"📤 Resumable upload {upload_id} created for {info['filename']} ({length} bytes)")
+        return self._describe(upload_id, info, 0)
+
+    def _load(self, upload_id: str, user: User) -> tuple:
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+        part_path, info_path = self._paths(upload_id)
+        try:
+            info = json.loads(info_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+        if info["user_id"] != user.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+        if info["expires_at"] <= time.time():
+            self._remove(upload_id)
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="The upload has expired")
+        return part_path, info_path, info
+
+    def get_upload(self, upload_id: str, user: User) -> Dict:
+        """Current offset and length of an upload"""
+        part_path, _, info = self._load(upload_id, user)
+        return self._describe(upload_id, info, part_path.stat().st_size)
+
+    async def append_chunk(
+        self,
+        upload_id: str,
+        user: User,
+        offset: int,
+        chunks: AsyncIterator[bytes]
+    ) -> Dict:
+        """
+        Appends a request body at offset, which must match the stored offset.
+        Data received before a dropped connection is kept, so the client resumes from there.
+        """
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise HTTPException(
+                status_code=status.HTTP_423_LOCKED,
+                detail="Another chunk is being written to this upload"
+            )
+
+        async with lock:
+            try:
+                part_path, info_path, info = self._load(upload_id, user)
+                current_offset = part_path.stat().st_size
+                if offset != current_offset:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"Upload-Offset {offset} does not match the current offset {current_offset}",
+                        headers={"Upload-Offset": str(current_offset)}
+                    )
+
+                written = await self._write_chunks(part_path, chunks, info["length"] - current_offset)
+
+                info["expires_at"] = time.time() + RESUMABLE_UPLOAD_TTL_HOURS * 3600
+                await asyncio.to_thread(self._save_info, info_path, info)
+                return self._describe(upload_id, info, current_offset + written)
+            finally:
+                self._locks.pop(upload_id, None)
+
+    @staticmethod
+    async def _write_chunks(part_path: Path, chunks: AsyncIterator[bytes], remaining: int) -> int:
+        written = 0
+        buffer = bytearray()
+        with open(part_path, "ab") as part_file:
+            try:
+                async for chunk in chunks:
+                    if written + len(buffer) + len(chunk) > remaining:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="The chunk goes past the declared Upload-Length"
+                        )
+                    buffer.extend(chunk)
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await asyncio.to_thread(part_file.write, bytes(buffer))
+                        written += len(buffer)
+                        buffer.clear()
+            finally:
+                if buffer:
+                    await asyncio.to_thread(part_file.write, bytes(buffer))
+                    written += len(buffer)
+        return written
+
+    async def finalize_upload(self, db: Session, upload_id: str, user: User) -> Dict:
+        """Hands a complete upload to FileService.upload_book_file and removes the partial data"""
+        part_path, _, info = self._load(upload_id, user)
+        offset = part_path.stat().st_size
+        if offset != info["length"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"The upload is incomplete: {offset} of {info['length']} bytes received",
+                headers={"Upload-Offset": str(offset)}
+            )
+
+        with open(part_path, "rb") as part_file:
+            upload_file = UploadFile(part_file, size=offset, filename=info["filename"])
+            result = await file_service.upload_book_file(
+                db=db,
+                file=upload_file,
+                user=user,
+                book_title=info["title"],
+                book_language=info["language"],
+                book_author=info["author"]
+            )
+
+        self._remove(upload_id)
+        return result
+
+    def cancel_upload(self, upload_id: str, user: User) -> None:
+        self._load(upload_id, user)
+        self._remove(upload_id)
+
+    def _remove(self, upload_id: str) -> None:
+        for path in self._paths(upload_id):
+            path.unlink(missing_ok=True)
+
+    def purge_expired(self) -> int:
+        """Deletes expired partial uploads and returns their number"""
+        count = 0
+        now = time.time()
+        for info_path in self._directory().glob("*.json"):
+            try:
+                expired = json.loads(info_path.read_text(encoding="utf-8"))["expires_at"] <= now
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired and info_path.stem not in self._locks:
+                self._remove(info_path.stem)
+                count += 1
+        stale_before = now - RESUMABLE_UPLOAD_TTL_HOURS * 3600
+        for part_path in self._directory().glob("*.part"):
+            if not part_path.with_suffix(".json").exists() and part_path.stat().st_mtime < stale_before:
+                part_path.unlink(missing_ok=True)
+                count += 1
+        if count:
+            print(f"Deleted {count} expired partial uploads")
+        return count
+
+
+resumable_upload_service = ResumableUploadService()
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import gzip
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config import (
+    RETENTION_ACTIVITY_DAYS,
+    RETENTION_ARCHIVE_ACTIVITIES,
+    RETENTION_ARCHIVE_DIR_PATH,
+    RETENTION_ARCHIVE_SESSIONS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_INTERVAL_HOURS,
+    RETENTION_SESSION_DAYS,
+    RETENTION_SLEEP_MS
+)
+from app.models import ReadingSession, UserActivity
+
+
+class RetentionPolicy(NamedTuple):
+    """How long the rows of one table are kept; days <= 0 keeps them forever"""
+    name: str
+    model: Any
+    time_column: str
+    days: int
+    archive: bool
+
+
+RETENTION_POLICIES = (
+    RetentionPolicy("user_activities", UserActivity, "created_at", RETENTION_ACTIVITY_DAYS, RETENTION_ARCHIVE_ACTIVITIES),
+    RetentionPolicy("reading_sessions", ReadingSession, "start_time", RETENTION_SESSION_DAYS, RETENTION_ARCHIVE_SESSIONS)
+)
+
+
+def _row_to_dict(row: Any) -> Dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row._mapping.items()
+    }
+
+
+class RetentionService:
+    """
+    Deletes rows older than their table's policy in primary-key ordered batches,
+    each in its own short transaction with a pause in between, so locks and undo
+    stay small. Rows can be archived to gzip-compressed NDJSON before deletion.
+    """
+
+    def __init__(self):
+        self.status: Dict[str, Any] = {
+            "running": False,
+            "started_at": None,
+            "finished_at": None,
+            "tables": {},
+            "error": None,
+            "runs": 0
+        }
+        self._scheduler: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def purge_table(
+        self,
+        db: Session,
+        policy: RetentionPolicy,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        sleep_ms: int = RETENTION_SLEEP_MS,
+        archive_dir: Path = RETENTION_ARCHIVE_DIR_PATH,
+        stop: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Deletes the rows of one table that are past its policy; returns the table's metrics.
+        Setting stop ends the run after the current batch.
+        """
+        stop = stop or threading.Event()
+        cutoff = datetime.now() - timedelta(days=policy.days)
+        metrics = {
+            "cutoff": cutoff.isoformat(),
+            "deleted": 0,
+            "archived": 0,
+            "batches": 0,
+            "last_id": None,
+            "archive": None,
+            "rows_per_second": 0.0
+        }
+        self.status["tables"][policy.name] = metrics
+        if policy.days <= 0:
+            return metrics
+
+        model = policy.model
+        table = model.__table__
+        columns = table.c if policy.archive else [model.id]
+        archive_path = None
+        if policy.archive:
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            archive_path = archive_dir / f"{policy.name}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.ndjson.gz"
+            metrics["archive"] = str(archive_path)
+
+        started = time.monotonic()
+        last_id = 0
+        while not stop.is_set():
+            rows = db.execute(
+                select(*columns).where(
+                    getattr(model, policy.time_column) < cutoff,
+                    model.id > last_id
+                ).order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            ids = [row.id for row in rows]
+            if archive_path is not None:
+                # Each batch is a complete gzip member, written before its rows are deleted
+                with gzip.open(archive_path, "at", encoding="utf-8") as archive:
+                    for row in rows:
+                        archive.write(json.dumps(_row_to_dict(row), ensure_ascii=False, default=str) + "\n")
+                metrics["archived"] += len(rows)
+
+            try:
+                db.execute(delete(table).where(table.c.id.in_(ids)))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            last_id = ids[-1]
+            metrics["deleted"] += len(ids)
+            metrics["batches"] += 1
+            metrics["last_id"] = last_id
+            metrics["rows_per_second"] = round(metrics["deleted"] / max(time.monotonic() - started, 1e-6), 1)
+            print(f"🧹 Retention: {metrics['deleted']} rows deleted from {policy.name}")
+
+            if len(rows) < batch_size:
+                break
+            if sleep_ms > 0:
+                stop.wait(sleep_ms / 1000)
+
+        return metrics
+
+    def run_retention(self, db: Session, policies: Optional[List[RetentionPolicy]] = None, **options) -> Dict[str, Any]:
+        """Applies every policy in turn; returns the metrics per table"""
+        return {
+            policy.name: self.purge_table(db, policy, **options)
+            for policy in (policies if policies is not None else RETENTION_POLICIES)
+        }
+
+    def run_retention_job(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        """Runs the retention with its own database session and records the outcome in status"""
+        from app.database import SessionLocal
+
+        session_factory = session_factory or SessionLocal
+
+        if self.status["running"]:
+            print("⚠️ Retention is already running")
+            return
+
+        self._stop.clear()
+        self.status.update({
+            "running": True,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "tables": {},
+            "error": None
+        })
+
+        db = session_factory()
+        try:
+            self.run_retention(db, stop=self._stop)
+        except Exception as e:
+            db.rollback()
+            self.status["error"] = str(e)
+            print(f"❌ Retention failed: {e}")
+        finally:
+            db.close()
+            self.status["running"] = False
+            self.status["finished_at"] = datetime.now().isoformat()
+            self.status["runs"] += 1
+
+    async def _periodic_retention(self, interval_hours: float, session_factory: Optional[Callable[[], Session]]) -> None:
+        while True:
+            await asyncio.to_thread(self.run_retention_job, session_factory)
+            await asyncio.sleep(interval_hours * 3600)
+
+    def start_scheduler(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        """Starts periodic retention runs when an interval is configured"""
+        if RETENTION_INTERVAL_HOURS > 0 and self._scheduler is None:
+            self._scheduler = asyncio.create_task(
+                self._periodic_retention(RETENTION_INTERVAL_HOURS, session_factory)
+            )
+
+    async def stop_scheduler(self) -> None:
+        """Cancels the schedule and ends a running purge after its current batch"""
+        self._stop.set()
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            try:
+                await self._scheduler
+            except asyncio.CancelledError:
+                pass
+            self._scheduler = None
+
+
+retention_service = RetentionService()
+
+
+def main() -> None:
+    """Command line entry point: python -m app.services.retention"""
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Delete activities and reading sessions past their retention period")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE, help="Rows per delete statement")
+    parser.add_argument("--sleep-ms", type=int, default=RETENTION_SLEEP_MS, help="Pause between batches")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = retention_service.run_retention(db, batch_size=args.batch_size, sleep_ms=args.sleep_ms)
+    finally:
+        db.close()
+
+    print(f"✅ Retention finished: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import re
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, false, literal, or_, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Query, Session
+
+from app.models import Book
+
+SEARCH_MODES = ("natural", "boolean")
+
+BOOLEAN_TERM_PATTERN = re.compile(r'([+-]?)("[^"]*"|[^\s"]+)')
+
+
+class SearchBackend:
+    """Fallback search backend using substring matching (no index)"""
+
+    name = "like"
+
+    def apply(self, query: Query, search: str, mode: str = "natural") -> Tuple[Query, Any]:
+        """
+        Restrict a query joined with Book to the books matching the search.
+        Returns the filtered query and a relevance expression (higher is better).
+        """
+        query = query.filter(or_(
+            Book.title.ilike(f"%{search}%"),
+            Book.author.ilike(f"%{search}%"),
+            Book.description.ilike(f"%{search}%")
+        ))
+        return query, literal(0)
+
+
+class MySQLFullTextSearch(SearchBackend):
+    """Search backend using the MySQL FULLTEXT index on title, author and description"""
+
+    name = "mysql"
+
+    def apply(self, query: Query, search: str, mode: str = "natural") -> Tuple[Query, Any]:
+        relevance = match(Book.title, Book.author, Book.description, against=search)
+        if mode == "boolean":
+            relevance = relevance.in_boolean_mode()
+        else:
+            relevance = relevance.in_natural_language_mode()
+
+        return query.filter(relevance), relevance
+
+
+class SQLiteFTS5Search(SearchBackend):
+    """Search backend using the SQLite FTS5 mirror of the books table"""
+
+    name = "sqlite"
+
+    @staticmethod
+    def _quote(term: str) -> str:
+        """Quote a term or phrase so FTS5 does not parse it as query syntax"""
+        prefix = term.endswith("*")
+        term = term.rstrip("*").strip('"').replace('"', '""')
+        return f'"{term}"*' if prefix else f'"{term}"'
+
+    @staticmethod
+    def build_match_expression(search: str, mode: str = "natural") -> Optional[str]:
+        """
+        Translate a user query into an FTS5 MATCH expression.
+        Natural mode matches any word by prefix, boolean mode follows the MySQL
+        syntax: +required, -excluded, "exact phrase" and trailing * for prefixes.
+        """
+        if mode != "boolean":
+            words = re.findall(r"\w+", search, re.UNICODE)
+            if not words:
+                return None
+            return " OR ".join(f'"{word}"*' for word in words)
+
+        required: List[str] = []
+        optional: List[str] = []
+        excluded: List[str] = []
+
+        for operator, term in BOOLEAN_TERM_PATTERN.findall(search):
+            if not re.search(r"\w", term, re.UNICODE):
+                continue
+            quoted = SQLiteFTS5Search._quote(term)
+            if operator == "+":
+                required.append(quoted)
+            elif operator == "-":
+                excluded.append(quoted)
+            else:
+                optional.append(quoted)
+
+        if required:
+            expression = " AND ".join(required)
+        elif optional:
+            expression = " OR ".join(optional)
+        else:
+            return None
+
+        if excluded:
+            expression = f"({expression}) NOT ({' OR '.join(excluded)})"
+
+        return expression
+
+    def apply(self, query: Query, search: str, mode: str = "natural") -> Tuple[Query, Any]:
+        expression = self.build_match_expression(search, mode)
+        if expression is None:
+            return query.filter(false()), literal(0)
+
+        hits = text(
+            "SELECT rowid AS book_id, -bm25(books_fts, 10.0, 5.0, 1.0) AS score "
+            "FROM books_fts WHERE books_fts MATCH :fts_query"
+        ).bindparams(fts_query=expression).columns(book_id=Integer, score=Float).subquery("fts_hits")
+
+        query = query.join(hits, hits.c.book_id == Book.id)
+        return query, hits.c.score
+
+
+def get_search_backend(db: Session) -> SearchBackend:
+    """Select the search backend matching the database dialect of the session"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        return mysql_search_backend
+    if dialect == "sqlite":
+        return sqlite_search_backend
+    return like_search_backend
+
+
+def apply_search(
+    db: Session,
+    query: Query,
+    search: str,
+    mode: str = "natural"
+) -> Tuple[Query, Any]:
+    """Apply full-text search to a query selecting from Book"""
+    if mode not in SEARCH_MODES:
+        mode = "natural"
+    return get_search_backend(db).apply(query, search.strip(), mode)
+
+
+like_search_backend = SearchBackend()
+mysql_search_backend = MySQLFullTextSearch()
+sqlite_search_backend = SQLiteFTS5Search()
@@ -1,74 +1,101 @@
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
-from sqlalchemy import func, distinct, and_
+from sqlalchemy import func, distinct, and_, case, select
 from sqlalchemy.orm import Session
 
-from app.models import User, UserBook, ReadingSession, Book
+from app.models import User, UserBook, ReadingSession, Book, BookFormat
+from app.utils.sql import minutes_between
+
+DEFAULT_PAGE_ESTIMATE = 300
 
 
 class StatsService:
     """Service for working with reading statistics"""
     
+    @staticmethod
+    def page_totals():
+        """Subquery with the largest known page count of each book"""
+        return (
+            select(
+                BookFormat.book_id,
+                func.max(func.nullif(BookFormat.page_count, 0)).label("page_count")
+            )
+            .group_by(BookFormat.book_id)
+            .subquery()
+        )
+
+    @staticmethod
+    def progress_columns(page_totals, cap: bool = False) -> Tuple[Any, Any, Any]:
+        """
+        SQL expressions for the current page, total pages and percentage of a UserBook
+        joined with page_totals. Books without a known page count are assumed to have
+        DEFAULT_PAGE_ESTIMATE pages.
+        """
+        current_page = func.coalesce(UserBook.bookmark_position, 0)
+        total_pages = func.coalesce(page_totals.c.page_count, DEFAULT_PAGE_ESTIMATE)
+        percentage = current_page * 100.0 / total_pages
+        if cap:
+            percentage = case((current_page >= total_pages, 100.0), else_=percentage)
+        return current_page, total_pages, percentage
+
     @staticmethod
     def get_user_reading_stats(db: Session, user_id: int) -> Dict[str, Any]:
         """
         Get general user reading statistics.
         """
-        user_sessions_query = (
-            db.query(ReadingSession)
+        total_sessions, total_time = (
+            db.query(
+                func.count(ReadingSession.id),
+                func.sum(
+                    case(
+                        (ReadingSession.end_time != None,
+                         minutes_between(db, ReadingSession.start_time, ReadingSession.end_time)),
+                        else_=0
+                    )
+                )
+            )
             .join(UserBook, ReadingSession.user_book_id == UserBook.id)
             .filter(UserBook.user_id == user_id)
+            .one()
         )
+        total_time = float(total_time or 0)
         
-        total_sessions = user_sessions_query.count()
-        
-        total_time = 0
-        finished_sessions = user_sessions_query.filter(ReadingSession.end_time != None).all()
-        
-        for session in finished_sessions:
-            if session.end_time and session.start_time:
-                duration = (session.end_time - session.start_time).total_seconds() / 60
-                total_time += duration
-        
-        total_pages = db.query(func.sum(UserBook.bookmark_position)).filter(
-            UserBook.user_id == user_id,
-            UserBook.bookmark_position > 0
-        ).scalar() or 0
-        
-        completed_books = db.query(UserBook).filter(
-            UserBook.user_id == user_id,
-            UserBook.status == "read"
-        ).count()
+        page_totals = StatsService.page_totals()
+        current_page, _, percentage = StatsService.progress_columns(page_totals, cap=True)
+        started = UserBook.bookmark_position > 0
+        total_pages, average_progress = (
+            db.query(
+                func.sum(case((started, current_page), else_=0)),
+                func.avg(case((UserBook.status.in_(["reading", "read"]), percentage), else_=None))
+            )
+            .outerjoin(page_totals, page_totals.c.book_id == UserBook.book_id)
+            .filter(UserBook.user_id == user_id)
+            .one()
+        )
+        total_pages = total_pages or 0
         
-        dropped_books = db.query(UserBook).filter(
-            UserBook.user_id == user_id,
-            UserBook.status == "dropped"
-        ).count()
+        status_counts = dict(
+            db.query(UserBook.status, func.count(UserBook.id))
+            .filter(UserBook.user_id == user_id)
+            .group_by(UserBook.status)
+            .all()
+        )
         
         average_speed = 0
         if total_time > 0:
             average_speed = (total_pages / total_time) * 60
         
-        reading_now = db.query(UserBook).filter(
-            UserBook.user_id == user_id,
-            UserBook.status == "reading"
-        ).count()
-        
-        want_to_read = db.query(UserBook).filter(
-            UserBook.user_id == user_id,
-            UserBook.status == "Want to read"
-        ).count()
-        
         return {
             "total_sessions": total_sessions,
             "total_reading_time": round(total_time), 
             "total_pages_read": total_pages,
-            "completed_books": completed_books,
-            "dropped_books": dropped_books,  
+            "completed_books": status_counts.get("read", 0),
+            "dropped_books": status_counts.get("dropped", 0),  
             "average_reading_speed": round(average_speed, 2), 
-            "reading_now": reading_now,
-            "want_to_read": want_to_read
+            "average_progress": round(float(average_progress or 0), 2),
+            "reading_now": status_counts.get("reading", 0),
+            "want_to_read": status_counts.get("Want to read", 0)
         }
     
     @staticmethod
@@ -76,48 +103,55 @@ class StatsService:
         """
         Get the reading progress of a specific book.
         """
-        user_book = db.query(UserBook).filter(
-            UserBook.id == user_book_id,
-            UserBook.user_id == user_id
-        ).first()
+        page_totals = StatsService.page_totals()
+        current_page, total_pages, percentage = StatsService.progress_columns(page_totals)
+        time_spent = (
+            select(func.sum(minutes_between(db, ReadingSession.start_time, ReadingSession.end_time)))
+            .where(
+                ReadingSession.user_book_id == UserBook.id,
+                ReadingSession.end_time != None
+            )
+            .scalar_subquery()
+        )
+        
+        progress = (
+            db.query(
+                Book.id,
+                Book.title,
+                UserBook.status,
+                current_page.label("current_page"),
+                total_pages.label("total_pages"),
+                func.round(percentage, 2).label("percentage"),
+                func.coalesce(time_spent, 0).label("time_spent")
+            )
+            .select_from(UserBook)
+            .outerjoin(Book, Book.id == UserBook.book_id)
+            .outerjoin(page_totals, page_totals.c.book_id == UserBook.book_id)
+            .filter(
+                UserBook.id == user_book_id,
+                UserBook.user_id == user_id
+            )
+            .first()
+        )
         
-        if not user_book:
+        if not progress:
             return {
                 "error": "The book was not found in the user's collection"
             }
         
-        book = db.query(Book).filter(Book.id == user_book.book_id).first()
-        
-        if not book:
+        if progress.id is None:
             return {
                 "error": "Book not found"
             }
         
-
-        total_pages = 300 
-        current_page = user_book.bookmark_position or 0
-        
-        percentage = (current_page / total_pages) * 100 if total_pages > 0 else 0
-        
-        total_time = 0
-        sessions = db.query(ReadingSession).filter(
-            ReadingSession.user_book_id == user_book_id,
-            ReadingSession.end_time != None
-        ).all()
-        
-        for session in sessions:
-            if session.end_time and session.start_time:
-                duration = (session.end_time - session.start_time).total_seconds() / 60
-                total_time += duration
-        
         return {
-            "book_id": book.id,
-            "book_title": book.title,
-            "current_page": current_page,
-            "total_pages": total_pages,
-            "percentage": round(percentage, 2),
-            "time_spent": round(total_time),  
-            "status": user_book.status
+            "book_id": progress.id,
+            "book_title": progress.title,
+            "current_page": progress.current_page,
+            "total_pages": progress.total_pages,
+            "percentage": float(progress.percentage),
+            "time_spent": round(progress.time_spent),  
+            "status": progress.status
         }
     
     @staticmethod
@@ -1,12 +1,21 @@
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
-from sqlalchemy import and_, or_, func, desc, asc
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, func, desc, asc, case
 from sqlalchemy.orm import Session, joinedload
 
 from app.models import UserBook, Book, User
 from app.schemas import UserBookUpdate
 from app.services.activity import activity_service
+from app.services.search import apply_search
+from app.services.stats import stats_service
+from app.utils.pagination import encode_cursor, decode_cursor, fetch_page
+
+# MySQL sorts ENUM columns by declaration order, so statuses are sorted and paged
+# by that ordinal on every database rather than by their text
+STATUS_ORDINALS = {value: ordinal for ordinal, value in enumerate(UserBook.__table__.c.status.type.enums)}
+STATUS_ORDER = case(STATUS_ORDINALS, value=UserBook.status)
 
 
 class UserLibraryService:
@@ -21,47 +30,73 @@ class UserLibraryService:
         status_filter: Optional[str] = None,
         search: Optional[str] = None,
         sort_by: str = "added_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        search_mode: str = "natural",
+        cursor: Optional[str] = None,
+        include_total: bool = True
     ) -> Dict[str, Any]:
-        """Get a user's personal library with filtering and search"""
+        """
+        Get a user's personal library with filtering and search.
+        Pages either by offset (skip) or by the keyset cursor returned as next_cursor.
+        """
         
         query = db.query(UserBook).join(Book).filter(UserBook.user_id == user_id)
         
         filters = []
+        relevance = None
         
         if status_filter:
             filters.append(UserBook.status == status_filter)
         
         if search:
-            search_filter = or_(
-                Book.title.ilike(f"%{search}%"),
-                Book.author.ilike(f"%{search}%"),
-                Book.description.ilike(f"%{search}%")
-            )
-            filters.append(search_filter)
+            query, relevance = apply_search(db, query, search, search_mode)
         
         if filters:
             query = query.filter(and_(*filters))
         
-        total_count = query.count()
+        total_count = query.count() if include_total else None
         
-        if sort_by == "title":
-            sort_column = Book.title
-        elif sort_by == "author":
-            sort_column = Book.author
-        elif sort_by == "status":
-            sort_column = UserBook.status
-        elif sort_by == "added_at":
-            sort_column = UserBook.added_at
-        else:
-            sort_column = UserBook.added_at
+        sort_columns = {
+            "title": (Book.title, lambda ub: ub.book.title),
+            "author": (Book.author, lambda ub: ub.book.author),
+            "status": (STATUS_ORDER, lambda ub: STATUS_ORDINALS[ub.status]),
+            "added_at": (UserBook.added_at, lambda ub: ub.added_at)
+        }
         
-        if sort_order.lower() == "desc":
-            query = query.order_by(desc(sort_column))
+        descending = sort_order.lower() == "desc"
+        if sort_by == "relevance" and relevance is not None:
+            if cursor:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cursor pagination is not available when sorting by relevance"
+                )
+            sort_column = None
+            query = query.order_by(desc(relevance), desc(UserBook.id))
         else:
-            query = query.order_by(asc(sort_column))
-        
-        user_books = query.offset(skip).limit(limit).all()
+            if sort_by not in sort_columns:
+                sort_by = "added_at"
+            sort_column, sort_value = sort_columns[sort_by]
+            if descending:
+                query = query.order_by(desc(sort_column), desc(UserBook.id))
+            else:
+                query = query.order_by(asc(sort_column), asc(UserBook.id))
+        
+        cursor_key = f"{sort_by}:{sort_order.lower()}"
+        cursor_position = decode_cursor(cursor, cursor_key) if cursor else None
+        user_books, has_next = fetch_page(
+            query,
+            limit,
+            skip=skip,
+            cursor_position=cursor_position,
+            sort_column=sort_column,
+            id_column=UserBook.id,
+            descending=descending
+        )
+        
+        next_cursor = None
+        if has_next and sort_column is not None:
+            last_user_book = user_books[-1]
+            next_cursor = encode_cursor(cursor_key, sort_value(last_user_book), last_user_book.id)
         
         books_data = []
         for user_book in user_books:
@@ -96,11 +131,12 @@ class UserLibraryService:
         return {
             "books": books_data,
             "total": total_count,
-            "page": (skip // limit) + 1,
-            "pages": (total_count + limit - 1) // limit,
+            "page": None if cursor else (skip // limit) + 1,
+            "pages": (total_count + limit - 1) // limit if total_count is not None else None,
             "per_page": limit,
-            "has_next": skip + limit < total_count,
-            "has_prev": skip > 0
+            "has_next": has_next,
+            "has_prev": bool(cursor) or skip > 0,
+            "next_cursor": next_cursor
         }
     
     @staticmethod
@@ -334,36 +370,44 @@ class UserLibraryService:
     def get_user_reading_progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
         """Get reading progress for all user books"""
         
-        user_books = db.query(UserBook).join(Book).filter(
+        page_totals = stats_service.page_totals()
+        current_page, estimated_pages, percentage = stats_service.progress_columns(page_totals, cap=True)
+        
+        user_books = db.query(
+            UserBook.id,
+            UserBook.book_id,
+            Book.title,
+            Book.author,
+            UserBook.status,
+            current_page.label("current_page"),
+            estimated_pages.label("estimated_pages"),
+            func.round(percentage, 1).label("percentage"),
+            UserBook.added_at,
+            UserBook.is_local
+        ).select_from(UserBook).join(
+            Book, Book.id == UserBook.book_id
+        ).outerjoin(
+            page_totals, page_totals.c.book_id == UserBook.book_id
+        ).filter(
             UserBook.user_id == user_id,
             UserBook.status.in_(["reading", "read"])
         ).all()
         
-        progress_data = []
-        
-        for user_book in user_books:
-            estimated_pages = 300  
-            current_page = user_book.bookmark_position or 0
-            
-            if estimated_pages > 0:
-                percentage = min((current_page / estimated_pages) * 100, 100)
-            else:
-                percentage = 0
-            
-            progress_data.append({
+        return [
+            {
                 "user_book_id": user_book.id,
-                "book_id": user_book.book.id,
-                "title": user_book.book.title,
-                "author": user_book.book.author,
+                "book_id": user_book.book_id,
+                "title": user_book.title,
+                "author": user_book.author,
                 "status": user_book.status,
-                "current_page": current_page,
-                "estimated_pages": estimated_pages,
-                "percentage": round(percentage, 1),
+                "current_page": user_book.current_page,
+                "estimated_pages": user_book.estimated_pages,
+                "percentage": float(user_book.percentage),
                 "last_read": user_book.added_at.isoformat() if user_book.added_at else None,
                 "is_local": user_book.is_local
-            })
-        
-        return progress_data
+            }
+            for user_book in user_books
+        ]
     
     @staticmethod
     def get_reading_activity(
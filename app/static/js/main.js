@@ -247,7 +247,46 @@ class OwnLibAPI {
         const formData = new FormData();
         formData.append('file', file);
         
-        return this.uploadFile('/import-export/import-library', formData);
+        const job = await this.uploadFile('/import-export/jobs', formData);
+        return this.waitForImportJob(job.id);
+    }
+
+    async fetchBlob(endpoint) {
+        const url = `${this.baseUrl}${endpoint}`;
+        const config = this.token ? { headers: { 'Authorization': `Bearer ${this.token}` } } : {};
+
+        const response = await fetch(url, config);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+        }
+        return response.blob();
+    }
+
+    async exportLibrary(params = {}) {
+        const queryString = new URLSearchParams(params).toString();
+        return this.fetchBlob(`/import-export/export-library${queryString ? `?${queryString}` : ''}`);
+    }
+
+    async downloadUserBookFile(userBookId) {
+        return this.fetchBlob(`/files/user-books/${userBookId}/content`);
+    }
+
+    async getImportJob(jobId) {
+        return this.get(`/import-export/jobs/${jobId}`);
+    }
+
+    async waitForImportJob(jobId, interval = 1000) {
+        while (true) {
+            const job = await this.getImportJob(jobId);
+            if (job.status === 'completed') {
+                return { statistics: job.result, job, success: true };
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Import failed');
+            }
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
     }
 
     async requestPasswordReset(email) {
@@ -514,7 +553,7 @@ class OwnLibUI {
 
         if (userBook.is_local && userBook.file_path) {
             buttons = `
-                <button class="btn btn-primary btn-sm" onclick="app.downloadLocalBook('${userBook.file_path}', '${userBook.book.title}')">
+                <button class="btn btn-primary btn-sm" onclick="app.downloadLocalBook(${userBook.id}, '${userBook.file_path}', '${userBook.book.title}')">
                     📥 Download
                 </button>
             ` + buttons;
@@ -609,16 +648,22 @@ class OwnLibUI {
         });
     }
 
-    downloadLocalBook(filePath, bookTitle) {
-        const link = document.createElement('a');
-        link.href = `/uploads/${filePath}`;
-        link.download = bookTitle;
-        link.target = '_blank';
-        document.body.appendChild(link);
-        link.click();
-        document.body.removeChild(link);
-        
-        this.showMessage('Downloading started', 'info');
+    async downloadLocalBook(userBookId, filePath, bookTitle) {
+        try {
+            const blob = await this.api.downloadUserBookFile(userBookId);
+            const url = URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = `${bookTitle}${filePath.slice(filePath.lastIndexOf('.'))}`;
+            document.body.appendChild(link);
+            link.click();
+            document.body.removeChild(link);
+            URL.revokeObjectURL(url);
+            
+            this.showMessage('Downloading started', 'info');
+        } catch (error) {
+            this.showMessage('Download error: ' + error.message, 'error');
+        }
     }
 
     openGutenbergBook(gutenbergId) {
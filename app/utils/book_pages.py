@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+PAGES_DIRECTORY = "pages"
+PAGINATED_EXTENSIONS = (".txt", ".html", ".htm", ".epub")
+
+# Index layout: magic, version, offset width (4 or 8 bytes), page size in
+# characters, page count, then count + 1 little-endian byte offsets into the
+# extracted text, so page n is text[offsets[n - 1]:offsets[n]].
+INDEX_MAGIC = b"OLPI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBBII")
+
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "pre", "section", "article", "header", "footer", "table", "hr"
+}
+SKIPPED_TAGS = {"script", "style", "head", "title"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def normalize_text(text: str) -> str:
+    """Collapses runs of spaces and keeps at most one blank line between paragraphs"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t\f\v\u00a0]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return normalize_text("".join(parser.parts))
+
+
+def decode_text(data: bytes) -> str:
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("latin-1")
+
+
+def extract_text(file_path: Path) -> str:
+    """Returns the readable text of a TXT, HTML or EPUB file"""
+    extension = file_path.suffix.lower()
+
+    if extension == ".txt":
+        return normalize_text(decode_text(file_path.read_bytes()))
+
+    if extension in (".html", ".htm"):
+        return html_to_text(decode_text(file_path.read_bytes()))
+
+    if extension == ".epub":
+        import ebooklib
+        from ebooklib import epub
+
+        book = epub.read_epub(str(file_path))
+        items = [book.get_item_with_id(item_id) for item_id, _ in book.spine]
+        documents = [item for item in items if item is not None and item.get_type() == ebooklib.ITEM_DOCUMENT]
+        if not documents:
+            documents = list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
+        return "\n\n".join(
+            text for text in (html_to_text(decode_text(item.get_content())) for item in documents) if text
+        )
+
+    raise ValueError(f"Unsupported format for pagination: {extension}")
+
+
+def split_pages(text: str, page_chars: int) -> List[str]:
+    """
+    Splits text into pages of at most page_chars characters, breaking at the last
+    paragraph, line or word boundary in the second half of the page when there is one.
+    """
+    pages = []
+    position = 0
+    length = len(text)
+    while position < length:
+        end = position + page_chars
+        if end < length:
+            window_start = position + page_chars // 2
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, window_start, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        pages.append(text[position:end])
+        position = end
+    return pages or [""]
+
+
+def page_index_key(relative_path: str) -> str:
+    """Blobs are paginated once per content hash, other files once per path"""
+    path = Path(relative_path)
+    if path.parts and path.parts[0] == "blobs":
+        return path.stem
+    return hashlib.sha256(relative_path.encode("utf-8")).hexdigest()
+
+
+def page_index_paths(pages_dir: Path, key: str) -> Tuple[Path, Path]:
+    return pages_dir / f"{key}.txt", pages_dir / f"{key}.idx"
+
+
+def extract_pdf_pages(file_path: Path) -> List[str]:
+    """Returns the text of each page of a PDF"""
+    import PyPDF2
+
+    with open(file_path, "rb") as pdf_file:
+        reader = PyPDF2.PdfReader(pdf_file)
+        return [normalize_text(page.extract_text() or "") for page in reader.pages]
+
+
+def write_page_index(pages: List[str], pages_dir: Path, key: str, page_chars: int) -> int:
+    """
+    Stores the pages as one text file with a page-offset index.
+    Both files are replaced atomically. Returns the page count.
+    """
+    text_path, index_path = page_index_paths(pages_dir, key)
+    pages_dir.mkdir(parents=True, exist_ok=True)
+
+    offsets = [0]
+    text_fd, temp_text_name = tempfile.mkstemp(dir=pages_dir, suffix=".tmp")
+    with os.fdopen(text_fd, "wb") as text_file:
+        for page in pages:
+            encoded = page.encode("utf-8")
+            text_file.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+
+    width = 4 if offsets[-1] < 2 ** 32 else 8
+    offset_format = "<I" if width == 4 else "<Q"
+    index_fd, temp_index_name = tempfile.mkstemp(dir=pages_dir, suffix=".tmp")
+    with os.fdopen(index_fd, "wb") as index_file:
+        index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, width, page_chars, len(pages)))
+        index_file.write(b"".join(struct.pack(offset_format, offset) for offset in offsets))
+
+    os.replace(temp_text_name, text_path)
+    os.replace(temp_index_name, index_path)
+    return len(pages)
+
+
+def build_page_index(file_path: Path, pages_dir: Path, key: str, page_chars: int) -> int:
+    """Extracts the text of file_path, splits it into pages and stores them; returns the page count"""
+    return write_page_index(split_pages(extract_text(Path(file_path)), page_chars), pages_dir, key, page_chars)
+
+
+def read_index_header(index_path: Path) -> Optional[Tuple[int, int, int]]:
+    """Returns (offset width, page size, page count) or None if the index is missing or outdated"""
+    try:
+        with open(index_path, "rb") as index_file:
+            magic, version, width, page_chars, count = INDEX_HEADER.unpack(index_file.read(INDEX_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+    return width, page_chars, count
+
+
+def read_page(pages_dir: Path, key: str, page: int) -> Optional[str]:
+    """
+    Reads page (1-based) by seeking to its two offsets in the index and then to
+    its bytes in the text, without loading either file.
+    """
+    text_path, index_path = page_index_paths(pages_dir, key)
+    header = read_index_header(index_path)
+    if header is None:
+        return None
+    width, _, count = header
+    if page < 1 or page > count:
+        return None
+
+    offset_format = "<II" if width == 4 else "<QQ"
+    with open(index_path, "rb") as index_file:
+        index_file.seek(INDEX_HEADER.size + (page - 1) * width)
+        start, end = struct.unpack(offset_format, index_file.read(width * 2))
+
+    with open(text_path, "rb") as text_file:
+        text_file.seek(start)
+        return text_file.read(end - start).decode("utf-8")
+
+
+def read_pages(pages_dir: Path, key: str) -> Optional[List[str]]:
+    """Reads all stored pages of a book, or None if it has no index"""
+    text_path, index_path = page_index_paths(pages_dir, key)
+    header = read_index_header(index_path)
+    if header is None:
+        return None
+    width, _, count = header
+
+    with open(index_path, "rb") as index_file:
+        index_file.seek(INDEX_HEADER.size)
+        offsets = struct.unpack(f"<{count + 1}{'I' if width == 4 else 'Q'}", index_file.read(width * (count + 1)))
+    data = text_path.read_bytes()
+    return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+
+def remove_page_index(pages_dir: Path, key: str) -> None:
+    for path in page_index_paths(pages_dir, key):
+        path.unlink(missing_ok=True)
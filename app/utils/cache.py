@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry TTL and LRU eviction.
+    Stores at most maxsize entries; the least recently used one is evicted first.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value for ttl seconds (the cache default if not given)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+
+
+class DiskCache:
+    """
+    JSON file cache with per-entry TTL that survives restarts.
+    Each entry is stored in its own file named after the hash of the key.
+    """
+
+    def __init__(self, directory: Path, ttl: float = 3600.0):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: Hashable) -> Path:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the stored value or default if it is missing, expired or unreadable"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return default
+
+        if entry.get("expires_at", 0) <= time.time():
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return entry.get("value", default)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a JSON-serializable value, replacing the file atomically"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump({"expires_at": expires_at, "value": value}, cache_file)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            temp_path.unlink(missing_ok=True)
+            print(f"Error writing a cache entry: {e}")
+
+    def purge_expired(self) -> int:
+        """Deletes expired entries and returns their number"""
+        count = 0
+        now = time.time()
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as cache_file:
+                    expired = json.load(cache_file).get("expires_at", 0) <= now
+            except (OSError, ValueError):
+                expired = True
+            if expired:
+                path.unlink(missing_ok=True)
+                count += 1
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "directory": str(self.directory)
+        }
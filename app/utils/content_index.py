@@ -0,0 +1,137 @@
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.book_pages import (
+    PAGINATED_EXTENSIONS,
+    extract_pdf_pages,
+    extract_text,
+    page_index_paths,
+    read_index_header,
+    read_pages,
+    split_pages,
+    write_page_index
+)
+
+MAX_TERM_LENGTH = 64
+TOKEN_PATTERN = re.compile(r"\w+")
+PDF_PAGE_CHARS = 0
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; the same rules are used for indexing and queries"""
+    return [token for token in TOKEN_PATTERN.findall(text.casefold()) if len(token) <= MAX_TERM_LENGTH]
+
+
+def encode_varints(numbers: Iterable[int]) -> bytes:
+    """Encodes ascending numbers as LEB128 varints of the gaps between them"""
+    encoded = bytearray()
+    previous = 0
+    for number in numbers:
+        gap = number - previous
+        previous = number
+        while gap >= 0x80:
+            encoded.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        encoded.append(gap)
+    return bytes(encoded)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    numbers = []
+    value = 0
+    shift = 0
+    previous = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        numbers.append(previous)
+        value = 0
+        shift = 0
+    return numbers
+
+
+def index_pages(pages: List[str]) -> Tuple[Dict[str, List[int]], List[int], int]:
+    """
+    Returns the token positions of every term, the position of the first token
+    of each page and the total number of tokens.
+    """
+    positions: Dict[str, List[int]] = {}
+    page_starts = []
+    position = 0
+    for page in pages:
+        page_starts.append(position)
+        for token in tokenize(page):
+            positions.setdefault(token, []).append(position)
+            position += 1
+    return positions, page_starts, position
+
+
+def page_of(page_starts: List[int], position: int) -> int:
+    """1-based page containing a token position"""
+    return bisect_right(page_starts, position)
+
+
+def phrase_positions(term_positions: List[List[int]]) -> List[int]:
+    """Positions where the terms occur one after another"""
+    if not term_positions:
+        return []
+    following = [set(positions) for positions in term_positions[1:]]
+    return [
+        start for start in term_positions[0]
+        if all(start + offset in positions for offset, positions in enumerate(following, 1))
+    ]
+
+
+def load_book_pages(file_path: Path, pages_dir: Path, key: str, page_chars: int) -> List[str]:
+    """
+    Pages of a stored book as the reader shows them, reusing the page store when it
+    is current. PDFs are stored with their native pages.
+    """
+    extension = file_path.suffix.lower()
+    expected_chars = PDF_PAGE_CHARS if extension == ".pdf" else page_chars
+    header = read_index_header(page_index_paths(pages_dir, key)[1])
+    if header is not None and header[1] == expected_chars:
+        pages = read_pages(pages_dir, key)
+        if pages is not None:
+            return pages
+
+    if extension == ".pdf":
+        pages = extract_pdf_pages(file_path)
+    elif extension in PAGINATED_EXTENSIONS:
+        pages = split_pages(extract_text(file_path), page_chars)
+    else:
+        raise ValueError(f"Unsupported format for content indexing: {extension}")
+    write_page_index(pages, pages_dir, key, expected_chars)
+    return pages
+
+
+def index_book_file(file_path: str, pages_dir: str, key: str, page_chars: int) -> Dict[str, object]:
+    """
+    Builds the positional index of one book file. Runs in a worker process.
+    Postings are returned as term -> (frequency, varint-encoded positions).
+    """
+    pages = load_book_pages(Path(file_path), Path(pages_dir), key, page_chars)
+    positions, page_starts, token_count = index_pages(pages)
+    return {
+        "token_count": token_count,
+        "page_starts": encode_varints(page_starts),
+        "postings": {term: (len(term_positions), encode_varints(term_positions))
+                     for term, term_positions in positions.items()}
+    }
+
+
+def make_snippet(text: str, terms: List[str], width: int = 80) -> Optional[str]:
+    """Text around the first occurrence of the terms as a phrase, with the match in the middle"""
+    pattern = r"(?<!\w)" + r"\W+".join(re.escape(term) for term in terms) + r"(?!\w)"
+    match = re.search(pattern, text, re.IGNORECASE)
+    if match is None:
+        return None
+    start = max(match.start() - width, 0)
+    end = min(match.end() + width, len(text))
+    snippet = " ".join(text[start:end].split())
+    return f"{'…' if start > 0 else ''}{snippet}{'…' if end < len(text) else ''}"
@@ -1,12 +1,14 @@
+import asyncio
+import hashlib
 import os
-import shutil
+import tempfile
 from pathlib import Path
-from typing import Dict, Optional, Tuple
-from uuid import uuid4
+from typing import BinaryIO, Dict, Optional, Tuple
 
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile, status
 
-from app.config import UPLOAD_DIR_PATH
+from app.config import MAX_FILE_SIZE, UPLOAD_DIR_PATH
+from app.utils.book_pages import PAGINATED_EXTENSIONS, build_page_index
 
 if os.getenv("RENDER"):
     UPLOAD_BASE_DIR = Path("/tmp/uploads")
@@ -15,28 +17,94 @@ else:
 
 UPLOAD_BASE_DIR.mkdir(exist_ok=True)
 
-def save_upload_file(upload_file: UploadFile, user_id: int) -> Tuple[str, Path]:
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+BLOB_DIRECTORY = "blobs"
+STAGING_DIRECTORY = "staging"
+
+
+def _write_stream(source: BinaryIO, directory: Path, max_size: int) -> Tuple[Path, int, str]:
     """
-    Saves the uploaded file to the user's directory.
-    Returns the file path and file name.
+    Copies source into a new .part file in directory, hashing as it goes.
+    The copy stops at the first chunk that goes over max_size and the
+    partial file is removed.
     """
-    filename = f"{uuid4()}_{upload_file.filename}"
-    
-    user_dir = UPLOAD_DIR_PATH / str(user_id)
-    user_dir.mkdir(exist_ok=True)
-    
-    file_path = user_dir / filename
-    
-    print(f"📁 Saving file to: {file_path}")
-    print(f"📁 User directory: {user_dir}")
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, temp_name = tempfile.mkstemp(dir=directory, suffix=".part")
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"The file is too large. Maximum size: {max_size // (1024 * 1024)} MB"
+                    )
+                sha256.update(chunk)
+                buffer.write(chunk)
+            buffer.flush()
+            os.fsync(buffer.fileno())
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return temp_path, size, sha256.hexdigest()
+
+
+def get_staging_dir() -> Path:
+    staging_dir = UPLOAD_DIR_PATH / BLOB_DIRECTORY / STAGING_DIRECTORY
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    return staging_dir
+
+
+async def save_upload_file(
+    upload_file: UploadFile,
+    max_size: int = MAX_FILE_SIZE
+) -> Tuple[Path, int, str]:
+    """
+    Streams the uploaded file to a staging file without blocking the event loop.
+    Returns the staged path, the size in bytes and the SHA-256 hex digest;
+    the caller moves the staged file into place with place_blob.
+    """
+    if upload_file.size is not None and upload_file.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"The file is too large. Maximum size: {max_size // (1024 * 1024)} MB"
+        )
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
+    await upload_file.seek(0)
+    staged_path, size, sha256 = await asyncio.to_thread(
+        _write_stream, upload_file.file, get_staging_dir(), max_size
+    )
     
-    relative_path = os.path.join(str(user_id), filename)
-    print(f"📁 Relative path: {relative_path}")
+    print(f"📁 Staged {size} bytes of {upload_file.filename} (sha256 {sha256[:12]})")
     
-    return relative_path, file_path
+    return staged_path, size, sha256
+
+
+def blob_relative_path(sha256: str, extension: str = "") -> str:
+    """
+    Returns the content-addressed path of a blob: blobs/ab/abcdef....pdf
+    """
+    return f"{BLOB_DIRECTORY}/{sha256[:2]}/{sha256}{extension.lower()}"
+
+
+def place_blob(staged_path: Path, relative_path: str) -> Path:
+    """
+    Atomically moves a staged file to relative_path.
+    If the blob is already stored, the staged copy is discarded instead.
+    """
+    blob_path = get_file_path(relative_path)
+    if blob_path.exists():
+        staged_path.unlink(missing_ok=True)
+    else:
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, blob_path)
+    return blob_path
+
 
 def get_file_info(file_path: Path) -> Dict[str, any]:
     """
@@ -48,7 +116,9 @@ def get_file_info(file_path: Path) -> Dict[str, any]:
         "file_extension": file_path.suffix.lower(),
         "pages": None,
         "title": None,
-        "author": None
+        "author": None,
+        "language": None,
+        "cover_image": None
     }
     
     if info["file_extension"] == ".pdf":
@@ -65,6 +135,15 @@ def get_file_info(file_path: Path) -> Dict[str, any]:
                             info["title"] = pdf_reader.metadata.title
                         if pdf_reader.metadata.author:
                             info["author"] = pdf_reader.metadata.author
+                    
+                    language = pdf_reader.trailer["/Root"].get("/Lang")
+                    if language:
+                        info["language"] = str(language)
+                    
+                    if pdf_reader.pages:
+                        for image in pdf_reader.pages[0].images:
+                            info["cover_image"] = (Path(image.name).suffix or ".jpg", image.data)
+                            break
             except ImportError:
                 print("The PyPDF2 library is not installed. PDF metadata will not be processed.")
         except Exception as e:
@@ -82,8 +161,19 @@ def get_file_info(file_path: Path) -> Dict[str, any]:
                     info["title"] = book.get_metadata('DC', 'title')[0][0]
                 if book.get_metadata('DC', 'creator'):
                     info["author"] = book.get_metadata('DC', 'creator')[0][0]
+                if book.get_metadata('DC', 'language'):
+                    info["language"] = book.get_metadata('DC', 'language')[0][0]
+                
+                cover_items = list(book.get_items_of_type(ebooklib.ITEM_COVER))
+                if not cover_items and book.get_metadata('OPF', 'cover'):
+                    cover_id = book.get_metadata('OPF', 'cover')[0][1].get("content")
+                    cover_item = book.get_item_with_id(cover_id) if cover_id else None
+                    cover_items = [cover_item] if cover_item else []
+                if cover_items:
+                    cover_item = cover_items[0]
+                    info["cover_image"] = (Path(cover_item.get_name()).suffix or ".jpg", cover_item.get_content())
                 
-                info["pages"] = len(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
+                info["pages"] = len(list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)))
             except ImportError:
                 print("The ebooklib library is not installed. EPUB metadata will not be processed.")
         except Exception as e:
@@ -92,6 +182,61 @@ def get_file_info(file_path: Path) -> Dict[str, any]:
     return info
 
 
+def measure_file(
+    file_path: str,
+    pages_dir: Optional[str] = None,
+    page_key: Optional[str] = None,
+    page_chars: int = 2000
+) -> Dict[str, any]:
+    """
+    Returns the byte size and page count of a stored book file. TXT, HTML and
+    EPUB files are paginated into pages_dir, other formats use their native pages.
+    """
+    path = Path(file_path)
+    if pages_dir and page_key and path.suffix.lower() in PAGINATED_EXTENSIONS:
+        pages = build_page_index(path, Path(pages_dir), page_key, page_chars)
+    else:
+        pages = get_file_info(path)["pages"]
+    return {"file_size": path.stat().st_size, "pages": pages}
+
+
+def extract_metadata(
+    file_path: str,
+    cover_dir: str,
+    pages_dir: Optional[str] = None,
+    page_key: Optional[str] = None,
+    page_chars: int = 2000
+) -> Dict[str, any]:
+    """
+    Reads the file metadata and saves the embedded cover, if there is one,
+    as cover_dir/<file name><image extension>. TXT, HTML and EPUB files are
+    also paginated into pages_dir, which gives their real page count.
+    Runs in a worker process.
+    """
+    path = Path(file_path)
+    info = get_file_info(path)
+    
+    if pages_dir and page_key and path.suffix.lower() in PAGINATED_EXTENSIONS:
+        try:
+            info["pages"] = build_page_index(path, Path(pages_dir), page_key, page_chars)
+        except Exception as e:
+            print(f"Error paginating a file: {e}")
+    cover_image = info.pop("cover_image")
+    info["cover"] = None
+    
+    if cover_image:
+        extension, data = cover_image
+        cover_path = Path(cover_dir) / f"{path.stem}{extension.lower()}"
+        try:
+            cover_path.parent.mkdir(parents=True, exist_ok=True)
+            cover_path.write_bytes(data)
+            info["cover"] = cover_path.name
+        except OSError as e:
+            print(f"Error saving a cover image: {e}")
+    
+    return info
+
+
 def get_file_path(relative_path: str) -> Path:
     """
     Gets the full path to the file based on the relative path.
@@ -99,14 +244,25 @@ def get_file_path(relative_path: str) -> Path:
     return UPLOAD_DIR_PATH / relative_path
 
 
+def resolve_upload_path(relative_path: str) -> Optional[Path]:
+    """
+    Gets the resolved full path of a stored file, or None when the
+    relative path leads outside the uploads directory.
+    """
+    file_path = get_file_path(relative_path).resolve()
+    if not file_path.is_relative_to(UPLOAD_DIR_PATH.resolve()):
+        return None
+    return file_path
+
+
 def remove_file(relative_path: str) -> bool:
     """
     Deletes a file by relative path.
     Returns True if the file is successfully deleted.
     """
-    file_path = get_file_path(relative_path)
+    file_path = resolve_upload_path(relative_path)
     
-    if file_path.exists():
+    if file_path is not None and file_path.is_file():
         file_path.unlink()
         return True
     
@@ -0,0 +1,173 @@
+import json
+from typing import Any, BinaryIO, Iterator
+
+READ_CHUNK_SIZE = 64 * 1024
+WHITESPACE = b" \t\r\n"
+UTF8_BOM = b"\xef\xbb\xbf"
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class _Scanner:
+    """
+    Reads JSON from a binary file a chunk at a time. Structural characters are
+    ASCII and never occur inside multi-byte UTF-8 sequences, so values can be
+    delimited on raw bytes and decoded one at a time.
+    """
+
+    def __init__(self, source: BinaryIO, chunk_size: int = READ_CHUNK_SIZE):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.position = 0
+        self.consumed = 0
+
+    def _fill(self) -> bool:
+        chunk = self.source.read(self.chunk_size)
+        if not chunk:
+            return False
+        if self.consumed == 0 and not self.buffer and chunk.startswith(UTF8_BOM):
+            chunk = chunk[len(UTF8_BOM):]
+        self.consumed += self.position
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _error(self, message: str) -> JSONStreamError:
+        return JSONStreamError(f"{message} at byte {self.consumed + self.position}")
+
+    def peek(self) -> bytes:
+        """Next non-whitespace character, without consuming it; b"" at the end of the input"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position:self.position + 1]
+            if not self._fill():
+                return b""
+
+    def expect(self, characters: bytes) -> bytes:
+        character = self.peek()
+        if not character or character not in characters:
+            found = repr(character.decode("latin-1")) if character else "end of input"
+            raise self._error(f"Expected one of {characters.decode()!r}, found {found}")
+        self.position += 1
+        return character
+
+    def read_value(self, keep: bool = True) -> Any:
+        """
+        Reads the next complete value and decodes it, or skips it without
+        holding more than one chunk in memory when keep is False.
+        """
+        if not self.peek():
+            raise self._error("Unexpected end of input")
+
+        start = self.position
+        index = self.position
+        depth = 0
+        in_string = False
+        escaped = False
+        scalar = self.buffer[index:index + 1] not in (b"{", b"[", b'"')
+
+        while True:
+            if index >= len(self.buffer):
+                if not keep:
+                    start = index
+                self.position = start
+                if not self._fill():
+                    if scalar:
+                        break
+                    raise self._error("Unexpected end of input")
+                index -= start
+                start = 0
+                continue
+
+            byte = self.buffer[index]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif byte == 0x5C:
+                    escaped = True
+                elif byte == 0x22:
+                    in_string = False
+                    if depth == 0:
+                        index += 1
+                        break
+            elif scalar:
+                if byte in b",]}" or byte in WHITESPACE:
+                    break
+            elif byte == 0x22:
+                in_string = True
+            elif byte in b"{[":
+                depth += 1
+            elif byte in b"}]":
+                depth -= 1
+                if depth == 0:
+                    index += 1
+                    break
+            index += 1
+
+        raw = self.buffer[start:index]
+        self.position = index
+        if not keep:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError as e:
+            raise self._error(f"Invalid JSON value ({e})")
+
+
+def iter_json_array(source: BinaryIO, key: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yields the elements of the array stored under key in a top-level JSON object,
+    one at a time. Other members are skipped without being decoded.
+    Raises JSONStreamError for malformed input or when the array is missing.
+    """
+    scanner = _Scanner(source, chunk_size)
+    scanner.expect(b"{")
+    found = False
+
+    if scanner.peek() == b"}":
+        scanner.expect(b"}")
+    else:
+        while True:
+            name = scanner.read_value()
+            if not isinstance(name, str):
+                raise scanner._error("Expected an object key")
+            scanner.expect(b":")
+
+            if name == key and not found:
+                found = True
+                scanner.expect(b"[")
+                if scanner.peek() == b"]":
+                    scanner.expect(b"]")
+                else:
+                    while True:
+                        yield scanner.read_value()
+                        if scanner.expect(b",]") == b"]":
+                            break
+            else:
+                scanner.read_value(keep=False)
+
+            if scanner.expect(b",}") == b"}":
+                break
+
+    if scanner.peek():
+        raise scanner._error("Unexpected data after the JSON object")
+    if not found:
+        raise JSONStreamError(f"The '{key}' array is missing")
+
+
+def iter_ndjson(source: BinaryIO) -> Iterator[Any]:
+    """Yields one decoded value per non-empty line"""
+    for line_number, line in enumerate(source, 1):
+        if line_number == 1 and line.startswith(UTF8_BOM):
+            line = line[len(UTF8_BOM):]
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise JSONStreamError(f"Invalid JSON on line {line_number} ({e})")
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(sort_key: str, value: Any, row_id: int) -> str:
+    """
+    Encodes the position after a row as an opaque cursor string.
+    The cursor carries the sort key so it cannot be reused with another ordering.
+    """
+    payload: Dict[str, Any] = {"s": sort_key, "id": row_id, "v": value}
+    if isinstance(value, datetime):
+        payload["v"] = value.isoformat()
+        payload["t"] = "dt"
+
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str) -> Tuple[Any, int]:
+    """
+    Decodes a cursor produced by encode_cursor.
+    Returns the sort value and the row id of the last row of the previous page.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        if payload.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+        row_id = int(payload["id"])
+        cursor_sort_key = payload["s"]
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+    if cursor_sort_key != sort_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The pagination cursor does not match the requested sorting"
+        )
+
+    return value, row_id
+
+
+def keyset_condition(sort_column: Any, id_column: Any, value: Any, row_id: int, descending: bool):
+    """
+    Builds the WHERE condition selecting rows that follow (value, row_id)
+    in ORDER BY sort_column, id_column. NULLs sort first in ascending order
+    and last in descending order, as in MySQL and SQLite.
+    """
+    if descending:
+        if value is None:
+            return and_(sort_column.is_(None), id_column < row_id)
+        return or_(
+            sort_column < value,
+            and_(sort_column == value, id_column < row_id),
+            sort_column.is_(None)
+        )
+
+    if value is None:
+        return or_(
+            and_(sort_column.is_(None), id_column > row_id),
+            sort_column.isnot(None)
+        )
+    return or_(
+        sort_column > value,
+        and_(sort_column == value, id_column > row_id)
+    )
+
+
+def fetch_page(
+    query: Query,
+    limit: int,
+    skip: int = 0,
+    cursor_position: Optional[Tuple[Any, int]] = None,
+    sort_column: Any = None,
+    id_column: Any = None,
+    descending: bool = False
+) -> Tuple[List[Any], bool]:
+    """
+    Fetches one page of an already ordered query, either after a keyset
+    position or at an offset. Returns the rows and whether more rows follow.
+    """
+    if cursor_position is not None:
+        value, row_id = cursor_position
+        query = query.filter(keyset_condition(sort_column, id_column, value, row_id, descending))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,181 @@
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range_header(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single "bytes=" range into inclusive (start, end) offsets.
+    Returns None for headers that should be ignored (malformed or several ranges),
+    raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last):
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if start is None:
+        if end <= 0:
+            raise RangeNotSatisfiable(value)
+        start, end = max(size - end, 0), size - 1
+    elif end is None:
+        end = size - 1
+    elif end < start:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(value)
+    return start, min(end, size - 1)
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """ETag built from the modification time and size, for files without a content hash"""
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    return f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+class RangeFileResponse(Response):
+    """
+    File response with conditional requests (ETag / If-None-Match, Last-Modified /
+    If-Modified-Since) and single-range requests (Range / If-Range, 206 and 416).
+    The body is handed to the server with the zero-copy or path-send ASGI extensions
+    when the server offers them and streamed in chunks otherwise.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        request_headers: Mapping[str, str],
+        stat_result: Optional[os.stat_result] = None,
+        etag: Optional[str] = None,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        method: str = "GET",
+        cache_control: str = "private, no-cache"
+    ) -> None:
+        self.path = path
+        self.stat_result = stat_result or os.stat(path)
+        self.media_type = media_type or guess_type(filename or str(path))[0] or "application/octet-stream"
+        self.background = None
+        self.send_header_only = method.upper() == "HEAD"
+        self.status_code = 200
+        self.init_headers()
+
+        size = self.stat_result.st_size
+        last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+        etag = etag or file_etag(self.stat_result)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["etag"] = etag
+        self.headers["last-modified"] = last_modified
+        self.headers["cache-control"] = cache_control
+        if filename:
+            self.headers["content-disposition"] = f"inline; filename*=utf-8''{quote(filename)}"
+
+        self.start, self.end = 0, size - 1
+
+        if self._not_modified(request_headers, etag):
+            self.status_code = 304
+            self.send_header_only = True
+            return
+
+        range_header = request_headers.get("range")
+        if range_header and self._if_range_matches(request_headers.get("if-range"), etag, last_modified):
+            try:
+                byte_range = parse_range_header(range_header, size)
+            except RangeNotSatisfiable:
+                self.status_code = 416
+                self.send_header_only = True
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                return
+            if byte_range is not None:
+                self.status_code = 206
+                self.start, self.end = byte_range
+                self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+
+        self.headers["content-length"] = str(self.end - self.start + 1)
+
+    def _not_modified(self, request_headers: Mapping[str, str], etag: str) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in candidates or etag.removeprefix("W/") in candidates
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.stat_result.st_mtime) <= since
+        return False
+
+    @staticmethod
+    def _if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+        return if_range is None or if_range.strip() in (etag, last_modified)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        count = self.end - self.start + 1
+
+        if "http.response.zerocopysend" in extensions:
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": count
+                })
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+        elif "http.response.pathsend" in extensions and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                remaining = count
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0
+                    })
+                if remaining > 0 or count == 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
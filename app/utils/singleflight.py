@@ -0,0 +1,36 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight call.
+    The first caller starts the call, every concurrent caller awaits its result.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the result of fn(), sharing it with concurrent callers for key"""
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # The call runs as its own task, so a cancelled caller does not cancel
+        # it for everybody else waiting on the same key.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
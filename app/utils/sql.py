@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import Float, Integer, Table, and_, cast, func, insert, literal_column, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def minutes_between(db: Session, start: ColumnElement, end: ColumnElement) -> ColumnElement:
+    """SQL expression for the minutes between two datetime columns on the session's database"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        return func.timestampdiff(literal_column("SECOND"), start, end) / 60.0
+    if dialect == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 1440.0
+    if dialect == "postgresql":
+        return func.extract("epoch", end - start) / 60.0
+    return cast(end - start, Float) / 60.0
+
+
+def hour_of(db: Session, column: ColumnElement) -> ColumnElement:
+    """SQL expression for the hour (0-23) of a datetime column on the session's database"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        return func.hour(column)
+    if dialect == "sqlite":
+        return cast(func.strftime("%H", column), Integer)
+    return cast(func.extract("hour", column), Integer)
+
+
+def increment_counts(
+    db: Session,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    key_columns: Sequence[str],
+    count_column: str = "count"
+) -> None:
+    """Adds the counts of the rows to the rows with the same key, inserting the missing ones"""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    counter = table.c[count_column]
+
+    if dialect == "mysql":
+        statement = mysql_insert(table).values(rows)
+        db.execute(statement.on_duplicate_key_update({count_column: counter + statement.inserted[count_column]}))
+        return
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        statement = dialect_insert(table).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={count_column: counter + statement.excluded[count_column]}
+        ))
+        return
+
+    for row in rows:
+        key = and_(*(table.c[column] == row[column] for column in key_columns))
+        if db.execute(update(table).where(key).values({count_column: counter + row[count_column]})).rowcount == 0:
+            db.execute(insert(table).values(row))
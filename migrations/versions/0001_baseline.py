@@ -0,0 +1,121 @@
+"""Baseline schema: users, books, formats, user books, reading sessions and activities
+
+Revision ID: 0001_baseline
+Revises:
+
+Databases created before migrations existed already have these tables;
+they are skipped, so `alembic upgrade head` works on them as well.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ACTIVITY_TYPES = (
+    "book_added",
+    "book_removed",
+    "book_status_changed",
+    "book_uploaded",
+    "reading_session",
+    "bookmark_updated",
+    "data_exported",
+    "data_imported",
+    "profile_updated",
+    "gutenberg_imported"
+)
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("username", sa.String(30), nullable=False, unique=True),
+            sa.Column("email", sa.String(30), nullable=False, unique=True),
+            sa.Column("hashed_password", sa.String(256), nullable=False, unique=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.Date(), nullable=False)
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+
+    if not _has_table("books"):
+        op.create_table(
+            "books",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("title", sa.String(256), nullable=False),
+            sa.Column("author", sa.String(256), nullable=True),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("language", sa.String(32), nullable=True),
+            sa.Column("gutenberg_id", sa.Integer(), nullable=True),
+            sa.Column("cover_url", sa.Text(), nullable=True)
+        )
+        op.create_index("ix_books_id", "books", ["id"])
+
+    if not _has_table("book_formats"):
+        op.create_table(
+            "book_formats",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id"), nullable=False),
+            sa.Column(
+                "format_type",
+                sa.Enum("pdf", "epub", "html", "text", name="format_type_enum"),
+                nullable=False
+            ),
+            sa.Column("url", sa.Text(), nullable=False)
+        )
+        op.create_index("ix_book_formats_id", "book_formats", ["id"])
+
+    if not _has_table("user_books"):
+        op.create_table(
+            "user_books",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="CASCADE"), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("Want to read", "reading", "read", "dropped", name="status_enum"),
+                nullable=False
+            ),
+            sa.Column("bookmark_position", sa.Integer(), nullable=True),
+            sa.Column("is_local", sa.Boolean(), nullable=False),
+            sa.Column("file_path", sa.Text(), nullable=True),
+            sa.Column("added_at", sa.DateTime(), nullable=True)
+        )
+        op.create_index("ix_user_books_id", "user_books", ["id"])
+
+    if not _has_table("reading_sessions"):
+        op.create_table(
+            "reading_sessions",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column(
+                "user_book_id", sa.Integer(), sa.ForeignKey("user_books.id", ondelete="CASCADE"), nullable=False
+            ),
+            sa.Column("start_time", sa.DateTime(), nullable=False),
+            sa.Column("end_time", sa.DateTime(), nullable=True),
+            sa.Column("pages_read", sa.Integer(), nullable=True)
+        )
+        op.create_index("ix_reading_sessions_id", "reading_sessions", ["id"])
+
+    if not _has_table("user_activities"):
+        op.create_table(
+            "user_activities",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("activity_type", sa.Enum(*ACTIVITY_TYPES, name="activity_type_enum"), nullable=False),
+            sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="SET NULL"), nullable=True),
+            sa.Column("details", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False)
+        )
+        op.create_index("ix_user_activities_id", "user_activities", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("user_activities", "reading_sessions", "user_books", "book_formats", "books", "users"):
+        op.drop_table(table)
@@ -0,0 +1,174 @@
+"""Metadata and file columns, blob store, content index, import jobs, activity rollups and catalog full-text search
+
+Revision ID: 0002_library_features
+Revises: 0001_baseline
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.book import BOOKS_FTS_DDL
+from app.models.content import POSITIONS_TYPE, TERM_TYPE
+
+revision = "0002_library_features"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _has_index(table: str, name: str) -> bool:
+    return name in {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if not _has_column("books", "metadata_status"):
+        op.add_column(
+            "books",
+            sa.Column("metadata_status", sa.Enum("pending", "ready", "failed", name="metadata_status_enum"), nullable=True)
+        )
+    if not _has_column("book_formats", "page_count"):
+        op.add_column("book_formats", sa.Column("page_count", sa.Integer(), nullable=True))
+    if not _has_column("book_formats", "file_size"):
+        op.add_column("book_formats", sa.Column("file_size", sa.BigInteger(), nullable=True))
+
+    if not _has_table("file_blobs"):
+        op.create_table(
+            "file_blobs",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("sha256", sa.String(64), nullable=False, unique=True),
+            sa.Column("path", sa.String(255), nullable=False, unique=True),
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False)
+        )
+        op.create_index("ix_file_blobs_id", "file_blobs", ["id"])
+        op.create_index("ix_file_blobs_sha256", "file_blobs", ["sha256"], unique=True)
+
+    if not _has_table("content_documents"):
+        op.create_table(
+            "content_documents",
+            sa.Column(
+                "user_book_id", sa.Integer(), sa.ForeignKey("user_books.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("token_count", sa.Integer(), nullable=False),
+            sa.Column("page_starts", POSITIONS_TYPE, nullable=False),
+            sa.Column("indexed_at", sa.DateTime(), nullable=False),
+            sa.Column("error", sa.Text(), nullable=True)
+        )
+        op.create_index("ix_content_documents_user_id", "content_documents", ["user_id"])
+    else:
+        if not _has_column("content_documents", "error"):
+            op.add_column("content_documents", sa.Column("error", sa.Text(), nullable=True))
+        if dialect == "mysql":
+            op.alter_column(
+                "content_documents", "page_starts",
+                existing_type=sa.LargeBinary(), type_=POSITIONS_TYPE, nullable=False
+            )
+
+    if not _has_table("content_postings"):
+        op.create_table(
+            "content_postings",
+            sa.Column(
+                "user_book_id", sa.Integer(), sa.ForeignKey("user_books.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("term", TERM_TYPE, primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("frequency", sa.Integer(), nullable=False),
+            sa.Column("positions", POSITIONS_TYPE, nullable=False)
+        )
+        op.create_index("ix_content_postings_user_term", "content_postings", ["user_id", "term"])
+    elif dialect == "mysql":
+        # Tables created with the default collation merge terms that differ only by case or accent
+        op.alter_column("content_postings", "term", existing_type=sa.String(64), type_=TERM_TYPE, nullable=False)
+        # Tables created with a plain BLOB cut off positions past 64 KB
+        op.alter_column(
+            "content_postings", "positions", existing_type=sa.LargeBinary(), type_=POSITIONS_TYPE, nullable=False
+        )
+
+    if not _has_table("import_jobs"):
+        op.create_table(
+            "import_jobs",
+            sa.Column("id", sa.String(32), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("queued", "running", "completed", "failed", name="import_job_status_enum"),
+                nullable=False
+            ),
+            sa.Column("mode", sa.String(16), nullable=False),
+            sa.Column("filename", sa.String(255), nullable=True),
+            sa.Column("processed", sa.Integer(), nullable=False),
+            sa.Column("imported", sa.Integer(), nullable=False),
+            sa.Column("created", sa.Integer(), nullable=False),
+            sa.Column("skipped", sa.Integer(), nullable=False),
+            sa.Column("error_count", sa.Integer(), nullable=False),
+            sa.Column("result", sa.JSON(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True)
+        )
+        op.create_index("ix_import_jobs_user_id", "import_jobs", ["user_id"])
+
+    if not _has_table("activity_rollups"):
+        op.create_table(
+            "activity_rollups",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("hour", sa.SmallInteger(), primary_key=True),
+            sa.Column(
+                "activity_type",
+                sa.Enum(
+                    "book_added",
+                    "book_removed",
+                    "book_status_changed",
+                    "book_uploaded",
+                    "reading_session",
+                    "bookmark_updated",
+                    "data_exported",
+                    "data_imported",
+                    "profile_updated",
+                    "gutenberg_imported",
+                    name="activity_type_enum"
+                ),
+                primary_key=True
+            ),
+            sa.Column("count", sa.Integer(), nullable=False)
+        )
+
+    # Existing activities are counted into the rollups by the startup check
+    if dialect == "mysql":
+        if not _has_index("books", "ix_books_fulltext"):
+            op.create_index("ix_books_fulltext", "books", ["title", "author", "description"], mysql_prefix="FULLTEXT")
+    elif dialect == "sqlite" and not _has_table("books_fts"):
+        for statement in BOOKS_FTS_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO books_fts(books_fts) VALUES('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "mysql":
+        op.drop_index("ix_books_fulltext", table_name="books")
+    elif dialect == "sqlite":
+        for trigger in ("books_fts_ai", "books_fts_ad", "books_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS books_fts")
+
+    for table in ("activity_rollups", "import_jobs", "content_postings", "content_documents", "file_blobs"):
+        op.drop_table(table)
+    with op.batch_alter_table("book_formats") as batch:
+        batch.drop_column("file_size")
+        batch.drop_column("page_count")
+    with op.batch_alter_table("books") as batch:
+        batch.drop_column("metadata_status")
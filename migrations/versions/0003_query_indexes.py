@@ -0,0 +1,111 @@
+"""Composite indexes for the hot query predicates and one user book per user and book
+
+Revision ID: 0003_query_indexes
+Revises: 0002_library_features
+
+Libraries may already hold the same book twice. Before the unique index is
+created, each set of duplicates is merged into its oldest row. That row takes
+the state of the most recently added duplicate (status, bookmark, file) and
+all of their reading sessions. Blob reference counts of the files involved
+are recounted, so blobs left unreferenced are reclaimed by the next blob
+cleanup.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_query_indexes"
+down_revision = "0002_library_features"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ux_user_books_user_book", "user_books", ["user_id", "book_id"], True),
+    ("ix_user_books_user_status", "user_books", ["user_id", "status"], False),
+    ("ix_user_books_user_added", "user_books", ["user_id", "added_at"], False),
+    ("ix_user_activities_user_created", "user_activities", ["user_id", "created_at"], False),
+    ("ix_books_gutenberg_id", "books", ["gutenberg_id"], False),
+    ("ix_reading_sessions_user_book_id", "reading_sessions", ["user_book_id"], False),
+)
+
+
+def _has_index(table: str, name: str) -> bool:
+    return name in {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _merge_duplicate_user_books() -> None:
+    connection = op.get_bind()
+    rows = connection.execute(sa.text(
+        "SELECT ub.id, ub.user_id, ub.book_id, ub.status, ub.bookmark_position, ub.is_local, "
+        "ub.file_path, ub.added_at FROM user_books ub JOIN ("
+        "SELECT user_id, book_id FROM user_books GROUP BY user_id, book_id HAVING COUNT(*) > 1"
+        ") d ON d.user_id = ub.user_id AND d.book_id = ub.book_id "
+        "ORDER BY ub.user_id, ub.book_id, ub.id"
+    )).all()
+    if not rows:
+        return
+
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.user_id, row.book_id), []).append(row)
+
+    merged = []
+    moved = []
+    removed = []
+    changed_files = set()
+    for group in groups.values():
+        kept = group[0]
+        newest = max(group, key=lambda row: (row.added_at is not None, row.added_at or 0, row.id))
+        merged.append({
+            "id": kept.id,
+            "status": newest.status,
+            "bookmark_position": newest.bookmark_position,
+            "is_local": newest.is_local,
+            "file_path": newest.file_path
+        })
+        if newest.file_path != kept.file_path:
+            removed.append({"id": kept.id})
+        for duplicate in group[1:]:
+            moved.append({"keep_id": kept.id, "duplicate_id": duplicate.id})
+            removed.append({"id": duplicate.id})
+        changed_files.update(row.file_path for row in group if row.file_path)
+
+    connection.execute(
+        sa.text(
+            "UPDATE user_books SET status = :status, bookmark_position = :bookmark_position, "
+            "is_local = :is_local, file_path = :file_path WHERE id = :id"
+        ),
+        merged
+    )
+    connection.execute(
+        sa.text("UPDATE reading_sessions SET user_book_id = :keep_id WHERE user_book_id = :duplicate_id"),
+        moved
+    )
+    # Content indexes of removed rows, and of kept rows that now point at another file, are rebuilt at startup
+    for table in ("content_postings", "content_documents"):
+        connection.execute(sa.text(f"DELETE FROM {table} WHERE user_book_id = :id"), removed)
+    connection.execute(
+        sa.text("DELETE FROM user_books WHERE id = :duplicate_id"),
+        [{"duplicate_id": row["duplicate_id"]} for row in moved]
+    )
+    if changed_files:
+        connection.execute(
+            sa.text(
+                "UPDATE file_blobs SET ref_count = ("
+                "SELECT COUNT(*) FROM user_books WHERE user_books.file_path = file_blobs.path"
+                ") WHERE path = :path"
+            ),
+            [{"path": path} for path in sorted(changed_files)]
+        )
+    print(f"🔧 Merged {len(moved)} duplicate user books into {len(merged)}")
+
+
+def upgrade() -> None:
+    _merge_duplicate_user_books()
+    for name, table, columns, unique in INDEXES:
+        if not _has_index(table, name):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, _columns, _unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
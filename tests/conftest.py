@@ -12,12 +12,12 @@ sys.path.insert(0, str(project_root))
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 
 try:
     from app.main import app
-    from app.database import get_db, Base
+    from app.database import get_db, Base, engine as configured_engine
     from app.models import User, Book, BookFormat, UserBook, ReadingSession, UserActivity
     from app.utils.security import get_password_hash, create_access_token
 except ImportError as e:
@@ -28,6 +28,12 @@ except ImportError as e:
     raise
 
 
+@event.listens_for(configured_engine, "do_connect")
+def refuse_configured_database(dialect, conn_rec, cargs, cparams):
+    """Tests run on their own SQLite files and must never reach the database configured in .env"""
+    raise RuntimeError("Tests must not connect to the configured database")
+
+
 @pytest.fixture(scope="function")
 def engine():
     """Create test database engine for each test function"""
@@ -76,11 +82,15 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    # Startup hooks and background jobs must not reach the database configured in .env
+    session_factory = app.state.session_factory
+    app.state.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
     
     with TestClient(app) as test_client:
         yield test_client
     
     app.dependency_overrides.clear()
+    app.state.session_factory = session_factory
 
 
 @pytest.fixture
@@ -374,6 +374,19 @@ class TestBooksAPI:
         response = client.delete(f"/api/books/user-books/{test_book.id}", headers=auth_headers)
         assert response.status_code == 404
         assert "not found" in response.json()["detail"]
+    
+    def test_mirror_sync_requires_admin(self, client: TestClient, auth_headers: dict, test_user: User):
+        """Test that only the users listed in ADMIN_USERNAMES can start a catalog sync"""
+        with patch("app.api.books.GUTENBERG_CATALOG_PATH", "catalog.csv"), \
+                patch("app.api.books.gutenberg_mirror_service.run_sync_job") as run_sync_job:
+            response = client.post("/api/books/mirror/sync", headers=auth_headers)
+            assert response.status_code == 403
+            run_sync_job.assert_not_called()
+
+            with patch("app.api.deps.ADMIN_USERNAMES", [test_user.username]):
+                response = client.post("/api/books/mirror/sync", headers=auth_headers)
+            assert response.status_code == 202
+            run_sync_job.assert_called_once()
 
 
 @pytest.mark.integration
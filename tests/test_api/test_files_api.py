@@ -1,3 +1,4 @@
+import base64
 import pytest
 import tempfile
 from pathlib import Path
@@ -271,6 +272,169 @@ class TestFilesAPI:
 class TestFilesIntegration:
     """Integration tests of file operations"""
         
+    def test_get_user_book_content_ranges(
+        self,
+        client: TestClient,
+        auth_headers: dict,
+        temp_upload_dir: Path
+    ):
+        """Test streaming a local book with Range and conditional requests"""
+        content = bytes(range(256)) * 40
+        files = {"file": ("range_book.pdf", BytesIO(content), "application/pdf")}
+        data = {"title": "Range Book", "language": "en"}
+        
+        with patch('app.utils.files.UPLOAD_DIR_PATH', temp_upload_dir):
+            upload_response = client.post(
+                "/api/files/upload-book", files=files, data=data, headers=auth_headers
+            )
+            assert upload_response.status_code == 201
+            url = f"/api/files/user-books/{upload_response.json()['user_book_id']}/content"
+            
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            assert response.content == content
+            assert response.headers["accept-ranges"] == "bytes"
+            assert response.headers["content-type"] == "application/pdf"
+            etag = response.headers["etag"]
+            assert etag == f'"{upload_response.json()["sha256"]}"'
+            
+            response = client.get(url, headers={**auth_headers, "Range": "bytes=100-199"})
+            assert response.status_code == 206
+            assert response.content == content[100:200]
+            assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+            
+            response = client.get(url, headers={**auth_headers, "Range": "bytes=-10"})
+            assert response.status_code == 206
+            assert response.content == content[-10:]
+            
+            response = client.get(url, headers={**auth_headers, "Range": f"bytes={len(content)}-"})
+            assert response.status_code == 416
+            assert response.headers["content-range"] == f"bytes */{len(content)}"
+            
+            response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.content == b""
+            
+            response = client.get(
+                url, headers={**auth_headers, "Range": "bytes=0-9", "If-Range": '"stale"'}
+            )
+            assert response.status_code == 200
+            assert response.content == content
+            
+            assert client.get(url).status_code == 401
+            assert client.get("/api/files/user-books/99999/content", headers=auth_headers).status_code == 404
+
+    def test_get_user_book_content_outside_uploads(
+        self,
+        client: TestClient,
+        db_session: Session,
+        auth_headers: dict,
+        test_user: User,
+        test_book: Book,
+        temp_upload_dir: Path
+    ):
+        """Test that paths leading outside the uploads directory or to unknown blobs are not served"""
+        uploads = temp_upload_dir / "uploads"
+        (uploads / "blobs" / "ab").mkdir(parents=True)
+        (uploads / "blobs" / "ab" / "ab12.pdf").write_bytes(b"someone else's book")
+        (temp_upload_dir / ".env").write_text("DB_PASSWORD=secret")
+
+        user_books = []
+        for relative_path in ("../.env", "blobs/ab/ab12.pdf"):
+            book = Book(title=f"Book {relative_path}")
+            db_session.add(book)
+            db_session.flush()
+            user_book = UserBook(
+                user_id=test_user.id,
+                book_id=book.id,
+                status="reading",
+                is_local=True,
+                file_path=relative_path
+            )
+            db_session.add(user_book)
+            user_books.append(user_book)
+        db_session.commit()
+
+        with patch('app.utils.files.UPLOAD_DIR_PATH', uploads):
+            for user_book in user_books:
+                response = client.get(f"/api/files/user-books/{user_book.id}/content", headers=auth_headers)
+                assert response.status_code == 404
+
+    def test_only_covers_are_public(self, client: TestClient):
+        """Test that stored book files are not reachable through the static uploads mount"""
+        from app.config import UPLOAD_DIR_PATH
+
+        cover = UPLOAD_DIR_PATH / "covers" / "public_cover_test.jpg"
+        blob = UPLOAD_DIR_PATH / "blobs" / "public_blob_test.pdf"
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        cover.write_bytes(b"cover")
+        blob.write_bytes(b"book")
+        try:
+            response = client.get("/uploads/covers/public_cover_test.jpg")
+            assert response.status_code == 200
+            assert response.content == b"cover"
+            assert client.get("/uploads/blobs/public_blob_test.pdf").status_code == 404
+        finally:
+            cover.unlink()
+            blob.unlink()
+
+    def test_backfill_page_counts_requires_admin(self, client: TestClient, auth_headers: dict, test_user: User):
+        """Test that only the users listed in ADMIN_USERNAMES can start and follow a page count backfill"""
+        response = client.post("/api/files/backfill-page-counts", headers=auth_headers)
+        assert response.status_code == 403
+        assert client.get("/api/files/backfill-page-counts/status", headers=auth_headers).status_code == 403
+
+        with patch("app.api.deps.ADMIN_USERNAMES", [test_user.username]):
+            response = client.post("/api/files/backfill-page-counts", headers=auth_headers)
+            assert response.status_code == 202
+
+            response = client.get("/api/files/backfill-page-counts/status", headers=auth_headers)
+        assert response.status_code == 200
+        backfill = response.json()
+        assert backfill["running"] is False
+        assert backfill["finished_at"] is not None
+        assert backfill["error"] is None
+
+    def test_get_user_book_pages(
+        self,
+        client: TestClient,
+        auth_headers: dict,
+        temp_upload_dir: Path
+    ):
+        """Test reading an uploaded text book page by page"""
+        content = "\n\n".join(f"Paragraph {number} " + "text " * 50 for number in range(100))
+        files = {"file": ("paged.txt", BytesIO(content.encode()), "text/plain")}
+        data = {"title": "Paged Book", "language": "en"}
+        
+        with patch('app.utils.files.UPLOAD_DIR_PATH', temp_upload_dir), \
+                patch('app.services.book_pages.READER_PAGE_CHARS', 1000):
+            upload_response = client.post(
+                "/api/files/upload-book", files=files, data=data, headers=auth_headers
+            )
+            user_book_id = upload_response.json()["user_book_id"]
+            
+            response = client.get(f"/api/files/user-books/{user_book_id}/pages/1", headers=auth_headers)
+            assert response.status_code == 200
+            first_page = response.json()
+            assert first_page["content"].startswith("Paragraph 0 ")
+            assert first_page["total_pages"] > 1
+            assert first_page["has_next"] and not first_page["has_prev"]
+            
+            total_pages = first_page["total_pages"]
+            response = client.get(
+                f"/api/files/user-books/{user_book_id}/pages/{total_pages}", headers=auth_headers
+            )
+            assert response.json()["content"].startswith("Paragraph")
+            assert not response.json()["has_next"]
+            
+            response = client.get(
+                f"/api/files/user-books/{user_book_id}/pages/{total_pages + 1}", headers=auth_headers
+            )
+            assert response.status_code == 404
+            
+            progress = client.get(f"/api/stats/reading/progress/{user_book_id}", headers=auth_headers)
+            assert progress.json()["total_pages"] == total_pages
+    
     def test_multiple_users_file_isolation(
         self,
         client: TestClient,
@@ -368,4 +532,78 @@ class TestFilesIntegration:
                 f"/api/files/books/{user2_book_id}",
                 headers=headers2
             )
-            assert delete2_response.status_code == 204
\ No newline at end of file
+            assert delete2_response.status_code == 204
+
+@pytest.mark.files
+class TestResumableUploadsAPI:
+    """Resumable upload API tests"""
+    
+    def create_upload(self, client: TestClient, auth_headers: dict, length: int) -> str:
+        metadata = ",".join(
+            f"{key} {base64.b64encode(value.encode()).decode()}"
+            for key, value in {"filename": "big.txt", "title": "Big Book", "language": "en"}.items()
+        )
+        response = client.post(
+            "/api/files/uploads",
+            headers={**auth_headers, "Upload-Length": str(length), "Upload-Metadata": metadata}
+        )
+        assert response.status_code == 201
+        assert response.headers["upload-offset"] == "0"
+        return response.headers["location"]
+    
+    def test_resume_and_finalize(self, client: TestClient, auth_headers: dict, temp_upload_dir: Path):
+        """Test uploading in chunks, resuming from the reported offset and finalizing"""
+        content = b"chapter " * 1000
+        patch_headers = {**auth_headers, "Content-Type": "application/offset+octet-stream"}
+        
+        with patch('app.utils.files.UPLOAD_DIR_PATH', temp_upload_dir):
+            location = self.create_upload(client, auth_headers, len(content))
+            
+            response = client.patch(
+                location, content=content[:3000], headers={**patch_headers, "Upload-Offset": "0"}
+            )
+            assert response.status_code == 204
+            assert response.headers["upload-offset"] == "3000"
+            
+            response = client.patch(
+                location, content=content[:10], headers={**patch_headers, "Upload-Offset": "0"}
+            )
+            assert response.status_code == 409
+            
+            response = client.post(f"{location}/finalize", headers=auth_headers)
+            assert response.status_code == 409
+            
+            response = client.head(location, headers=auth_headers)
+            offset = int(response.headers["upload-offset"])
+            assert offset == 3000
+            
+            response = client.patch(
+                location, content=content[offset:], headers={**patch_headers, "Upload-Offset": str(offset)}
+            )
+            assert response.headers["upload-offset"] == str(len(content))
+            
+            response = client.post(f"{location}/finalize", headers=auth_headers)
+            assert response.status_code == 201
+            result = response.json()
+            assert result["title"] == "Big Book"
+            assert result["format"] == "text"
+            assert (temp_upload_dir / result["file_path"]).read_bytes() == content
+            
+            assert client.head(location, headers=auth_headers).status_code == 404
+    
+    def test_limits_and_expiry(self, client: TestClient, auth_headers: dict, temp_upload_dir: Path):
+        """Test the declared length limit and expired uploads"""
+        patch_headers = {
+            **auth_headers, "Content-Type": "application/offset+octet-stream", "Upload-Offset": "0"
+        }
+        
+        with patch('app.utils.files.UPLOAD_DIR_PATH', temp_upload_dir):
+            location = self.create_upload(client, auth_headers, 10)
+            
+            response = client.patch(location, content=b"x" * 11, headers=patch_headers)
+            assert response.status_code == 413
+            
+            with patch('app.services.resumable_upload.RESUMABLE_UPLOAD_TTL_HOURS', -1):
+                location = self.create_upload(client, auth_headers, 10)
+            assert client.head(location, headers=auth_headers).status_code == 410
+            assert list((temp_upload_dir / "partial").glob(f"{location.rsplit('/', 1)[1]}*")) == []
@@ -0,0 +1,261 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models import Book, ReadingSession, User, UserBook
+from app.services.import_jobs import import_job_service
+
+
+def book_entry(title: str, gutenberg_id=None, **user_book) -> dict:
+    return {
+        "status": "reading",
+        "bookmark_position": 5,
+        **user_book,
+        "book": {
+            "title": title,
+            "author": "Author",
+            "language": "en",
+            "gutenberg_id": gutenberg_id,
+            "formats": [{"format_type": "html", "url": f"https://example.com/{title}.html"}]
+        }
+    }
+
+
+@pytest.mark.integration
+class TestImportExportAPI:
+    """Library import API tests"""
+
+    def test_import_json_replaces_library(
+        self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User, test_user_book: UserBook
+    ):
+        """Test a JSON import with an invalid entry"""
+        payload = {"export_info": {"version": 1}, "books": [book_entry("First", 101), "broken", book_entry("Second")]}
+        files = {"file": ("library.json", BytesIO(json.dumps(payload).encode()), "application/json")}
+
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+
+        assert response.status_code == 200
+        statistics = response.json()["statistics"]
+        assert statistics["total_books"] == 3
+        assert statistics["imported_books"] == 2
+        assert statistics["created_books"] == 2
+        assert statistics["skipped_books"] == 1
+        titles = {
+            title for title, in db_session.query(Book.title).join(UserBook).filter(UserBook.user_id == test_user.id)
+        }
+        assert titles == {"First", "Second"}
+
+    def test_import_ndjson(self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User):
+        """Test the NDJSON variant with one book per line"""
+        lines = "\n".join(json.dumps(book_entry(f"Book {number}")) for number in range(25))
+        files = {"file": ("library.ndjson", BytesIO(lines.encode()), "application/x-ndjson")}
+
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["statistics"]["imported_books"] == 25
+        assert db_session.query(UserBook).filter(UserBook.user_id == test_user.id).count() == 25
+
+    def test_malformed_import_keeps_library(
+        self, client: TestClient, auth_headers: dict, db_session: Session, test_user_book: UserBook
+    ):
+        """Test that a file that breaks off midway leaves the library unchanged"""
+        data = b'{"books": [' + json.dumps(book_entry("First")).encode() + b', {"book": '
+        files = {"file": ("library.json", BytesIO(data), "application/json")}
+
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+
+        assert response.status_code == 400
+        db_session.expire_all()
+        assert db_session.query(UserBook).filter(UserBook.id == test_user_book.id).count() == 1
+
+        files = {"file": ("library.txt", BytesIO(b"{}"), "text/plain")}
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+        assert response.status_code == 400
+
+
+@pytest.mark.integration
+class TestImportJobsAPI:
+    """Background import job API tests"""
+
+    @pytest.fixture(autouse=True)
+    def upload_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("app.utils.files.UPLOAD_DIR_PATH", tmp_path)
+        return tmp_path
+
+    def run_job(self, client: TestClient, auth_headers: dict, filename: str, data: bytes) -> dict:
+        files = {"file": (filename, BytesIO(data), "application/json")}
+        response = client.post("/api/import-export/jobs", files=files, headers=auth_headers)
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+
+        future = import_job_service._jobs.get(job["id"])
+        if future is not None:
+            future.result(timeout=30)
+        return job
+
+    def test_job_reports_counts(
+        self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User, upload_dir
+    ):
+        """Test that a job imports in the background and reports its counts and events"""
+        payload = {"books": [book_entry("First", 101), "broken", book_entry("Second")]}
+        job = self.run_job(client, auth_headers, "library.json", json.dumps(payload).encode())
+
+        response = client.get(f"/api/import-export/jobs/{job['id']}", headers=auth_headers)
+
+        assert response.status_code == 200
+        status = response.json()
+        assert status["status"] == "completed"
+        assert (status["processed"], status["created"], status["skipped"], status["error_count"]) == (3, 2, 1, 1)
+        assert status["result"]["imported_books"] == 2
+        assert db_session.query(UserBook).filter(UserBook.user_id == test_user.id).count() == 2
+        assert not any((upload_dir / "imports").iterdir())
+
+        with client.stream("GET", f"/api/import-export/jobs/{job['id']}/events", headers=auth_headers) as events:
+            assert events.headers["content-type"].startswith("text/event-stream")
+            body = "".join(events.iter_text())
+        assert body.startswith("event: completed\ndata: ")
+        assert json.loads(body.split("data: ", 1)[1])["created"] == 2
+
+    def test_failed_job_and_ownership(
+        self, client: TestClient, auth_headers: dict, db_session: Session, test_user_book: UserBook
+    ):
+        """Test that a malformed file fails the job without touching the library"""
+        job = self.run_job(client, auth_headers, "library.json", b'{"books": [{"book": ')
+
+        status = client.get(f"/api/import-export/jobs/{job['id']}", headers=auth_headers).json()
+
+        assert status["status"] == "failed"
+        assert status["error"].startswith("Incorrect JSON format")
+        db_session.expire_all()
+        assert db_session.query(UserBook).filter(UserBook.id == test_user_book.id).count() == 1
+
+        assert client.get("/api/import-export/jobs/unknown", headers=auth_headers).status_code == 404
+        files = {"file": ("library.txt", BytesIO(b"{}"), "text/plain")}
+        assert client.post("/api/import-export/jobs", files=files, headers=auth_headers).status_code == 400
+
+    def test_stream_reports_progress(self, db_session: Session, test_user: User):
+        """Test the progress events of a running job read from memory"""
+        counts = {"processed": 500, "imported": 490, "created": 10, "skipped": 10, "error_count": 10}
+        import_job_service._live["running-job"] = (test_user.id, {"status": "running", **counts})
+        try:
+            async def first_event():
+                events = import_job_service.stream_events(db_session.get_bind(), "running-job", test_user.id)
+                try:
+                    return await events.__anext__()
+                finally:
+                    await events.aclose()
+
+            event = asyncio.run(first_event())
+        finally:
+            import_job_service._live.pop("running-job", None)
+
+        assert event.startswith("event: progress\n")
+        assert json.loads(event.split("data: ", 1)[1])["processed"] == 500
+
+
+@pytest.mark.integration
+class TestExportAPI:
+    """Library export API tests"""
+
+    def test_export_round_trips_through_import(
+        self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User
+    ):
+        """Test that an exported JSON file imports back into the same library"""
+        payload = {"books": [book_entry("First", 101, added_at="2024-01-02T03:04:05"), book_entry("Second")]}
+        files = {"file": ("library.json", BytesIO(json.dumps(payload).encode()), "application/json")}
+        assert client.post("/api/import-export/import-library", files=files, headers=auth_headers).status_code == 200
+
+        response = client.get("/api/import-export/export-library", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert "attachment" in response.headers["content-disposition"]
+        exported = response.json()
+        assert exported["export_info"]["total_books"] == 2
+        first = exported["books"][0]
+        assert first["added_at"] == "2024-01-02T03:04:05"
+        assert first["book"]["gutenberg_id"] == 101
+        assert first["book"]["formats"] == [{"format_type": "html", "url": "https://example.com/First.html"}]
+
+        files = {"file": ("export.json", BytesIO(response.content), "application/json")}
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+
+        statistics = response.json()["statistics"]
+        assert (statistics["imported_books"], statistics["created_books"]) == (2, 0)
+        db_session.expire_all()
+        titles = [
+            title for title, in db_session.query(Book.title).join(UserBook).filter(
+                UserBook.user_id == test_user.id
+            ).order_by(UserBook.id)
+        ]
+        assert titles == ["First", "Second"]
+
+    def test_export_gzip_ndjson_with_sessions(
+        self, client: TestClient, auth_headers: dict, db_session: Session, test_user_book: UserBook
+    ):
+        """Test compressed NDJSON with reading sessions and its re-import"""
+        db_session.add_all([
+            ReadingSession(user_book_id=test_user_book.id, start_time=datetime(2024, 5, 1, 20, 0), pages_read=12),
+            ReadingSession(
+                user_book_id=test_user_book.id, start_time=datetime(2024, 5, 2, 21, 0),
+                end_time=datetime(2024, 5, 2, 21, 45), pages_read=30
+            )
+        ])
+        db_session.commit()
+
+        response = client.get(
+            "/api/import-export/export-library",
+            params={"format": "ndjson", "include_sessions": True, "compress": True},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        lines = gzip.decompress(response.content).decode().splitlines()
+        entry = json.loads(lines[0])
+        assert len(lines) == 1
+        assert entry["reading_sessions"] == [
+            {"start_time": "2024-05-01T20:00:00", "end_time": None, "pages_read": 12},
+            {"start_time": "2024-05-02T21:00:00", "end_time": "2024-05-02T21:45:00", "pages_read": 30}
+        ]
+
+        export = response.content
+        files = {"file": ("export.ndjson.gz", BytesIO(export), "application/gzip")}
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+        statistics = response.json()["statistics"]
+        assert (statistics["imported_books"], statistics["imported_sessions"]) == (1, 2)
+
+        db_session.expire_all()
+        sessions = db_session.query(ReadingSession).join(UserBook).filter(
+            UserBook.user_id == test_user_book.user_id
+        ).order_by(ReadingSession.start_time).all()
+        assert [
+            (reading_session.start_time, reading_session.end_time, reading_session.pages_read)
+            for reading_session in sessions
+        ] == [
+            (datetime(2024, 5, 1, 20, 0), None, 12),
+            (datetime(2024, 5, 2, 21, 0), datetime(2024, 5, 2, 21, 45), 30)
+        ]
+
+        files = {"file": ("export.ndjson.gz", BytesIO(export), "application/gzip")}
+        response = client.post(
+            "/api/import-export/import-library", params={"mode": "merge"}, files=files, headers=auth_headers
+        )
+        assert response.json()["statistics"]["imported_sessions"] == 0
+        assert db_session.query(ReadingSession).join(UserBook).filter(
+            UserBook.user_id == test_user_book.user_id
+        ).count() == 2
+
+        files = {"file": ("broken.json.gz", BytesIO(b"not gzip"), "application/gzip")}
+        response = client.post("/api/import-export/import-library", files=files, headers=auth_headers)
+        assert response.status_code == 400
+        assert client.get(
+            "/api/import-export/export-library", params={"format": "xml"}, headers=auth_headers
+        ).status_code == 400
@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.models import Book, User, UserBook
+
+
+@pytest.mark.integration
+class TestLogActivityAPI:
+    """Test manual activity logging"""
+
+    def test_invalid_activities_are_rejected(
+        self,
+        client: TestClient,
+        auth_headers: dict,
+        test_book: Book,
+        test_user_book: UserBook,
+        db_session
+    ):
+        """Test that unknown types and books outside the collection are rejected before queuing"""
+        response = client.post(
+            "/api/stats/log-activity", json={"activity_type": "unknown"}, headers=auth_headers
+        )
+        assert response.status_code == 400
+
+        other_book = Book(title="Not in the collection")
+        db_session.add(other_book)
+        db_session.commit()
+        response = client.post(
+            "/api/stats/log-activity",
+            json={"activity_type": "bookmark_updated", "book_id": other_book.id},
+            headers=auth_headers
+        )
+        assert response.status_code == 404
+
+        response = client.post(
+            "/api/stats/log-activity",
+            json={"activity_type": "bookmark_updated", "book_id": test_book.id},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json() == {"status": "success"}
+
+
+@pytest.mark.integration
+class TestRetentionAPI:
+    """Test the retention endpoints"""
+
+    def test_run_requires_admin(self, client: TestClient, auth_headers: dict, test_user: User):
+        """Test that only the users listed in ADMIN_USERNAMES can start a retention run"""
+        with patch("app.api.stats.retention_service.run_retention_job") as run_retention_job:
+            response = client.post("/api/stats/retention/run", headers=auth_headers)
+            assert response.status_code == 403
+            run_retention_job.assert_not_called()
+
+            with patch("app.api.deps.ADMIN_USERNAMES", [test_user.username]):
+                response = client.post("/api/stats/retention/run", headers=auth_headers)
+            assert response.status_code == 202
+            run_retention_job.assert_called_once()
@@ -0,0 +1,199 @@
+import pytest
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Book, ReadingSession, UserActivity, UserBook
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def index_names(engine, table: str) -> set:
+    return {index["name"] for index in sa.inspect(engine).get_indexes(table)}
+
+
+def query_plan(db: Session, query) -> str:
+    statement = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return " | ".join(row[-1] for row in db.execute(sa.text(f"EXPLAIN QUERY PLAN {statement}")))
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / f'migrations_{uuid.uuid4().hex}.db'}"
+
+
+@pytest.mark.unit
+class TestMigrations:
+    """Test the versioned schema migrations"""
+
+    def test_upgrade_fresh_database(self, database_url):
+        """Test that a fresh database is migrated to the full schema with the query indexes"""
+        command.upgrade(alembic_config(database_url), "head")
+        engine = sa.create_engine(database_url)
+
+        tables = set(sa.inspect(engine).get_table_names())
+        assert {"users", "books", "user_books", "activity_rollups", "import_jobs", "books_fts"} <= tables
+        assert {"ux_user_books_user_book", "ix_user_books_user_status", "ix_user_books_user_added"} <= index_names(
+            engine, "user_books"
+        )
+        assert "ix_user_activities_user_created" in index_names(engine, "user_activities")
+        assert "ix_books_gutenberg_id" in index_names(engine, "books")
+        assert "ix_reading_sessions_user_book_id" in index_names(engine, "reading_sessions")
+        engine.dispose()
+
+    def test_downgrade_and_upgrade_again(self, database_url):
+        """Test that every migration can be reverted"""
+        config = alembic_config(database_url)
+        command.upgrade(config, "head")
+        command.downgrade(config, "base")
+        command.upgrade(config, "head")
+
+        engine = sa.create_engine(database_url)
+        assert "ux_user_books_user_book" in index_names(engine, "user_books")
+        engine.dispose()
+
+    def test_upgrade_from_baseline_schema(self, database_url):
+        """Test that a database on the original schema reaches the schema of the models and keeps its rows"""
+        config = alembic_config(database_url)
+        command.upgrade(config, "0001_baseline")
+
+        engine = sa.create_engine(database_url)
+        with engine.begin() as connection:
+            connection.execute(sa.text(
+                "INSERT INTO users (id, username, email, hashed_password, is_active, created_at) "
+                "VALUES (1, 'reader', 'reader@example.com', 'hash', 1, '2024-01-01')"
+            ))
+            connection.execute(sa.text("INSERT INTO books (id, title, author) VALUES (1, 'Moby Dick', 'Melville')"))
+
+        command.upgrade(config, "head")
+
+        expected = sa.create_engine("sqlite://")
+        Base.metadata.create_all(expected)
+        for table in Base.metadata.tables:
+            assert {column["name"] for column in sa.inspect(engine).get_columns(table)} == {
+                column["name"] for column in sa.inspect(expected).get_columns(table)
+            }
+            assert index_names(engine, table) == index_names(expected, table)
+        with engine.connect() as connection:
+            assert connection.execute(sa.text(
+                "SELECT rowid FROM books_fts WHERE books_fts MATCH 'moby'"
+            )).scalars().all() == [1]
+        engine.dispose()
+        expected.dispose()
+
+    def test_upgrade_merges_duplicate_user_books(self, database_url):
+        """Test that duplicate user books are merged into the oldest row with the newest state"""
+        config = alembic_config(database_url)
+        command.upgrade(config, "0002_library_features")
+
+        engine = sa.create_engine(database_url)
+        with engine.begin() as connection:
+            connection.execute(sa.text(
+                "INSERT INTO users (id, username, email, hashed_password, is_active, created_at) "
+                "VALUES (1, 'reader', 'reader@example.com', 'hash', 1, '2024-01-01')"
+            ))
+            connection.execute(sa.text("INSERT INTO books (id, title) VALUES (1, 'Twice'), (2, 'Once')"))
+            connection.execute(sa.text(
+                "INSERT INTO file_blobs (id, sha256, path, size, ref_count, created_at) VALUES "
+                "(1, 'old', 'blobs/ol/old.pdf', 1, 1, '2024-01-01'), "
+                "(2, 'new', 'blobs/ne/new.pdf', 1, 1, '2024-01-01')"
+            ))
+            connection.execute(sa.text(
+                "INSERT INTO user_books (id, user_id, book_id, status, bookmark_position, is_local, file_path, added_at) "
+                "VALUES (1, 1, 1, 'reading', 5, 1, 'blobs/ol/old.pdf', '2024-01-01 10:00:00'), "
+                "(2, 1, 1, 'read', 120, 1, 'blobs/ne/new.pdf', '2024-03-01 10:00:00'), "
+                "(3, 1, 2, 'read', 0, 0, NULL, '2024-01-01 10:00:00')"
+            ))
+            connection.execute(sa.text(
+                "INSERT INTO reading_sessions (user_book_id, start_time) VALUES "
+                "(1, '2024-01-01 10:00:00'), (2, '2024-03-02 10:00:00')"
+            ))
+
+        command.upgrade(config, "head")
+
+        with engine.connect() as connection:
+            assert connection.execute(sa.text(
+                "SELECT id, status, bookmark_position, file_path FROM user_books ORDER BY id"
+            )).all() == [(1, "read", 120, "blobs/ne/new.pdf"), (3, "read", 0, None)]
+            assert connection.execute(sa.text("SELECT user_book_id FROM reading_sessions")).scalars().all() == [1, 1]
+            assert connection.execute(sa.text(
+                "SELECT path, ref_count FROM file_blobs ORDER BY id"
+            )).all() == [("blobs/ol/old.pdf", 0), ("blobs/ne/new.pdf", 1)]
+            with pytest.raises(sa.exc.IntegrityError):
+                connection.execute(sa.text(
+                    "INSERT INTO user_books (user_id, book_id, status, is_local) VALUES (1, 1, 'read', 0)"
+                ))
+        engine.dispose()
+
+    def test_upgrade_database_created_from_models(self, engine):
+        """Test that a database created before migrations existed is upgraded without errors"""
+        database_url = str(engine.url)
+        command.upgrade(alembic_config(database_url), "head")
+
+        with engine.connect() as connection:
+            revision = connection.execute(sa.text("SELECT version_num FROM alembic_version")).scalar()
+        assert revision == "0003_query_indexes"
+
+
+@pytest.mark.unit
+class TestQueryIndexes:
+    """Test that the main service queries are answered from the composite indexes"""
+
+    def test_user_book_lookup(self, db_session: Session):
+        """Test the lookup of one book in a user's library"""
+        plan = query_plan(db_session, db_session.query(UserBook).filter(
+            UserBook.user_id == 1,
+            UserBook.book_id == 2
+        ))
+        assert "ux_user_books_user_book" in plan
+
+    def test_library_by_status(self, db_session: Session):
+        """Test the library filtered by status"""
+        plan = query_plan(db_session, db_session.query(UserBook).filter(
+            UserBook.user_id == 1,
+            UserBook.status == "reading"
+        ))
+        assert "ix_user_books_user_status" in plan
+
+    def test_library_by_added_at(self, db_session: Session):
+        """Test the library sorted by the date books were added"""
+        plan = query_plan(db_session, db_session.query(UserBook).filter(
+            UserBook.user_id == 1
+        ).order_by(UserBook.added_at.desc()).limit(20))
+        assert "ix_user_books_user_added" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_recent_activities(self, db_session: Session):
+        """Test the user's recent activities"""
+        plan = query_plan(db_session, db_session.query(UserActivity).filter(
+            UserActivity.user_id == 1,
+            UserActivity.created_at >= datetime(2024, 1, 1)
+        ).order_by(UserActivity.created_at.desc()).limit(50))
+        assert "ix_user_activities_user_created" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_book_by_gutenberg_id(self, db_session: Session):
+        """Test the catalog lookup by Gutenberg id"""
+        plan = query_plan(db_session, db_session.query(Book).filter(Book.gutenberg_id == 1342))
+        assert "ix_books_gutenberg_id" in plan
+
+    def test_reading_sessions_of_book(self, db_session: Session):
+        """Test the reading sessions of one user book"""
+        plan = query_plan(db_session, db_session.query(ReadingSession).filter(
+            ReadingSession.user_book_id == 1,
+            ReadingSession.start_time >= datetime.now() - timedelta(days=30)
+        ))
+        assert "ix_reading_sessions_user_book_id" in plan
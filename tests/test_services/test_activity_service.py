@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import ActivityRollup, User, UserActivity
+from app.services.activity import ActivityService
+from app.utils.sql import hour_of
+
+
+def stored(db_session: Session, user: User) -> int:
+    db_session.expire_all()
+    return db_session.query(UserActivity).filter(UserActivity.user_id == user.id).count()
+
+
+@pytest.mark.unit
+class TestActivityService:
+    """Test the write-behind activity queue"""
+
+    def test_events_are_written_in_batches(self, db_session: Session, test_user: User):
+        """Test that events wait in the queue until the batch is full"""
+        service = ActivityService(flush_size=3, flush_interval_ms=60000)
+        try:
+            for number in range(2):
+                assert service.log_activity(db_session, test_user.id, "bookmark_updated", details={"n": number}) is None
+            assert stored(db_session, test_user) == 0
+
+            service.log_activity(db_session, test_user.id, "bookmark_updated")
+            for _ in range(50):
+                if stored(db_session, test_user) == 3:
+                    break
+                time.sleep(0.1)
+            assert stored(db_session, test_user) == 3
+        finally:
+            service.shutdown()
+
+    def test_reads_and_shutdown_flush(self, db_session: Session, test_user: User):
+        """Test that queued events are visible to reads and written on shutdown"""
+        service = ActivityService(flush_size=100, flush_interval_ms=60000)
+        service.log_activity(db_session, test_user.id, "profile_updated")
+
+        activities = service.get_user_activities(db_session, test_user.id)
+        assert [activity.activity_type for activity in activities] == ["profile_updated"]
+
+        service.log_activity(db_session, test_user.id, "book_added")
+        service.shutdown()
+        assert stored(db_session, test_user) == 2
+        assert service._pending_count == 0
+
+    def test_invalid_rows_are_dropped_from_batch(self, db_session: Session, test_user: User):
+        """Test that a failing batch is written again without the rows that cannot be stored"""
+        rows = [
+            {"user_id": test_user.id, "activity_type": "book_added", "book_id": None, "details": None,
+             "created_at": datetime.now()}
+            for _ in range(3)
+        ]
+        rows[1] = {**rows[1], "user_id": None}
+
+        assert ActivityService._write_rows(db_session.get_bind(), rows) == 2
+        assert stored(db_session, test_user) == 2
+
+    def test_sync_mode_returns_row(self, db_session: Session, test_user: User):
+        """Test that synchronous logging commits at once and returns the row"""
+        service = ActivityService(flush_size=100, flush_interval_ms=60000)
+
+        activity = service.log_activity(db_session, test_user.id, "data_exported", sync=True)
+
+        assert activity.id is not None
+        assert stored(db_session, test_user) == 1
+        assert service._flusher is None
+
+    def test_statistics_come_from_rollups(self, db_session: Session, test_user: User):
+        """Test that rollups follow every write path and outlive purged raw activities"""
+        service = ActivityService(flush_size=100, flush_interval_ms=60000)
+        earlier = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=2, hours=3)
+        db_session.add(UserActivity(user_id=test_user.id, activity_type="book_added", created_at=earlier))
+        db_session.commit()
+        service.log_activity(db_session, test_user.id, "bookmark_updated")
+        service.log_activity(db_session, test_user.id, "bookmark_updated", sync=True)
+
+        stats = service.get_activity_statistics(db_session, test_user.id, days=7)
+
+        assert stats["total_activities"] == 3
+        assert stats["activities_by_type"] == {"book_added": 1, "bookmark_updated": 2}
+        assert stats["daily_activities"][0] == {"date": earlier.date().isoformat(), "count": 1}
+        assert stats["hourly_activities"][earlier.hour] >= 1
+        assert service.get_activity_statistics(db_session, test_user.id, days=1)["total_activities"] == 2
+
+        db_session.query(UserActivity).filter(UserActivity.created_at == earlier).delete()
+        db_session.commit()
+        assert service.get_activity_statistics(db_session, test_user.id, days=7)["total_activities"] == 3
+
+        assert service.rebuild_rollups(db_session, test_user.id) == 1
+        assert service.get_activity_statistics(db_session, test_user.id, days=7)["activities_by_type"] == {
+            "bookmark_updated": 2
+        }
+
+        activity = db_session.query(UserActivity).filter(UserActivity.user_id == test_user.id).first()
+        db_session.delete(activity)
+        db_session.commit()
+        assert service.get_activity_statistics(db_session, test_user.id)["total_activities"] == 1
+        service.shutdown()
+
+    def test_hour_expression(self, db_session: Session, test_user: User):
+        """Test the portable hour expression used to rebuild rollups"""
+        db_session.add(UserActivity(
+            user_id=test_user.id, activity_type="book_added", created_at=datetime(2024, 3, 1, 7, 45)
+        ))
+        db_session.commit()
+
+        assert db_session.query(hour_of(db_session, UserActivity.created_at)).scalar() == 7
+        assert db_session.query(ActivityRollup.hour, ActivityRollup.count).one() == (7, 1)
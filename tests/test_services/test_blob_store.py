@@ -0,0 +1,89 @@
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app.models import FileBlob, User, UserBook
+from app.services.file import file_service
+from app.utils.security import get_password_hash
+
+
+def make_user(db_session: Session, username: str) -> User:
+    user = User(username=username, email=f"{username}@example.com", hashed_password=get_password_hash("password"))
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+async def upload(db_session: Session, user: User, content: bytes, filename: str = "book.txt"):
+    return await file_service.upload_book_file(
+        db_session, UploadFile(BytesIO(content), filename=filename), user, "Shared Book", "en"
+    )
+
+
+@pytest.mark.unit
+class TestBlobStore:
+    """Test content-addressed storage of uploaded files"""
+
+    @pytest.mark.asyncio
+    async def test_identical_uploads_share_blob(self, db_session: Session, tmp_path):
+        """Test that a blob is stored once and deleted with its last reference and its cover"""
+        first_user = make_user(db_session, "reader_one")
+        second_user = make_user(db_session, "reader_two")
+
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path):
+            first = await upload(db_session, first_user, b"same content")
+            second = await upload(db_session, second_user, b"same content")
+
+            assert first["file_path"] == second["file_path"]
+            blob = db_session.query(FileBlob).one()
+            assert blob.ref_count == 2
+            blob_path = tmp_path / blob.path
+            assert blob_path.read_bytes() == b"same content"
+            assert list((tmp_path / "blobs" / "staging").iterdir()) == []
+            cover_path = tmp_path / "covers" / f"{Path(blob.path).stem}.jpg"
+            cover_path.parent.mkdir(exist_ok=True)
+            cover_path.write_bytes(b"cover")
+
+            assert file_service.remove_book_file(db_session, first["user_book_id"], first_user.id)
+            db_session.refresh(blob)
+            assert blob.ref_count == 1
+            assert blob_path.exists()
+            assert cover_path.exists()
+
+            assert file_service.remove_book_file(db_session, second["user_book_id"], second_user.id)
+            assert db_session.query(FileBlob).count() == 0
+            assert not blob_path.exists()
+            assert not cover_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_recounts_references(self, db_session: Session, tmp_path):
+        """Test that cleanup fixes counts and reclaims unreferenced blobs"""
+        user = make_user(db_session, "reader")
+
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path), \
+                patch("app.config.UPLOAD_DIR_PATH", tmp_path):
+            kept = await upload(db_session, user, b"kept")
+            dropped = await upload(db_session, user, b"dropped")
+
+            db_session.add(UserBook(
+                user_id=make_user(db_session, "second_reader").id, book_id=kept["book_id"], status="read",
+                is_local=True, file_path=kept["file_path"], added_at=datetime.now()
+            ))
+            db_session.query(UserBook).filter(UserBook.id == dropped["user_book_id"]).delete()
+            db_session.commit()
+            (tmp_path / "blobs" / "ab").mkdir(parents=True)
+            (tmp_path / "blobs" / "ab" / "stray.pdf").write_bytes(b"stray")
+
+            deleted = file_service.cleanup_orphaned_files(db_session)
+
+            assert deleted == 2
+            blob = db_session.query(FileBlob).one()
+            assert blob.path == kept["file_path"]
+            assert blob.ref_count == 2
+            assert (tmp_path / kept["file_path"]).exists()
+            assert not (tmp_path / dropped["file_path"]).exists()
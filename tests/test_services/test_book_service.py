@@ -430,6 +430,33 @@ class TestBookService:
         
         not_found_user_book = book_service.is_book_in_user_collection(db_session, user.id, 99999)
         assert not_found_user_book is None
+    
+    @pytest.mark.asyncio
+    async def test_import_books_from_gutenberg(self, db_session: Session, test_user: User, mock_gutenberg_response):
+        """Test batch import with existing, new and failing ids"""
+        db_session.add(Book(title="Already There", author="Author", gutenberg_id=1))
+        db_session.commit()
+        
+        async def get_book_by_id(gutenberg_id):
+            if gutenberg_id == 3:
+                raise ValueError("not found")
+            return {**mock_gutenberg_response["results"][0], "id": gutenberg_id}
+        
+        fetch = AsyncMock(side_effect=get_book_by_id)
+        with patch("app.services.book.gutenberg_service.get_book_by_id", fetch):
+            result = await book_service.import_books_from_gutenberg(
+                db_session, [1, 2, 3, 2, 4], test_user.id
+            )
+        
+        assert sorted(call.args[0] for call in fetch.await_args_list) == [2, 3, 4]
+        assert sorted(book["gutenberg_id"] for book in result["imported"]) == [2, 4]
+        assert [book["gutenberg_id"] for book in result["existing"]] == [1]
+        assert result["failed"] == [{"gutenberg_id": 3, "error": "not found"}]
+        
+        book = db_session.query(Book).filter(Book.gutenberg_id == 4).one()
+        assert book.title == "Test Gutenberg Book"
+        assert {fmt.format_type for fmt in book.formats} == {"pdf", "html"}
+        assert db_session.query(Book).count() == 3
 
 
 @pytest.mark.integration
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.models import Book
+from app.services.book import book_service
+from app.services.catalog_count import catalog_count_service
+from app.utils.cache import TTLCache
+
+
+@pytest.mark.unit
+class TestTTLCache:
+    """Test the in-memory TTL cache"""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expired_entry(self):
+        """Test that expired entries count as misses"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1, ttl=0)
+
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.unit
+class TestCatalogCounts:
+    """Test cached and estimated catalog totals"""
+
+    def test_cached_total_reused(self, db_session: Session):
+        """Test that repeated listings reuse the cached total"""
+        db_session.add_all([Book(title=f"Book {i}") for i in range(3)])
+        db_session.commit()
+
+        assert book_service.get_books_catalog(db_session)["total"] == 3
+
+        db_session.execute(text("INSERT INTO books (title) VALUES ('Raw insert')"))
+        db_session.flush()
+
+        result = book_service.get_books_catalog(db_session)
+        assert result["total"] == 3
+        assert result["total_is_estimate"] is False
+
+        assert book_service.get_books_catalog(db_session, count_mode="exact")["total"] == 4
+
+    def test_invalidated_on_create_and_delete(self, db_session: Session):
+        """Test that creating or deleting books drops cached totals"""
+        book = Book(title="First")
+        db_session.add(book)
+        db_session.commit()
+        assert book_service.get_books_catalog(db_session)["total"] == 1
+
+        db_session.add(Book(title="Second"))
+        db_session.commit()
+        assert book_service.get_books_catalog(db_session)["total"] == 2
+
+        db_session.delete(book)
+        db_session.commit()
+        assert book_service.get_books_catalog(db_session)["total"] == 1
+
+    def test_estimate_from_statistics(self, db_session: Session):
+        """Test that unfiltered listings can use table statistics"""
+        db_session.add_all([Book(title=f"Book {i}", language="en") for i in range(4)])
+        db_session.commit()
+        db_session.execute(text("ANALYZE"))
+
+        assert catalog_count_service.estimate_table_rows(db_session, "books") == 4
+
+        result = book_service.get_books_catalog(db_session, count_mode="estimate")
+        assert result["total"] == 4
+        assert result["total_is_estimate"] is True
+
+        result = book_service.get_books_catalog(db_session, language="en", count_mode="estimate")
+        assert result["total_is_estimate"] is False
+
+    def test_invalidated_on_bulk_statements(self, db_session: Session):
+        """Test that bulk INSERT and DELETE statements on books drop cached totals"""
+        db_session.add(Book(title="First"))
+        db_session.commit()
+        assert book_service.get_books_catalog(db_session)["total"] == 1
+
+        db_session.execute(insert(Book), [{"title": "Bulk 1"}, {"title": "Bulk 2"}])
+        db_session.commit()
+        assert book_service.get_books_catalog(db_session)["total"] == 3
+
+        db_session.query(Book).filter(Book.title.like("Bulk%")).delete(synchronize_session=False)
+        db_session.commit()
+        assert book_service.get_books_catalog(db_session)["total"] == 1
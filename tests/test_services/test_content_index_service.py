@@ -0,0 +1,125 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models import ContentDocument, ContentPosting, User
+from app.services.content_index import ContentIndexService
+from app.services.file import file_service
+from app.utils.security import get_password_hash
+
+
+def make_user(db_session: Session, username: str) -> User:
+    user = User(username=username, email=f"{username}@example.com", hashed_password=get_password_hash("password"))
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.mark.unit
+class TestContentIndexService:
+    """Test indexing and searching the text of uploaded books"""
+
+    @pytest.mark.asyncio
+    async def test_search_uploaded_books(self, db_session: Session, test_user: User, tmp_path):
+        """Test ranked phrase hits with pages and snippets, per user, removed with the book"""
+        service = ContentIndexService(workers=0)
+        other_user = make_user(db_session, "other_reader")
+        books = {
+            "often.txt": "Call me Ishmael. " + "The white whale appeared again. " * 5,
+            "once.html": "<html><body><p>Filler text.</p>" + "<p>More words here.</p>" * 300 +
+                         "<p>At last the White Whale breached.</p></body></html>",
+            "other.txt": "Nothing about whales, only a white cat."
+        }
+
+        uploads = {}
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path), \
+                patch("app.services.file.content_index_service", service), \
+                patch("app.services.content_index.READER_PAGE_CHARS", 500), \
+                patch("app.services.metadata.READER_PAGE_CHARS", 500):
+            for filename, content in books.items():
+                uploads[filename] = await file_service.upload_book_file(
+                    db_session, UploadFile(BytesIO(content.encode()), filename=filename),
+                    test_user, filename, "en"
+                )
+                assert await service.wait_for(uploads[filename]["user_book_id"], timeout=30)
+            await file_service.upload_book_file(
+                db_session, UploadFile(BytesIO(books["often.txt"].encode()), filename="copy.txt"),
+                other_user, "Copy", "en"
+            )
+
+            result = service.search(db_session, test_user.id, "white whale")
+
+            assert result["total"] == 2
+            first, second = result["results"]
+            assert first["user_book_id"] == uploads["often.txt"]["user_book_id"]
+            assert first["match_count"] == 5
+            assert first["pages"][0] == {
+                "page": 1, "matches": 5, "snippet": first["pages"][0]["snippet"]
+            }
+            assert "white whale" in first["pages"][0]["snippet"]
+            assert second["user_book_id"] == uploads["once.html"]["user_book_id"]
+            assert second["pages"][0]["page"] > 1
+            assert "White Whale breached" in second["pages"][0]["snippet"]
+            assert first["score"] > second["score"]
+
+            assert service.search(db_session, test_user.id, "whale white")["total"] == 0
+            with pytest.raises(HTTPException) as exc_info:
+                service.search(db_session, test_user.id, "!!!")
+            assert exc_info.value.status_code == 400
+
+            file_service.remove_book_file(db_session, uploads["often.txt"]["user_book_id"], test_user.id)
+        service.shutdown()
+
+        result = service.search(db_session, test_user.id, "white whale")
+        assert [hit["user_book_id"] for hit in result["results"]] == [uploads["once.html"]["user_book_id"]]
+        assert db_session.query(ContentPosting).filter(
+            ContentPosting.user_book_id == uploads["often.txt"]["user_book_id"]
+        ).count() == 0
+        assert db_session.query(ContentDocument).filter(ContentDocument.user_id == test_user.id).count() == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_book_is_not_queued_again(self, db_session: Session, test_user: User, tmp_path):
+        """Test that a book that cannot be indexed is recorded as failed instead of being queued on every start"""
+        service = ContentIndexService(workers=0)
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path), \
+                patch("app.services.file.content_index_service", service):
+            upload = await file_service.upload_book_file(
+                db_session, UploadFile(BytesIO(b"not a zip archive"), filename="broken.epub"),
+                test_user, "Broken", "en"
+            )
+            assert await service.wait_for(upload["user_book_id"], timeout=30) is False
+
+            document = db_session.query(ContentDocument).filter(
+                ContentDocument.user_book_id == upload["user_book_id"]
+            ).one()
+            assert document.error
+            assert service.resume_unindexed(sessionmaker(bind=db_session.get_bind())) == 0
+            assert service.search(db_session, test_user.id, "anything")["total"] == 0
+        service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_postings_longer_than_a_blob(self, db_session: Session, test_user: User, tmp_path):
+        """Test that positions of a very common term are kept whole past the 64 KB of a MySQL BLOB"""
+        service = ContentIndexService(workers=0)
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path), \
+                patch("app.services.file.content_index_service", service):
+            upload = await file_service.upload_book_file(
+                db_session, UploadFile(BytesIO(b"the whale " * 70000), filename="long.txt"),
+                test_user, "Long", "en"
+            )
+            assert await service.wait_for(upload["user_book_id"], timeout=60) is True
+
+            posting = db_session.query(ContentPosting).filter(
+                ContentPosting.user_book_id == upload["user_book_id"], ContentPosting.term == "the"
+            ).one()
+            assert posting.frequency == 70000
+            assert len(posting.positions) > 65535
+            assert service.search(db_session, test_user.id, "the whale")["results"][0]["match_count"] == 70000
+        service.shutdown()
+
+        for column in (ContentPosting.__table__.c.positions, ContentDocument.__table__.c.page_starts):
+            assert column.type.compile(dialect=mysql.dialect()) == "MEDIUMBLOB"
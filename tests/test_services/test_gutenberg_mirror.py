@@ -0,0 +1,109 @@
+import io
+import tarfile
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import Book, BookFormat
+from app.services.gutenberg_mirror import gutenberg_mirror_service, iter_catalog
+
+CSV_HEADER = "Text#,Type,Issued,Title,Language,Authors,Subjects,LoCC,Bookshelves\n"
+
+RDF_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:dcterms="http://purl.org/dc/terms/"
+         xmlns:pgterms="http://www.gutenberg.org/2009/pgterms/">
+  <pgterms:ebook rdf:about="ebooks/{id}">
+    <dcterms:title>{title}</dcterms:title>
+    <dcterms:creator>
+      <pgterms:agent><pgterms:name>Shelley, Mary Wollstonecraft</pgterms:name></pgterms:agent>
+    </dcterms:creator>
+    <dcterms:language><rdf:Description><rdf:value>en</rdf:value></rdf:Description></dcterms:language>
+    <dcterms:type><rdf:Description><rdf:value>Text</rdf:value></rdf:Description></dcterms:type>
+    <dcterms:hasFormat>
+      <pgterms:file rdf:about="https://www.gutenberg.org/ebooks/{id}.epub3.images">
+        <dcterms:format><rdf:Description><rdf:value>application/epub+zip</rdf:value></rdf:Description></dcterms:format>
+      </pgterms:file>
+    </dcterms:hasFormat>
+    <dcterms:hasFormat>
+      <pgterms:file rdf:about="https://www.gutenberg.org/ebooks/{id}.txt.utf-8">
+        <dcterms:format><rdf:Description><rdf:value>text/plain; charset=utf-8</rdf:value></rdf:Description></dcterms:format>
+      </pgterms:file>
+    </dcterms:hasFormat>
+  </pgterms:ebook>
+</rdf:RDF>
+"""
+
+
+def write_csv(path, rows):
+    path.write_text(CSV_HEADER + "".join(rows), encoding="utf-8")
+    return path
+
+
+@pytest.mark.unit
+class TestGutenbergMirror:
+    """Test the offline Gutenberg catalog mirror"""
+
+    def test_csv_sync_and_incremental_resync(self, db_session: Session, tmp_path):
+        """Test initial ingest and a re-sync that only touches changed rows"""
+        catalog = write_csv(tmp_path / "pg_catalog.csv", [
+            '84,Text,1993-10-01,Frankenstein,en,"Shelley, Mary Wollstonecraft, 1797-1851",,,\n',
+            '1342,Text,1998-06-01,Pride and Prejudice,en,"Austen, Jane, 1775-1817",,,\n',
+            '9999,Sound,2000-01-01,An Audio Book,en,,,,\n',
+        ])
+
+        result = gutenberg_mirror_service.sync_catalog(db_session, catalog, batch_size=1)
+        assert result == {"processed": 2, "created": 2, "updated": 0, "unchanged": 0}
+
+        book = db_session.query(Book).filter(Book.gutenberg_id == 84).one()
+        assert book.author == "Shelley, Mary Wollstonecraft"
+        assert book.cover_url.endswith("/pg84.cover.medium.jpg")
+        assert {fmt.format_type for fmt in book.formats} == {"epub", "html", "text"}
+
+        write_csv(catalog, [
+            '84,Text,1993-10-01,"Frankenstein; Or, The Modern Prometheus",en,"Shelley, Mary Wollstonecraft, 1797-1851",,,\n',
+            '1342,Text,1998-06-01,Pride and Prejudice,en,"Austen, Jane, 1775-1817",,,\n',
+        ])
+
+        result = gutenberg_mirror_service.sync_catalog(db_session, catalog)
+        assert result == {"processed": 2, "created": 0, "updated": 1, "unchanged": 1}
+
+        db_session.expire_all()
+        assert db_session.query(Book).count() == 2
+        assert db_session.query(BookFormat).count() == 6
+        assert book.title == "Frankenstein; Or, The Modern Prometheus"
+
+    def test_rdf_tarball(self, tmp_path):
+        """Test streaming records from the RDF tarball"""
+        archive_path = tmp_path / "rdf-files.tar.bz2"
+        with tarfile.open(archive_path, "w:bz2") as archive:
+            content = RDF_TEMPLATE.format(id=84, title="Frankenstein").encode("utf-8")
+            info = tarfile.TarInfo("cache/epub/84/pg84.rdf")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+        records = list(iter_catalog(archive_path))
+
+        assert len(records) == 1
+        assert records[0]["id"] == 84
+        assert records[0]["authors"] == [{"name": "Shelley, Mary Wollstonecraft"}]
+        assert records[0]["formats"]["text/plain"].endswith("84.txt.utf-8")
+
+    def test_search_local(self, db_session: Session, tmp_path):
+        """Test Gutendex-shaped search over the mirror"""
+        catalog = write_csv(tmp_path / "pg_catalog.csv", [
+            '84,Text,1993-10-01,Frankenstein,en,"Shelley, Mary",,,\n',
+            '2000,Text,1999-12-01,Don Quijote,es,"Cervantes Saavedra, Miguel de",,,\n',
+        ])
+        gutenberg_mirror_service.sync_catalog(db_session, catalog)
+        db_session.add(Book(title="Frankenstein notes (uploaded)"))
+        db_session.commit()
+
+        result = gutenberg_mirror_service.search_local(db_session, search_query="frankenstein")
+
+        assert result["count"] == 1
+        assert result["results"][0]["id"] == 84
+        assert result["results"][0]["formats"]["application/epub+zip"].endswith("84.epub3.images")
+
+        result = gutenberg_mirror_service.search_local(db_session, languages=["es"])
+        assert [book["id"] for book in result["results"]] == [2000]
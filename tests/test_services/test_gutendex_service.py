@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.gutendex import GutenbergService
+
+
+def make_service(handler, cache_dir=None) -> GutenbergService:
+    service = GutenbergService(base_url="https://gutendex.test/books", cache_dir=cache_dir)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+@pytest.mark.unit
+class TestGutenbergService:
+    """Test GutenbergService"""
+
+    @pytest.mark.asyncio
+    async def test_requests_share_one_client(self, mock_gutenberg_response):
+        """Test that consecutive calls reuse the shared client and the configured URL"""
+        requested = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(str(request.url))
+            if request.url.path == "/books/":
+                return httpx.Response(200, json=mock_gutenberg_response)
+            return httpx.Response(200, json=mock_gutenberg_response["results"][0])
+
+        service = make_service(handler)
+        client = service.client
+
+        result = await service.search_books(search_query="test", languages=["en"])
+        book = await service.get_book_by_id(12345)
+
+        assert service.client is client
+        assert result["count"] == 1
+        assert book["id"] == 12345
+        assert requested[0].startswith("https://gutendex.test/books/?")
+        assert requested[1] == "https://gutendex.test/books/12345/"
+
+        await service.shutdown()
+        assert service._client is None
+
+    @pytest.mark.asyncio
+    async def test_startup_creates_client(self):
+        """Test the application lifecycle hooks"""
+        service = GutenbergService()
+
+        await service.startup()
+        assert service._client is not None
+        assert not service._client.is_closed
+
+        client = service._client
+        await service.shutdown()
+        assert client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_responses_cached(self, mock_gutenberg_response):
+        """Test that repeated searches and lookups are served from the cache"""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            return httpx.Response(200, json=mock_gutenberg_response)
+
+        service = make_service(handler)
+
+        await service.search_books(search_query="Test", languages=["fr", "en"])
+        await service.search_books(search_query="test ", languages=["en", "fr"])
+        await service.search_books(search_query="test", languages=["en", "fr"], page=2)
+
+        assert len(calls) == 2
+        stats = service.cache_stats()["memory"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_survives_restart(self, tmp_path, mock_gutenberg_response):
+        """Test that a new service instance reuses the on-disk tier"""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            return httpx.Response(200, json=mock_gutenberg_response["results"][0])
+
+        first = make_service(handler, cache_dir=str(tmp_path))
+        await first.get_book_by_id(12345)
+        await first.shutdown()
+
+        second = make_service(handler, cache_dir=str(tmp_path))
+        book = await second.get_book_by_id(12345)
+        await second.shutdown()
+
+        assert book["id"] == 12345
+        assert len(calls) == 1
+        assert second.cache_stats()["disk"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_coalesced(self, mock_gutenberg_response):
+        """Test that concurrent identical lookups make a single upstream call"""
+        calls = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=mock_gutenberg_response["results"][0])
+
+        service = make_service(handler)
+
+        books = await asyncio.gather(*[service.get_book_by_id(12345) for _ in range(10)])
+
+        assert len(calls) == 1
+        assert all(book["id"] == 12345 for book in books)
+        assert service.cache_stats()["coalesced"] == 9
+        assert service.cache_stats()["in_flight"] == 0
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_coalesced_failure_not_cached(self):
+        """Test that a failed upstream call is shared but not cached"""
+        calls = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            await asyncio.sleep(0.01)
+            return httpx.Response(503)
+
+        service = make_service(handler)
+
+        results = await asyncio.gather(
+            *[service.get_book_by_id(1) for _ in range(3)], return_exceptions=True
+        )
+        assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+        assert len(calls) == 1
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.get_book_by_id(1)
+        assert len(calls) == 2
+
+        await service.shutdown()
@@ -0,0 +1,200 @@
+import json
+from datetime import datetime
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Book, BookFormat, FileBlob, ReadingSession, User, UserBook
+from app.services.library_import import library_import_service
+
+
+def entry(title: str, author: str = "Author", gutenberg_id=None, **user_book) -> dict:
+    return {
+        **user_book,
+        "book": {
+            "title": title,
+            "author": author,
+            "gutenberg_id": gutenberg_id,
+            "formats": [{"format_type": "epub", "url": f"https://example.com/{title}.epub"}]
+        }
+    }
+
+
+@pytest.mark.unit
+class TestLibraryImportService:
+    """Test the batched library importer"""
+
+    def test_batched_dedup(self, db_session: Session, test_user: User):
+        """Test that books are matched and created with a constant number of statements"""
+        db_session.add_all([
+            Book(title="Catalog", author="Someone", gutenberg_id=7),
+            Book(title="Known", author="Author")
+        ])
+        db_session.commit()
+        entries = [
+            entry("Renamed", gutenberg_id=7, status="read"),
+            entry("Known"),
+            entry("Fresh", gutenberg_id=99),
+            entry("Fresh copy", gutenberg_id=99),
+            entry("Twin"),
+            entry("Twin", status="reading"),
+            entry("Bad status", status="finished"),
+            "broken"
+        ] + [entry(f"Book {number}") for number in range(200)]
+        source = BytesIO(json.dumps({"books": entries}).encode())
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+        try:
+            stats = library_import_service.import_library(db_session, test_user, source, "library.json")
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+        assert stats["total_books"] == 208
+        assert stats["imported_books"] == 204
+        assert stats["created_books"] == 202
+        assert stats["skipped_books"] == 4
+        assert len(statements) < 20
+
+        user_books = db_session.query(UserBook).filter(UserBook.user_id == test_user.id).all()
+        assert len(user_books) == 204
+        by_title = {}
+        for user_book in user_books:
+            by_title.setdefault(user_book.book.title, []).append(user_book)
+        assert by_title["Catalog"][0].status == "read"
+        assert len(by_title["Known"]) == 1
+        assert len(by_title["Fresh"]) == 1 and "Fresh copy" not in by_title
+        assert [user_book.status for user_book in by_title["Twin"]] == ["Want to read"]
+        assert sum("already in the library" in error for error in stats["errors"]) == 2
+        fresh_formats = db_session.query(BookFormat).filter(BookFormat.book_id == by_title["Fresh"][0].book_id).all()
+        assert [book_format.url for book_format in fresh_formats] == ["https://example.com/Fresh.epub"]
+        assert sum(statement.startswith("INSERT INTO books ") for statement in statements) == 1
+        for user_book in by_title["Book 150"] + by_title["Twin"]:
+            assert [book_format.url for book_format in user_book.book.formats] == [
+                f"https://example.com/{user_book.book.title}.epub"
+            ]
+
+    def test_merge_applies_only_differences(self, db_session: Session, test_user: User):
+        """Test that a merge import keeps unchanged books and their sessions and reports the diff"""
+        added_at = "2024-01-02T03:04:05"
+        initial = [
+            entry("Kept", gutenberg_id=1, status="reading", bookmark_position=10, added_at=added_at),
+            entry("Changed", gutenberg_id=2, status="reading", bookmark_position=5, added_at=added_at),
+            entry("Dropped", gutenberg_id=3, status="Want to read", added_at=added_at)
+        ]
+        library_import_service.import_library(
+            db_session, test_user, BytesIO(json.dumps({"books": initial}).encode()), "library.json"
+        )
+        user_books = {
+            user_book.book.title: user_book
+            for user_book in db_session.query(UserBook).filter(UserBook.user_id == test_user.id)
+        }
+        db_session.add(ReadingSession(user_book_id=user_books["Kept"].id, start_time=datetime.now()))
+        db_session.commit()
+
+        updated = [
+            initial[0],
+            entry("Changed", gutenberg_id=2, status="read", bookmark_position=300, added_at=added_at),
+            entry("New", gutenberg_id=4)
+        ]
+        lines = "\n".join(json.dumps(item) for item in updated)
+        stats = library_import_service.import_library(
+            db_session, test_user, BytesIO(lines.encode()), "library.ndjson", mode="merge"
+        )
+
+        assert (stats["added"], stats["updated"], stats["unchanged"], stats["removed"]) == (1, 1, 1, 1)
+        assert stats["created_books"] == 1
+        db_session.expire_all()
+        current = {
+            user_book.book.title: user_book
+            for user_book in db_session.query(UserBook).filter(UserBook.user_id == test_user.id)
+        }
+        assert set(current) == {"Kept", "Changed", "New"}
+        assert current["Kept"].id == user_books["Kept"].id
+        assert len(current["Kept"].reading_sessions) == 1
+        assert current["Changed"].id == user_books["Changed"].id
+        assert (current["Changed"].status, current["Changed"].bookmark_position) == ("read", 300)
+
+        again = library_import_service.import_library(
+            db_session, test_user, BytesIO(lines.encode()), "library.ndjson", mode="merge"
+        )
+        assert (again["added"], again["updated"], again["unchanged"], again["removed"]) == (0, 0, 3, 0)
+
+    def test_untrusted_file_paths_are_dropped(self, db_session: Session, test_user: User):
+        """Test that only files the user already has are kept by an import"""
+        other_user = User(username="other_reader", email="other_reader@example.com", hashed_password="hash")
+        owned = FileBlob(sha256="a" * 64, path="blobs/aa/owned.pdf", size=1, ref_count=1)
+        foreign = FileBlob(sha256="b" * 64, path="blobs/bb/foreign.pdf", size=1, ref_count=1)
+        book = Book(title="Owned", author="Author")
+        db_session.add_all([other_user, owned, foreign, book])
+        db_session.flush()
+        db_session.add_all([
+            UserBook(user_id=test_user.id, book_id=book.id, status="reading", is_local=True, file_path=owned.path),
+            UserBook(user_id=other_user.id, book_id=book.id, status="reading", is_local=True, file_path=foreign.path)
+        ])
+        db_session.commit()
+
+        entries = [
+            entry("Owned", is_local=True, file_path=owned.path),
+            entry("Traversal", is_local=True, file_path="../.env"),
+            entry("Foreign", is_local=True, file_path=foreign.path),
+            entry("Malformed", is_local=True, file_path=["blobs"])
+        ]
+        stats = library_import_service.import_library(
+            db_session, test_user, BytesIO(json.dumps({"books": entries}).encode()), "library.json"
+        )
+
+        assert stats["imported_books"] == 4
+        user_books = {
+            user_book.book.title: user_book
+            for user_book in db_session.query(UserBook).filter(UserBook.user_id == test_user.id)
+        }
+        assert (user_books["Owned"].is_local, user_books["Owned"].file_path) == (True, owned.path)
+        for title in ("Traversal", "Foreign", "Malformed"):
+            assert (user_books[title].is_local, user_books[title].file_path) == (False, None)
+        db_session.expire_all()
+        assert (owned.ref_count, foreign.ref_count) == (1, 1)
+
+    def test_blob_references_follow_imports(self, db_session: Session, test_user: User, temp_upload_dir):
+        """Test that imports take and drop blob references and never delete files that are not blobs"""
+        other_user = User(username="sharing_reader", email="sharing_reader@example.com", hashed_password="hash")
+        kept = FileBlob(sha256="c" * 64, path="blobs/cc/kept.pdf", size=1, ref_count=1)
+        shared = FileBlob(sha256="d" * 64, path="blobs/dd/shared.pdf", size=1, ref_count=2)
+        books = [Book(title=title, author="Author") for title in ("Kept", "Shared", "Legacy")]
+        db_session.add_all([other_user, kept, shared, *books])
+        db_session.flush()
+        db_session.add_all([
+            UserBook(user_id=test_user.id, book_id=books[0].id, status="reading", is_local=True, file_path=kept.path),
+            UserBook(user_id=test_user.id, book_id=books[1].id, status="reading", is_local=True, file_path=shared.path),
+            UserBook(user_id=other_user.id, book_id=books[1].id, status="read", is_local=True, file_path=shared.path),
+            UserBook(user_id=test_user.id, book_id=books[2].id, status="read", is_local=True, file_path="victim.txt")
+        ])
+        db_session.commit()
+        (temp_upload_dir / "victim.txt").write_text("not a blob")
+
+        with patch('app.utils.files.UPLOAD_DIR_PATH', temp_upload_dir):
+            merged = [entry("Kept", status="reading", is_local=True, file_path=kept.path)]
+            stats = library_import_service.import_library(
+                db_session, test_user, BytesIO(json.dumps({"books": merged}).encode()), "library.json", mode="merge"
+            )
+            assert stats["removed"] == 2
+            db_session.expire_all()
+            assert (kept.ref_count, shared.ref_count) == (1, 1)
+            assert (temp_upload_dir / "victim.txt").exists()
+
+            replaced = [entry("Kept", status="read", is_local=True, file_path=kept.path), entry("Other")]
+            library_import_service.import_library(
+                db_session, test_user, BytesIO(json.dumps({"books": replaced}).encode()), "library.json"
+            )
+            db_session.expire_all()
+            assert kept.ref_count == 1
+
+            library_import_service.import_library(
+                db_session, test_user, BytesIO(json.dumps({"books": [entry("Other")]}).encode()), "library.json"
+            )
+            assert db_session.query(FileBlob).filter(FileBlob.path == "blobs/cc/kept.pdf").first() is None
+            assert db_session.query(FileBlob).filter(FileBlob.path == "blobs/dd/shared.pdf").one().ref_count == 1
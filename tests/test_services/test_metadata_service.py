@@ -0,0 +1,121 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from ebooklib import epub
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app.models import Book, BookFormat, User, UserBook
+from app.services.file import file_service
+from app.services.metadata import MetadataService
+
+
+def make_epub(path) -> bytes:
+    book = epub.EpubBook()
+    book.set_identifier("metadata-test")
+    book.set_title("Embedded Title")
+    book.set_language("de")
+    book.add_author("Embedded Author")
+    book.set_cover("cover.png", b"\x89PNG\r\n\x1a\nfake-image")
+    chapters = []
+    for number in range(3):
+        chapter = epub.EpubHtml(title=f"Chapter {number}", file_name=f"chapter_{number}.xhtml")
+        chapter.content = f"<h1>Chapter {number}</h1><p>Text</p>"
+        book.add_item(chapter)
+        chapters.append(chapter)
+    book.toc = chapters
+    book.spine = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(str(path), book)
+    return path.read_bytes()
+
+
+@pytest.mark.unit
+class TestMetadataService:
+    """Test background metadata extraction"""
+
+    @pytest.mark.asyncio
+    async def test_upload_returns_pending_then_ready(
+        self, db_session: Session, test_user: User, tmp_path
+    ):
+        """Test that metadata is written back by a worker process after the upload returns"""
+        content = make_epub(tmp_path / "source.epub")
+        service = MetadataService(workers=1)
+
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path), \
+                patch("app.services.file.metadata_service", service):
+            result = await file_service.upload_book_file(
+                db_session, UploadFile(BytesIO(content), filename="book.epub"),
+                test_user, "My Title", "en"
+            )
+            assert result["metadata_status"] == "pending"
+
+            try:
+                assert await service.wait_for(result["book_id"], timeout=60) == "ready"
+            finally:
+                service.shutdown()
+
+        book = db_session.query(Book).filter(Book.id == result["book_id"]).one()
+        db_session.refresh(book)
+        assert book.metadata_status == "ready"
+        assert book.title == "My Title"
+        assert book.language == "en"
+        assert book.author == "Embedded Author"
+        assert book.cover_url.startswith("/uploads/covers/")
+        assert (tmp_path / "covers" / book.cover_url.rsplit("/", 1)[1]).exists()
+        book_format = db_session.query(BookFormat).filter(BookFormat.book_id == book.id).one()
+        assert book_format.page_count == 1
+        assert (tmp_path / "pages" / f"{result['sha256']}.idx").exists()
+
+    @pytest.mark.asyncio
+    async def test_unreadable_file_marked_failed(self, db_session: Session, test_book: Book, tmp_path):
+        """Test that a failing extraction marks the book as failed"""
+        service = MetadataService(workers=0)
+        test_book.metadata_status = "pending"
+        db_session.commit()
+
+        with patch("app.services.metadata.extract_metadata", side_effect=ValueError("broken file")):
+            service.submit(db_session, test_book.id, "missing.pdf")
+            status = await service.wait_for(test_book.id, timeout=10)
+        service.shutdown()
+
+        db_session.refresh(test_book)
+        assert status == "failed"
+        assert test_book.metadata_status == "failed"
+
+    def test_backfill_page_counts(self, db_session: Session, test_user: User, test_book: Book, tmp_path):
+        """Test that local files stored without page counts are measured in batches"""
+        service = MetadataService(workers=0)
+        relative_paths = []
+        for number in range(3):
+            relative_path = f"{test_user.id}/legacy_{number}.txt"
+            (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / relative_path).write_text("word " * 1000 * (number + 1), encoding="utf-8")
+            relative_paths.append(relative_path)
+        relative_paths.append(f"{test_user.id}/missing.txt")
+        for relative_path in relative_paths:
+            book = Book(title=relative_path, language="en")
+            db_session.add(book)
+            db_session.flush()
+            db_session.add(BookFormat(book_id=book.id, format_type="text", url=relative_path))
+            db_session.add(UserBook(
+                user_id=test_user.id, book_id=book.id, status="reading",
+                is_local=True, file_path=relative_path
+            ))
+        db_session.commit()
+
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path), \
+                patch("app.services.metadata.READER_PAGE_CHARS", 2000):
+            result = service.backfill_page_counts(db_session, batch_size=2)
+        service.shutdown()
+
+        assert result == {"updated": 3, "failed": 1}
+        formats = {
+            book_format.url: book_format
+            for book_format in db_session.query(BookFormat).filter(BookFormat.url.in_(relative_paths))
+        }
+        assert [formats[path].page_count for path in relative_paths[:3]] == [3, 5, 8]
+        assert formats[relative_paths[0]].file_size == 5000
+        assert formats[relative_paths[3]].page_count is None
@@ -0,0 +1,65 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import ReadingSession, User, UserActivity, UserBook
+from app.services.activity import ActivityService
+from app.services.retention import RetentionPolicy, RetentionService, retention_service
+
+
+@pytest.mark.unit
+class TestRetentionService:
+    """Test batched retention of activities and reading sessions"""
+
+    def test_purge_in_batches_with_archive(
+        self, db_session: Session, test_user: User, test_user_book: UserBook, tmp_path
+    ):
+        """Test that old rows are archived and deleted in batches while recent ones stay"""
+        old = datetime.now() - timedelta(days=400)
+        db_session.add_all(
+            [UserActivity(user_id=test_user.id, activity_type="bookmark_updated", created_at=old) for _ in range(5)] +
+            [UserActivity(user_id=test_user.id, activity_type="book_added", created_at=datetime.now())] +
+            [ReadingSession(user_book_id=test_user_book.id, start_time=old, pages_read=3)]
+        )
+        db_session.commit()
+        service = RetentionService()
+        policies = [
+            RetentionPolicy("user_activities", UserActivity, "created_at", 365, True),
+            RetentionPolicy("reading_sessions", ReadingSession, "start_time", 0, True)
+        ]
+
+        result = service.run_retention(db_session, policies, batch_size=2, sleep_ms=0, archive_dir=tmp_path)
+
+        activities = result["user_activities"]
+        assert (activities["deleted"], activities["archived"], activities["batches"]) == (5, 5, 3)
+        assert service.status["tables"]["user_activities"] is activities
+        with gzip.open(activities["archive"], "rt", encoding="utf-8") as archive:
+            archived = [json.loads(line) for line in archive]
+        assert [row["activity_type"] for row in archived] == ["bookmark_updated"] * 5
+        assert archived[0]["created_at"] == old.isoformat()
+
+        assert result["reading_sessions"]["deleted"] == 0
+        assert db_session.query(ReadingSession).count() == 1
+        assert [activity.activity_type for activity in db_session.query(UserActivity)] == ["book_added"]
+
+        stats = ActivityService(flush_size=100, flush_interval_ms=60000).get_activity_statistics(
+            db_session, test_user.id, days=500
+        )
+        assert stats["total_activities"] == 6
+
+    def test_cleanup_old_activities_uses_batches(self, db_session: Session, test_user: User):
+        """Test the activity cleanup delegating to the batched purge without pausing the caller"""
+        db_session.add_all([
+            UserActivity(user_id=test_user.id, activity_type="book_added", created_at=datetime.now() - timedelta(days=40)),
+            UserActivity(user_id=test_user.id, activity_type="book_added", created_at=datetime.now())
+        ])
+        db_session.commit()
+
+        with patch.object(retention_service, "purge_table", wraps=retention_service.purge_table) as purge_table:
+            assert ActivityService.cleanup_old_activities(db_session, days_to_keep=30) == 1
+        assert purge_table.call_args.kwargs["sleep_ms"] == 0
+        assert db_session.query(UserActivity).count() == 1
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app.services.book import book_service
+from app.services.search import SQLiteFTS5Search, get_search_backend
+from app.models import Book
+
+
+@pytest.mark.unit
+class TestSearchBackend:
+    """Test full-text search backends"""
+
+    def test_sqlite_backend_selected(self, db_session: Session):
+        """Test that SQLite sessions use the FTS5 backend"""
+        assert get_search_backend(db_session).name == "sqlite"
+
+    def test_natural_match_expression(self):
+        """Test natural-language query translation"""
+        expression = SQLiteFTS5Search.build_match_expression("war peace", "natural")
+        assert expression == '"war"* OR "peace"*'
+
+        assert SQLiteFTS5Search.build_match_expression("!!!", "natural") is None
+
+    def test_boolean_match_expression(self):
+        """Test boolean query translation"""
+        expression = SQLiteFTS5Search.build_match_expression('+war -"civil war" peace*', "boolean")
+        assert expression == '("war") NOT ("civil war")'
+
+        expression = SQLiteFTS5Search.build_match_expression("war peace*", "boolean")
+        assert expression == '"war" OR "peace"*'
+
+        assert SQLiteFTS5Search.build_match_expression("-war", "boolean") is None
+
+
+@pytest.mark.unit
+class TestCatalogFullTextSearch:
+    """Test catalog search through the full-text index"""
+
+    @pytest.fixture
+    def catalog_books(self, db_session: Session):
+        books = [
+            Book(title="War and Peace", author="Leo Tolstoy", description="Napoleonic wars"),
+            Book(title="The Art of War", author="Sun Tzu", description="Military strategy"),
+            Book(title="Peace Treaties", author="John Smith", description="History of war and diplomacy"),
+        ]
+        db_session.add_all(books)
+        db_session.commit()
+        return books
+
+    def test_sort_by_relevance(self, db_session: Session, catalog_books):
+        """Test that title matches rank above description matches"""
+        result = book_service.get_books_catalog(db_session, search="war peace", sort_by="relevance")
+
+        assert result["total"] == 3
+        assert result["books"][0]["title"] == "War and Peace"
+
+    def test_boolean_mode(self, db_session: Session, catalog_books):
+        """Test boolean search with an excluded term"""
+        result = book_service.get_books_catalog(
+            db_session, search="+war -peace", search_mode="boolean"
+        )
+
+        assert result["total"] == 1
+        assert result["books"][0]["title"] == "The Art of War"
+
+    def test_index_follows_updates_and_deletes(self, db_session: Session, catalog_books):
+        """Test that the index stays in sync with the books table"""
+        catalog_books[1].title = "The Art of Strategy"
+        db_session.delete(catalog_books[0])
+        db_session.commit()
+
+        result = book_service.get_books_catalog(db_session, search="strategy")
+        assert [book["title"] for book in result["books"]] == ["The Art of Strategy"]
+
+        result = book_service.get_books_catalog(db_session, search="tolstoy")
+        assert result["total"] == 0
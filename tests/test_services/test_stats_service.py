@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import Book, BookFormat, ReadingSession, User, UserBook
+from app.services.stats import stats_service
+from app.services.user_library import user_library_service
+
+
+def add_book(db_session: Session, user: User, title: str, status: str, position: int, page_counts=()):
+    book = Book(title=title, author="Author", language="en")
+    db_session.add(book)
+    db_session.flush()
+    for page_count in page_counts:
+        db_session.add(BookFormat(book_id=book.id, format_type="text", url=f"{title}.txt", page_count=page_count))
+    user_book = UserBook(
+        user_id=user.id,
+        book_id=book.id,
+        status=status,
+        bookmark_position=position,
+        is_local=False,
+        added_at=datetime.now()
+    )
+    db_session.add(user_book)
+    db_session.commit()
+    return user_book
+
+
+@pytest.mark.unit
+class TestStatsService:
+    """Test reading progress computed from stored page counts"""
+
+    def test_reading_progress_uses_page_count(self, db_session: Session, test_user: User):
+        """Test that the largest known page count and finished sessions are used"""
+        user_book = add_book(db_session, test_user, "Counted", "reading", 50, page_counts=(120, 200, None))
+        start = datetime(2024, 1, 1, 10, 0)
+        db_session.add_all([
+            ReadingSession(user_book_id=user_book.id, start_time=start, end_time=start + timedelta(minutes=30)),
+            ReadingSession(user_book_id=user_book.id, start_time=start, end_time=start + timedelta(minutes=15)),
+            ReadingSession(user_book_id=user_book.id, start_time=start, end_time=None)
+        ])
+        db_session.commit()
+
+        progress = stats_service.get_reading_progress(db_session, test_user.id, user_book.id)
+
+        assert progress["total_pages"] == 200
+        assert progress["percentage"] == 25.0
+        assert progress["time_spent"] == 45
+        assert stats_service.get_reading_progress(db_session, test_user.id, 999)["error"]
+
+    def test_progress_falls_back_to_estimate(self, db_session: Session, test_user: User):
+        """Test the 300 page estimate for unknown page counts and the cap at 100 percent"""
+        add_book(db_session, test_user, "Unknown", "reading", 30)
+        add_book(db_session, test_user, "Finished", "read", 150, page_counts=(100,))
+        add_book(db_session, test_user, "Later", "Want to read", 0, page_counts=(100,))
+
+        progress = {
+            item["title"]: item
+            for item in user_library_service.get_user_reading_progress(db_session, test_user.id)
+        }
+
+        assert set(progress) == {"Unknown", "Finished"}
+        assert progress["Unknown"]["estimated_pages"] == 300
+        assert progress["Unknown"]["percentage"] == 10.0
+        assert progress["Finished"]["percentage"] == 100.0
+
+        stats = stats_service.get_user_reading_stats(db_session, test_user.id)
+        assert stats["total_pages_read"] == 180
+        assert stats["average_progress"] == 55.0
+        assert stats["completed_books"] == 1
+        assert stats["reading_now"] == 1
+        assert stats["want_to_read"] == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from app.utils.book_pages import (
+    build_page_index,
+    html_to_text,
+    page_index_key,
+    read_index_header,
+    read_page,
+    split_pages
+)
+
+
+@pytest.mark.unit
+class TestBookPages:
+    """Test the page index used by the reader"""
+
+    def test_split_pages_breaks_at_boundaries(self):
+        """Test that pages stay under the size and break between words"""
+        text = " ".join(f"word{number}" for number in range(500))
+
+        pages = split_pages(text, 100)
+
+        assert "".join(pages) == text
+        assert all(len(page) <= 100 for page in pages)
+        assert all(page.endswith(" ") for page in pages[:-1])
+
+    def test_build_and_read_pages(self, tmp_path):
+        """Test that any page is read back from its offsets, including multi-byte text"""
+        source = tmp_path / "book.txt"
+        paragraphs = [f"Paragraph {number}: Ünïcödé text – “quoted”." for number in range(200)]
+        source.write_text("\r\n\r\n\r\n".join(paragraphs), encoding="utf-8")
+        pages_dir = tmp_path / "pages"
+
+        total = build_page_index(source, pages_dir, "key", 500)
+
+        expected = split_pages("\n\n".join(paragraphs), 500)
+        assert total == len(expected)
+        assert read_index_header(pages_dir / "key.idx") == (4, 500, total)
+        assert read_page(pages_dir, "key", 1) == expected[0]
+        assert read_page(pages_dir, "key", total) == expected[-1]
+        assert read_page(pages_dir, "key", total + 1) is None
+        assert read_page(pages_dir, "missing", 1) is None
+
+    def test_html_to_text(self):
+        """Test that markup, scripts and styles are dropped and paragraphs kept"""
+        html = "<html><head><title>T</title><style>p {}</style></head><body>" \
+               "<h1>Chapter&nbsp;1</h1><p>First   line</p><script>x()</script><p>Second</p></body></html>"
+
+        assert html_to_text(html) == "Chapter 1\n\nFirst line\n\nSecond"
+
+    def test_page_index_key(self):
+        """Test that blobs share an index per content hash"""
+        assert page_index_key("blobs/ab/abcdef.epub") == "abcdef"
+        assert page_index_key("1/uuid_book.txt") != page_index_key("2/uuid_book.txt")
@@ -0,0 +1,50 @@
+import pytest
+
+from app.utils.content_index import (
+    decode_varints,
+    encode_varints,
+    index_pages,
+    make_snippet,
+    page_of,
+    phrase_positions,
+    tokenize
+)
+
+
+@pytest.mark.unit
+class TestContentIndex:
+    """Test tokenizing and positional postings"""
+
+    def test_varints_round_trip(self):
+        """Test that ascending positions survive gap encoding and stay compact"""
+        positions = [0, 1, 2, 127, 128, 300, 70000, 70001]
+
+        encoded = encode_varints(positions)
+
+        assert decode_varints(encoded) == positions
+        assert len(encoded) < len(positions) * 2
+        assert decode_varints(b"") == []
+
+    def test_phrase_positions_and_pages(self):
+        """Test that phrases are found across pages and mapped to the page they start on"""
+        pages = ["The white whale swims.", "", "Call me Ishmael. The White Whale!"]
+
+        positions, page_starts, token_count = index_pages(pages)
+
+        assert tokenize("The White-Whale") == ["the", "white", "whale"]
+        assert token_count == 10
+        assert page_starts == [0, 4, 4]
+        phrase = phrase_positions([positions["white"], positions["whale"]])
+        assert phrase == [1, 8]
+        assert [page_of(page_starts, position) for position in phrase] == [1, 3]
+        assert phrase_positions([positions["whale"], positions["white"]]) == []
+
+    def test_make_snippet(self):
+        """Test that the snippet is centred on the phrase"""
+        text = "x " * 100 + "the White\nWhale rises " + "y " * 100
+
+        snippet = make_snippet(text, ["white", "whale"], width=10)
+
+        assert snippet.startswith("…") and snippet.endswith("…")
+        assert "White Whale" in snippet
+        assert make_snippet(text, ["whale", "white"]) is None
@@ -0,0 +1,43 @@
+import hashlib
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.utils import files
+from app.utils.files import blob_relative_path, place_blob, save_upload_file
+
+
+@pytest.mark.unit
+class TestSaveUploadFile:
+    """Test the streaming upload writer"""
+
+    @pytest.mark.asyncio
+    async def test_streams_and_hashes(self, tmp_path):
+        """Test that the file is staged in chunks, hashed on the fly and moved into place"""
+        content = b"x" * (files.UPLOAD_CHUNK_SIZE * 2 + 10)
+        upload = UploadFile(BytesIO(content), filename="book.txt")
+
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path):
+            staged_path, size, sha256 = await save_upload_file(upload)
+            relative_path = blob_relative_path(sha256, ".TXT")
+            blob_path = place_blob(staged_path, relative_path)
+
+        assert size == len(content)
+        assert sha256 == hashlib.sha256(content).hexdigest()
+        assert relative_path == f"blobs/{sha256[:2]}/{sha256}.txt"
+        assert blob_path.read_bytes() == content
+        assert not staged_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_size_limit_aborts(self, tmp_path):
+        """Test that exceeding the limit aborts the copy and leaves nothing behind"""
+        upload = UploadFile(BytesIO(b"x" * 100), filename="book.txt")
+
+        with patch("app.utils.files.UPLOAD_DIR_PATH", tmp_path):
+            with pytest.raises(HTTPException) as exc_info:
+                await save_upload_file(upload, max_size=50)
+
+        assert exc_info.value.status_code == 413
+        assert list((tmp_path / "blobs" / "staging").iterdir()) == []
@@ -0,0 +1,43 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from app.utils.json_stream import JSONStreamError, iter_json_array, iter_ndjson
+
+
+@pytest.mark.unit
+class TestJSONStream:
+    """Test incremental parsing of library exports"""
+
+    def test_iter_json_array_small_chunks(self):
+        """Test that array items are decoded one by one whatever the chunk boundaries"""
+        document = {
+            "export_info": {"nested": [1, {"tricky": "}]\\\"[{"}]},
+            "books": [{"book": {"title": "Ünïcödé \"quoted\" ]}"}}, 1, "text", None, True, -1.5e3, []],
+            "after": "ignored"
+        }
+        data = json.dumps(document, ensure_ascii=False).encode("utf-8")
+
+        for chunk_size in (1, 2, 5, 64):
+            assert list(iter_json_array(BytesIO(data), "books", chunk_size)) == document["books"]
+        assert list(iter_json_array(BytesIO(b"\xef\xbb\xbf { \"books\" : [ ] }"), "books")) == []
+
+    @pytest.mark.parametrize("data", [
+        b'{"books": [1,',
+        b'{"other": 1}',
+        b'[{"books": []}]',
+        b'{"books": [1 2]}',
+        b'{"books": [1]} trailing',
+        b'{"books": [tru]}'
+    ])
+    def test_iter_json_array_errors(self, data):
+        """Test that malformed input or a missing array raises JSONStreamError"""
+        with pytest.raises(JSONStreamError):
+            list(iter_json_array(BytesIO(data), "books", 4))
+
+    def test_iter_ndjson(self):
+        """Test that every non-empty line is one value"""
+        assert list(iter_ndjson(BytesIO(b'{"a": 1}\n\n[2]\r\n'))) == [{"a": 1}, [2]]
+        with pytest.raises(JSONStreamError):
+            list(iter_ndjson(BytesIO(b'{"a": 1}\n{broken\n')))
@@ -0,0 +1,124 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.models import Book, UserBook, User
+from app.services.book import book_service
+from app.services.user_library import user_library_service
+from app.utils.pagination import encode_cursor, decode_cursor
+
+
+@pytest.mark.unit
+class TestCursorEncoding:
+    """Test cursor encoding"""
+
+    def test_round_trip(self):
+        """Test that values survive encoding"""
+        added_at = datetime(2024, 5, 1, 12, 30)
+
+        assert decode_cursor(encode_cursor("title:asc", "Emma", 7), "title:asc") == ("Emma", 7)
+        assert decode_cursor(encode_cursor("added_at:desc", added_at, 3), "added_at:desc") == (added_at, 3)
+        assert decode_cursor(encode_cursor("author:asc", None, 1), "author:asc") == (None, 1)
+
+    def test_invalid_cursor(self):
+        """Test that garbage cursors are rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("not-a-cursor", "title:asc")
+        assert exc_info.value.status_code == 400
+
+    def test_cursor_for_other_sorting(self):
+        """Test that a cursor cannot be reused with another ordering"""
+        cursor = encode_cursor("title:asc", "Emma", 7)
+
+        with pytest.raises(HTTPException):
+            decode_cursor(cursor, "title:desc")
+
+
+@pytest.mark.unit
+class TestKeysetPagination:
+    """Test keyset pagination of catalog and library listings"""
+
+    def _walk(self, fetch_page):
+        seen = []
+        cursor = None
+        while True:
+            page = fetch_page(cursor)
+            seen.extend(page["books"])
+            if not page["has_next"]:
+                return seen
+            cursor = page["next_cursor"]
+
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    def test_catalog_walk_with_null_authors(self, db_session: Session, sort_order: str):
+        """Test that cursor pages cover the catalog exactly once, NULLs and ties included"""
+        for i in range(11):
+            author = None if i % 3 == 0 else f"Author {i % 2}"
+            db_session.add(Book(title=f"Book {i}", author=author))
+        db_session.commit()
+
+        offset_order = book_service.get_books_catalog(
+            db_session, limit=100, sort_by="author", sort_order=sort_order
+        )["books"]
+
+        walked = self._walk(lambda cursor: book_service.get_books_catalog(
+            db_session, limit=4, sort_by="author", sort_order=sort_order,
+            cursor=cursor, include_total=False
+        ))
+
+        assert [book["id"] for book in walked] == [book["id"] for book in offset_order]
+
+    def test_catalog_without_total(self, db_session: Session):
+        """Test that the total count can be skipped"""
+        db_session.add_all([Book(title=f"Book {i}") for i in range(3)])
+        db_session.commit()
+
+        result = book_service.get_books_catalog(db_session, limit=2, include_total=False)
+
+        assert result["total"] is None
+        assert result["pages"] is None
+        assert result["has_next"] is True
+        assert result["next_cursor"] is not None
+
+    def test_library_walk(self, db_session: Session, test_user: User):
+        """Test cursor pagination over a user's library"""
+        now = datetime.now()
+        for i in range(7):
+            book = Book(title=f"Library Book {i}")
+            db_session.add(book)
+            db_session.flush()
+            db_session.add(UserBook(
+                user_id=test_user.id,
+                book_id=book.id,
+                status="reading",
+                added_at=now - timedelta(days=i // 2)
+            ))
+        db_session.commit()
+
+        walked = self._walk(lambda cursor: user_library_service.get_user_library(
+            db_session, test_user.id, limit=3, cursor=cursor
+        ))
+
+        assert len(walked) == 7
+        assert len({entry["id"] for entry in walked}) == 7
+
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    def test_library_walk_by_status(self, db_session: Session, test_user: User, sort_order: str):
+        """Test that statuses are paged in their declaration order, as MySQL sorts ENUM columns"""
+        statuses = ["read", "dropped", "Want to read", "reading"] * 2
+        for i, book_status in enumerate(statuses):
+            book = Book(title=f"Status Book {i}")
+            db_session.add(book)
+            db_session.flush()
+            db_session.add(UserBook(user_id=test_user.id, book_id=book.id, status=book_status))
+        db_session.commit()
+
+        walked = self._walk(lambda cursor: user_library_service.get_user_library(
+            db_session, test_user.id, limit=3, sort_by="status", sort_order=sort_order, cursor=cursor
+        ))
+
+        expected = ["Want to read"] * 2 + ["reading"] * 2 + ["read"] * 2 + ["dropped"] * 2
+        if sort_order == "desc":
+            expected.reverse()
+        assert [entry["status"] for entry in walked] == expected
+        assert len({entry["id"] for entry in walked}) == len(statuses)